@@ -0,0 +1,76 @@
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db.models import Count
+from django.test import Client
+from django.test.utils import override_settings
+from rest_framework.renderers import JSONRenderer
+
+from core.renderers import FastJSONRenderer
+
+
+class Command(BaseCommand):
+    help = (
+        "Render the responses of the heaviest read endpoints with JSONRenderer and FastJSONRenderer, "
+        "reporting the best time of each and whether their bytes are identical."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            'paths', nargs='*',
+            help='API paths to GET. Defaults to the largest surah, its ayahs, the words, '
+                 'a translation and a recitation found in the database.',
+        )
+        parser.add_argument('--repeat', type=int, default=10, help='Renders per renderer; the best is reported.')
+
+    def handle(self, *args, **options):
+        paths = options['paths'] or self.default_paths()
+        if not paths:
+            raise CommandError('No paths given and no content to benchmark in the database.')
+        # The response cache would hand back rendered bytes instead of the data
+        with override_settings(
+            ALLOWED_HOSTS=['testserver'],
+            CACHES={'default': {'BACKEND': 'django.core.cache.backends.dummy.DummyCache'}},
+        ):
+            client = Client()
+            for path in paths:
+                response = client.get(path, HTTP_ACCEPT='application/json')
+                data = getattr(response, 'data', None)
+                if response.status_code != 200 or data is None:
+                    self.stderr.write(f'{path}: skipped, status {response.status_code}')
+                    continue
+                self.benchmark(path, data, options['repeat'])
+
+    def benchmark(self, path, data, repeat):
+        results = {}
+        for renderer in (JSONRenderer(), FastJSONRenderer()):
+            best = None
+            for _ in range(repeat):
+                start = time.perf_counter()
+                content = renderer.render(data, 'application/json')
+                elapsed = time.perf_counter() - start
+                best = elapsed if best is None else min(best, elapsed)
+            results[type(renderer).__name__] = (best, content)
+        (stdlib_time, stdlib_content), (fast_time, fast_content) = results.values()
+        self.stdout.write(
+            f'{path}\n'
+            f'  {len(stdlib_content)} bytes, JSONRenderer {stdlib_time * 1000:.1f}ms, '
+            f'FastJSONRenderer {fast_time * 1000:.1f}ms ({stdlib_time / fast_time:.1f}x), '
+            f'{"identical" if stdlib_content == fast_content else "DIFFERENT"}'
+        )
+
+    def default_paths(self):
+        from quran.models import Recitation, Surah, Translation
+        paths = []
+        surah = Surah.objects.annotate(words_count=Count('ayahs__words')).order_by('-words_count').first()
+        if surah is not None:
+            paths.append(f'/surahs/{surah.uuid}/')
+            paths.append(f'/ayahs/?surah_uuid={surah.uuid}&text_format=word&limit=1000')
+            paths.append('/words/?limit=10000')
+        translation = Translation.objects.order_by('id').first()
+        if translation is not None:
+            paths.append(f'/translations/{translation.uuid}/ayahs/?limit=10000')
+        recitation = Recitation.objects.order_by('id').first()
+        if recitation is not None:
+            paths.append(f'/recitations/{recitation.uuid}/')
+        return paths
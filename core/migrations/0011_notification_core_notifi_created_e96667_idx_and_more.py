@@ -0,0 +1,23 @@
+# Generated by Django 5.1.7 on 2026-10-18 00:21
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0010_notification_uuid'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='notification',
+            index=models.Index(fields=['-created_at', 'id'], name='core_notifi_created_e96667_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='notification',
+            index=models.Index(fields=['user', '-created_at', 'id'], name='core_notifi_user_id_d5de1f_idx'),
+        ),
+    ]
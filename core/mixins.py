@@ -0,0 +1,139 @@
+import functools
+import hashlib
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.exceptions import ValidationError
+from django.http import HttpResponse
+from django.db.models import Count, Max
+from django.utils.cache import get_conditional_response
+from django.utils.http import http_date
+
+
+def queryset_validators(*querysets):
+    """
+    Build a `(version, last_modified)` pair from the row count and latest `updated_at` of each queryset.
+
+    The count is part of the version so deleting rows also changes it.
+    """
+    parts = []
+    last_modified = None
+    for queryset in querysets:
+        stats = queryset.order_by().aggregate(count=Count('pk'), last_modified=Max('updated_at'))
+        parts.append(f"{stats['count']}@{stats['last_modified'].timestamp() if stats['last_modified'] else 0}")
+        if stats['last_modified'] and (last_modified is None or stats['last_modified'] > last_modified):
+            last_modified = stats['last_modified']
+    return ':'.join(parts), last_modified
+
+
+def versioned_validators(*querysets):
+    """
+    Build a `(version, last_modified)` pair from rows that carry a `content_version` counter.
+
+    One small query per queryset; the descendants of the rows are never scanned.
+    """
+    parts = []
+    last_modified = None
+    for queryset in querysets:
+        for pk, content_version, updated_at in queryset.order_by('pk').values_list('pk', 'content_version', 'updated_at'):
+            parts.append(f"{pk}.{content_version}.{updated_at.timestamp()}")
+            if last_modified is None or updated_at > last_modified:
+                last_modified = updated_at
+    return ':'.join(parts), last_modified
+
+
+def conditional_get(handler):
+    """
+    Decorator for ViewSet read actions that emits ETag/Last-Modified and answers 304 when unchanged.
+
+    The view provides `get_content_validators()` returning `(version, last_modified)`,
+    or None to skip validation. The check runs before the wrapped action, so a fresh
+    client copy never evaluates the queryset or runs a serializer.
+
+    When the view also declares `response_cache_params`, the rendered body is kept in
+    Django's cache under a key that includes the version, so a content change simply
+    makes the old entries unreachable.
+    """
+    @functools.wraps(handler)
+    def wrapper(self, request, *args, **kwargs):
+        try:
+            validators = self.get_content_validators()
+        except (ValueError, TypeError, ValidationError):
+            # Malformed lookups are reported by the action itself (usually as a 404)
+            validators = None
+        if validators is None:
+            return handler(self, request, *args, **kwargs)
+        version, last_modified = validators
+        # The same content renders differently per URL (filters, paging) and per media type
+        seed = f"{version}|{request.get_full_path()}|{getattr(request, 'accepted_media_type', '')}"
+        etag = f'"{hashlib.sha256(seed.encode()).hexdigest()[:32]}"'
+        last_modified_ts = int(last_modified.timestamp()) if last_modified else None
+        response = get_conditional_response(request, etag=etag, last_modified=last_modified_ts)
+        if response is None:
+            cache_key = self.get_response_cache_key(request, version)
+            cached = cache.get(cache_key) if cache_key else None
+            if cached is not None:
+                content, content_type = cached
+                response = HttpResponse(content, content_type=content_type)
+            else:
+                response = handler(self, request, *args, **kwargs)
+                if response.status_code != 200:
+                    return response
+                if cache_key and hasattr(response, 'add_post_render_callback'):
+                    response.add_post_render_callback(
+                        lambda rendered: cache.set(
+                            cache_key,
+                            (rendered.content, rendered['Content-Type']),
+                            settings.RESPONSE_CACHE_TIMEOUT,
+                        )
+                    )
+        response['ETag'] = etag
+        if last_modified_ts is not None:
+            response['Last-Modified'] = http_date(last_modified_ts)
+        return response
+    return wrapper
+
+
+class ConditionalGetMixin:
+    """
+    Conditional GET support for the list and retrieve actions of a ViewSet.
+
+    Views implement `get_content_validators()` and may list the query parameters
+    a cached response may vary on in `response_cache_params`; see `conditional_get`.
+    """
+    response_cache_params = None
+
+    def get_content_validators(self):
+        return None
+
+    def get_response_cache_key(self, request, version):
+        """Cache key for this request, or None when the response must not be cached."""
+        if self.response_cache_params is None:
+            return None
+        renderer = getattr(request, 'accepted_renderer', None)
+        if renderer is None or renderer.format != 'json':
+            # The browsable API embeds per-user forms and links
+            return None
+        params = []
+        for name in sorted(request.query_params):
+            if name not in self.response_cache_params:
+                # Parameters like search or ordering are too open-ended to cache
+                return None
+            params.append((name, request.query_params.getlist(name)))
+        seed = repr((
+            self.basename,
+            self.action,
+            sorted(self.kwargs.items()),
+            params,
+            request.accepted_media_type,
+            version,
+        ))
+        return f"response:{hashlib.sha256(seed.encode()).hexdigest()}"
+
+    @conditional_get
+    def list(self, request, *args, **kwargs):
+        return super().list(request, *args, **kwargs)
+
+    @conditional_get
+    def retrieve(self, request, *args, **kwargs):
+        return super().retrieve(request, *args, **kwargs)
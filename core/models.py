@@ -133,6 +133,11 @@ class Notification(models.Model):
 
     class Meta:
         ordering = ['-created_at']
+        indexes = [
+            # Keyset pagination order, for all notifications and for one user's
+            models.Index(fields=['-created_at', 'id']),
+            models.Index(fields=['user', '-created_at', 'id']),
+        ]
 
     def __str__(self):
         return f"Notification for {self.user} - {self.resource_controller}.{self.resource_action} - {self.status}"
@@ -1,3 +1,9 @@
+import base64
+import json
+
+from django.core.exceptions import ValidationError
+from django.db.models import Q
+from rest_framework.exceptions import NotFound
 from rest_framework.pagination import LimitOffsetPagination
 from rest_framework.response import Response
 
@@ -19,4 +25,110 @@ class CustomLimitOffsetPagination(LimitOffsetPagination):
         return Response(data)
 
     def get_paginated_response_schema(self, schema):
-        return schema
\ No newline at end of file
+        return schema
+
+
+class CustomKeysetPagination(CustomLimitOffsetPagination):
+    """
+    CustomLimitOffsetPagination with opt-in keyset pagination.
+
+    When the request has a 'cursor' parameter (empty for the first page) the
+    queryset is ordered by `ordering`, or the view's `keyset_ordering`, and
+    each page seeks past the last row of the previous one instead of skipping
+    'offset' rows. The keys must identify a row uniquely, e.g. ('ayah_id', 'id')
+    or ('-created_at', 'id'), and should be served by an index on the queryset's
+own table so the seek is a range scan. The response is then
+    {"next_cursor": <opaque string or null>, "results": [...]}.
+
+    Without 'cursor' it behaves exactly like CustomLimitOffsetPagination.
+    """
+    cursor_query_param = 'cursor'
+    invalid_cursor_message = 'Invalid cursor'
+
+    def __init__(self, ordering=None):
+        self.ordering = ordering
+        self.use_cursor = False
+
+    def paginate_queryset(self, queryset, request, view=None):
+        if self.cursor_query_param not in request.query_params:
+            self.use_cursor = False
+            return super().paginate_queryset(queryset, request, view)
+
+        self.use_cursor = True
+        self.request = request
+        ordering = self.ordering or getattr(view, 'keyset_ordering')
+        self.limit = self.get_limit(request)
+        position = self.decode_cursor(request, ordering)
+
+        queryset = queryset.order_by(*ordering)
+        if position is not None:
+            try:
+                queryset = queryset.filter(self.get_seek_filter(ordering, position))
+            except (TypeError, ValueError, ValidationError):
+                raise NotFound(self.invalid_cursor_message)
+        # One extra row tells whether there is a next page
+        results = list(queryset[:self.limit + 1])
+        page = results[:self.limit]
+        self.next_cursor = None
+        if len(results) > self.limit:
+            self.next_cursor = self.encode_cursor(ordering, page[-1])
+        return page
+
+    def get_paginated_response(self, data):
+        if not self.use_cursor:
+            return super().get_paginated_response(data)
+        return Response({'next_cursor': self.next_cursor, 'results': data})
+
+    def get_seek_filter(self, ordering, position):
+        """
+        (a, b) > (x, y) spelled out as a > x OR (a = x AND b > y), per field direction.
+
+        The redundant a >= x in front gives the planner an index range to start
+        the scan from, which it does not derive from the OR. A row value
+        comparison would not work for orderings mixing directions.
+        """
+        seek = Q()
+        equal = Q()
+        for field, value in zip(ordering, position):
+            name = field.lstrip('-')
+            lookup = 'lt' if field.startswith('-') else 'gt'
+            seek |= equal & Q(**{f'{name}__{lookup}': value})
+            equal &= Q(**{name: value})
+        first = ordering[0]
+        bound = Q(**{f"{first.lstrip('-')}__{'lte' if first.startswith('-') else 'gte'}": position[0]})
+        return bound & seek
+
+    def encode_cursor(self, ordering, instance):
+        position = []
+        for field in ordering:
+            value = instance
+            for attr in field.lstrip('-').split('__'):
+                value = getattr(value, attr)
+            # Full precision isoformat, DjangoJSONEncoder would drop the microseconds
+            position.append(value.isoformat() if hasattr(value, 'isoformat') else value)
+        return base64.urlsafe_b64encode(json.dumps(position, default=str).encode()).decode()
+
+    def decode_cursor(self, request, ordering):
+        encoded = request.query_params.get(self.cursor_query_param)
+        if not encoded:
+            return None
+        try:
+            position = json.loads(base64.urlsafe_b64decode(encoded.encode()))
+        except (TypeError, ValueError):
+            raise NotFound(self.invalid_cursor_message)
+        if not isinstance(position, list) or len(position) != len(ordering):
+            raise NotFound(self.invalid_cursor_message)
+        return position
+
+    def get_schema_operation_parameters(self, view):
+        parameters = super().get_schema_operation_parameters(view)
+        parameters.append({
+            'name': self.cursor_query_param,
+            'required': False,
+            'in': 'query',
+            'description': 'Opt-in keyset pagination. Pass an empty value for the first page, then the returned next_cursor. Ignores offset.',
+            'schema': {
+                'type': 'string',
+            },
+        })
+        return parameters
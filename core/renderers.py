@@ -0,0 +1,40 @@
+import orjson
+from rest_framework.renderers import JSONRenderer
+from rest_framework.utils import encoders
+
+
+class FastJSONRenderer(JSONRenderer):
+    """
+    Drop-in replacement for DRF's JSONRenderer that encodes with orjson.
+
+    The output is the same as JSONRenderer's compact output: UUIDs, dates, times,
+    timedeltas and Decimals are handed to DRF's JSONEncoder so they keep their
+    current representation. Indented output (`; indent=` or the browsable API)
+    and anything orjson refuses (e.g. integers wider than 64 bits) use JSONRenderer.
+    The only difference is the exponent form of very large or small floats:
+    orjson writes `1e-7` and `1e16` where JSONRenderer writes `1e-07` and
+    `1e+16`. The values parse the same, and finding the floats in a payload
+    would cost more than the encoding saves. Endpoints that return floats
+    (translation search ranks) therefore keep JSONRenderer.
+    """
+    options = orjson.OPT_PASSTHROUGH_DATETIME | orjson.OPT_NON_STR_KEYS
+    default = encoders.JSONEncoder().default
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if data is None:
+            return b''
+
+        if not self.compact or self.ensure_ascii:
+            return super().render(data, accepted_media_type, renderer_context)
+        if self.get_indent(accepted_media_type, renderer_context or {}) is not None:
+            return super().render(data, accepted_media_type, renderer_context)
+
+        try:
+            ret = orjson.dumps(data, default=self.default, option=self.options)
+        except orjson.JSONEncodeError:
+            return super().render(data, accepted_media_type, renderer_context)
+
+        # Same JavaScript-safe escaping as JSONRenderer
+        if b'\xe2\x80\xa8' in ret or b'\xe2\x80\xa9' in ret:
+            ret = ret.replace(b'\xe2\x80\xa8', b'\\u2028').replace(b'\xe2\x80\xa9', b'\\u2029')
+        return ret
@@ -1,3 +1,77 @@
-from django.test import TestCase
+import datetime
+import decimal
+import json
+import uuid
 
-# Create your tests here.
+from django.test import SimpleTestCase
+from django.utils.translation import gettext_lazy
+from rest_framework.renderers import JSONRenderer
+from rest_framework.utils.serializer_helpers import ReturnDict, ReturnList
+
+from core.renderers import FastJSONRenderer
+
+
+class FastJSONRendererTests(SimpleTestCase):
+    def assertSameBytes(self, data, accepted_media_type='application/json'):
+        expected = JSONRenderer().render(data, accepted_media_type)
+        self.assertEqual(FastJSONRenderer().render(data, accepted_media_type), expected)
+
+    def test_api_values_render_byte_for_byte(self):
+        tehran = datetime.timezone(datetime.timedelta(hours=3, minutes=30))
+        self.assertSameBytes({
+            'uuid': uuid.UUID('c305ec4b-ecc1-432d-bb6b-bae65ebb3e19'),
+            'text': 'بِسْمِ اللَّهِ الرَّحْمَٰنِ الرَّحِيمِ',
+            'quote': 'a "quoted" \\ back\tslash\n',
+            'number': 7,
+            'negative': -12,
+            'flags': [True, False, None],
+            'date': datetime.date(2026, 10, 18),
+            'naive': datetime.datetime(2026, 10, 18, 9, 30, 5, 123456),
+            'aware': datetime.datetime(2026, 10, 18, 9, 30, 5, 120000, tzinfo=tehran),
+            'utc': datetime.datetime(2026, 10, 18, 9, 30, tzinfo=datetime.timezone.utc),
+            'time': datetime.time(0, 1, 2, 500000),
+            'duration': datetime.timedelta(minutes=3, seconds=2),
+            'decimal': decimal.Decimal('1.50'),
+            'lazy': gettext_lazy('Not found.'),
+            'empty': {},
+            'nested': [{'surah': 2, 'ayah': 255}, []],
+        })
+
+    def test_serializer_containers_render_byte_for_byte(self):
+        data = ReturnList([ReturnDict({'uuid': uuid.uuid4(), 'number': 1}, serializer=None)], serializer=None)
+        self.assertSameBytes(data)
+        self.assertSameBytes(ReturnDict({'next_cursor': None, 'results': data}, serializer=None))
+
+    def test_integer_keys_render_byte_for_byte(self):
+        self.assertSameBytes({1: 'a', 2: ['b']})
+
+    def test_line_separators_are_escaped(self):
+        self.assertSameBytes({'text': 'a\u2028b\u2029c'})
+        self.assertIn(b'\\u2028', FastJSONRenderer().render({'text': '\u2028'}))
+
+    def test_plain_floats_render_byte_for_byte(self):
+        self.assertSameBytes({'rank': 0.0607927, 'half': 0.5, 'whole': 3.0, 'zero': 0.0, 'large': 123456.789})
+
+    def test_exponent_floats_differ_only_in_notation(self):
+        # The documented difference: orjson drops the exponent's sign and zero padding
+        data = {'tiny': 1e-07, 'huge': 1e+16}
+        fast = FastJSONRenderer().render(data)
+        stdlib = JSONRenderer().render(data)
+        self.assertEqual(fast, b'{"tiny":1e-7,"huge":1e16}')
+        self.assertEqual(stdlib, b'{"tiny":1e-07,"huge":1e+16}')
+        self.assertEqual(json.loads(fast), json.loads(stdlib))
+
+    def test_big_integers_fall_back_to_json_renderer(self):
+        self.assertSameBytes({'big': 2 ** 70})
+
+    def test_indented_output_falls_back_to_json_renderer(self):
+        self.assertSameBytes({'a': [1, 2]}, 'application/json; indent=4')
+
+    def test_none_renders_empty(self):
+        self.assertEqual(FastJSONRenderer().render(None), b'')
+
+    def test_float_endpoints_keep_json_renderer(self):
+        from quran.views.translations.views import TranslationViewSet
+        for action in (TranslationViewSet.search, TranslationViewSet.search_all):
+            self.assertNotIn(FastJSONRenderer, action.kwargs['renderer_classes'])
+            self.assertIn(JSONRenderer, action.kwargs['renderer_classes'])
@@ -12,7 +12,7 @@ from django.conf import settings
 from drf_spectacular.utils import extend_schema, OpenApiParameter, extend_schema_view, OpenApiExample, inline_serializer
 from drf_spectacular.types import OpenApiTypes
 from rest_framework.permissions import IsAuthenticated, DjangoModelPermissions
-from core.pagination import CustomLimitOffsetPagination
+from core.pagination import CustomKeysetPagination
 import boto3
 import pika
 from django.db import connection
@@ -30,7 +30,6 @@ from .serializers import (
     PhraseTranslationSerializer, 
     NotificationSerializer
 )
-from .pagination import CustomLimitOffsetPagination
 from rest_framework import serializers
 
 
@@ -142,7 +141,8 @@ class NotificationViewSet(viewsets.ModelViewSet):
     queryset = Notification.objects.all()
     serializer_class = NotificationSerializer
     permission_classes = [DjangoModelPermissions]
-    pagination_class = CustomLimitOffsetPagination
+    pagination_class = CustomKeysetPagination
+    keyset_ordering = ('-created_at', 'id')
 
     def get_permissions(self):
         if self.action == 'me':
@@ -152,13 +152,22 @@ class NotificationViewSet(viewsets.ModelViewSet):
     @extend_schema(
         summary="Get the current user's notifications (paginated)",
         description="Returns a paginated list of the current user's notifications. Marks notifications in the current page as 'got_notification' if not already marked.",
+        parameters=[
+            OpenApiParameter(
+                name='cursor',
+                type=OpenApiTypes.STR,
+                location=OpenApiParameter.QUERY,
+                required=False,
+                description="Opt-in keyset pagination, newest first. Pass an empty value for the first page, then the returned next_cursor."
+            )
+        ],
         responses={200: NotificationSerializer(many=True)}
     )
     @action(detail=False, methods=['get'])
     def me(self, request):
         notifications = Notification.objects.filter(user=request.user).order_by('-created_at')
-        paginator = CustomLimitOffsetPagination()
-        page = paginator.paginate_queryset(notifications, request)
+        paginator = CustomKeysetPagination()
+        page = paginator.paginate_queryset(notifications, request, view=self)
         # Update status to 'got_notification' only for notifications in the current page
         to_update = []
         for n in page:
@@ -0,0 +1,427 @@
+import hashlib
+import itertools
+import mmap
+import tempfile
+import threading
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from difflib import SequenceMatcher
+from typing import NamedTuple
+
+import requests
+from django.conf import settings
+from django.core.files.base import ContentFile
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+from quran.arabic import normalize_arabic
+from quran.audio import MP3Frames
+
+ALIGNMENT_CLIP_LOCATION = 'alignment'
+# Recordings are streamed to a temporary file in chunks of this many bytes
+RECORDING_CHUNK_SIZE = 1024 * 1024
+
+# Below this similarity a substituted token is not trusted for a word
+MIN_SUBSTITUTION_SCORE = 0.5
+
+
+class WordAlignment(NamedTuple):
+    word_index: int
+    start: float
+    end: float | None
+    # 1.0 for an exact match of the normalized texts, lower for substitutions and merged tokens
+    score: float
+
+
+class AlignmentResult(NamedTuple):
+    alignments: list
+    words_count: int
+
+    @property
+    def coverage(self):
+        """Share of the words that got a timestamp."""
+        return len(self.alignments) / self.words_count if self.words_count else 0.0
+
+    @property
+    def confidence(self):
+        """Mean score over all words, unmatched words count as 0."""
+        return sum(a.score for a in self.alignments) / self.words_count if self.words_count else 0.0
+
+
+def _similarity(a, b):
+    return SequenceMatcher(None, a, b, autojunk=False).ratio()
+
+
+def _align_block(word_texts, word_offset, tokens, token_texts, token_offset):
+    """
+    Align a run of words and tokens that did not match exactly.
+
+    Runs of equal length are paired one to one. Otherwise a token matching the
+    concatenation of consecutive words (a merged word) is split over them in
+    proportion to their length.
+    """
+    if len(word_texts) == len(token_texts):
+        for i, (word_text, token_text) in enumerate(zip(word_texts, token_texts)):
+            score = _similarity(word_text, token_text)
+            if score >= MIN_SUBSTITUTION_SCORE:
+                token = tokens[token_offset + i]
+                yield WordAlignment(word_offset + i, token['start'], token.get('end'), score)
+        return
+
+    w = 0
+    for t, token_text in enumerate(token_texts):
+        if w >= len(word_texts):
+            break
+        token = tokens[token_offset + t]
+        merged = ''
+        for k in range(w, len(word_texts)):
+            merged += word_texts[k]
+            if len(merged) >= len(token_text.replace(' ', '')):
+                break
+        if merged != token_text.replace(' ', '') or token.get('end') is None:
+            continue
+        span = word_texts[w:k + 1]
+        total = sum(len(text) for text in span) or 1
+        start, duration = token['start'], token['end'] - token['start']
+        for i, text in enumerate(span):
+            end = start + duration * len(text) / total
+            # Split timings are estimates
+            yield WordAlignment(word_offset + w + i, start, end, 0.5 if len(span) > 1 else 1.0)
+            start = end
+        w = k + 1
+
+
+def align_words(word_texts, tokens):
+    """
+    Align forced-alignment tokens (`{'text', 'start', 'end'}` dicts) to the words of a text.
+
+    Both sides are compared on normalized Arabic, so tashkeel and letter
+    variants do not break a match. `difflib` finds the matching runs in about
+    linear time for text like the Quran; what is left between two runs is
+    aligned locally, so one bad token only affects its own neighbourhood.
+    Returns an AlignmentResult with one WordAlignment per matched word, in word order.
+    """
+    normalized_words = [normalize_arabic(text) for text in word_texts]
+    normalized_tokens = [normalize_arabic(token['text']) for token in tokens]
+    matcher = SequenceMatcher(None, normalized_words, normalized_tokens, autojunk=False)
+    alignments = []
+    for tag, w1, w2, t1, t2 in matcher.get_opcodes():
+        if tag == 'equal':
+            for i in range(w2 - w1):
+                token = tokens[t1 + i]
+                alignments.append(WordAlignment(w1 + i, token['start'], token.get('end'), 1.0))
+        elif tag == 'replace':
+            alignments.extend(_align_block(normalized_words[w1:w2], w1, tokens, normalized_tokens[t1:t2], t1))
+    return AlignmentResult(alignments, len(word_texts))
+
+
+_session = None
+_session_lock = threading.Lock()
+
+
+def get_aligner_session():
+    """Process-wide HTTP session to the forced alignment service, retrying failed windows with backoff."""
+    global _session
+    with _session_lock:
+        if _session is None:
+            retry = Retry(
+                total=settings.FORCED_ALIGNMENT_RETRIES,
+                backoff_factor=1,
+                status_forcelist=(429, 500, 502, 503, 504),
+                # The aligner is idempotent, so POSTs are retried too
+                allowed_methods=None,
+            )
+            adapter = HTTPAdapter(pool_maxsize=settings.FORCED_ALIGNMENT_MAX_PARALLEL, max_retries=retry)
+            session = requests.Session()
+            session.mount('http://', adapter)
+            session.mount('https://', adapter)
+            if settings.FORCED_ALIGNMENT_SECRET_KEY:
+                session.headers['Authorization'] = settings.FORCED_ALIGNMENT_SECRET_KEY
+            _session = session
+    return _session
+
+
+def ayah_windows(ayah_ids, window_ayahs, overlap_ayahs):
+    """
+    Split words into windows of `window_ayahs` ayahs, consecutive windows sharing `overlap_ayahs` ayahs.
+
+    `ayah_ids` holds the ayah of each word, in order. Returns `(start, end)` word slices.
+    """
+    starts = [i for i, ayah_id in enumerate(ayah_ids) if i == 0 or ayah_id != ayah_ids[i - 1]]
+    starts.append(len(ayah_ids))
+    step = max(window_ayahs - overlap_ayahs, 1)
+    windows = []
+    for first in range(0, len(starts) - 1, step):
+        last = min(first + window_ayahs, len(starts) - 1)
+        windows.append((starts[first], starts[last]))
+        if last == len(starts) - 1:
+            break
+    return windows
+
+
+def request_alignment(audio_url, text):
+    """
+    POST one text to the forced alignment service and return its `{'text', 'start', 'end'}` tokens.
+
+    The service aligns the text to the whole MP3 at `audio_url`, and token
+    times are seconds from its start. To align part of a recording, send a
+    clip of it (see RecordingClips).
+    """
+    response = get_aligner_session().post(
+        f'{settings.FORCED_ALIGNMENT_API_URL}/align',
+        json={
+            'mp3_url': audio_url,
+            'text': text,
+            'language': 'ar'
+        },
+        timeout=settings.FORCED_ALIGNMENT_TIMEOUT
+    )
+    response.raise_for_status()
+    return response.json()
+
+
+def get_clip_storage():
+    from core.views import Storage
+    storage = Storage()
+    storage.location = ALIGNMENT_CLIP_LOCATION
+    # Clips are only fetched by the aligner, through signed URLs
+    storage.default_acl = None
+    return storage
+
+
+class RecordingClips:
+    """
+    A recording sent to the forced alignment service one span at a time.
+
+    The service takes the URL of an MP3 and a text and answers with token times
+    relative to that MP3. Each span is therefore cut out of the recording at
+    frame boundaries and staged in the clip storage. Its URL goes to the
+    service and the clip's start is added back to the token times, so results
+    are in seconds of the whole recording. The recording is streamed to a
+    temporary file and clipped through a memory map, so it is never held in
+    memory as a whole. Staged clips and the file are deleted when the block exits.
+    """
+
+    def __init__(self, audio_url):
+        self.audio_url = audio_url
+        self.file = None
+        self.recording = None
+        self.frames = None
+        self.storage = None
+        self.names = []
+        self.lock = threading.Lock()
+
+    def __enter__(self):
+        self.file = tempfile.TemporaryFile()
+        try:
+            with requests.get(self.audio_url, stream=True, timeout=settings.FORCED_ALIGNMENT_TIMEOUT) as response:
+                response.raise_for_status()
+                for chunk in response.iter_content(chunk_size=RECORDING_CHUNK_SIZE):
+                    self.file.write(chunk)
+            self.file.flush()
+            if self.file.tell():
+                self.recording = mmap.mmap(self.file.fileno(), 0, access=mmap.ACCESS_READ)
+                self.frames = MP3Frames(self.recording)
+            if self.frames is None or not self.frames.duration:
+                raise ValueError(f'{self.audio_url} is not an MP3 recording.')
+        except BaseException:
+            self._close_recording()
+            raise
+        self.storage = get_clip_storage()
+        return self
+
+    def __exit__(self, *exc_info):
+        try:
+            for name in self.names:
+                self.storage.delete(name)
+        finally:
+            self._close_recording()
+
+    def _close_recording(self):
+        if self.recording is not None:
+            self.recording.close()
+            self.recording = None
+        self.file.close()
+
+    @property
+    def duration(self):
+        return self.frames.duration
+
+    def align(self, word_texts, start, end):
+        """
+        Align `word_texts` to the recording between `start` and `end` seconds.
+
+        Returns an AlignmentResult over `word_texts`, timed in seconds of the
+        whole recording. Words the service placed outside `start` to `end` are
+        left unaligned.
+        """
+        if end <= start:
+            return AlignmentResult([], len(word_texts))
+        data, clip_start, _ = self.frames.clip(start, end)
+        name = self.storage.save(f'{uuid.uuid4()}.mp3', ContentFile(data))
+        with self.lock:
+            self.names.append(name)
+        tokens = [
+            {
+                **token,
+                'start': token['start'] + clip_start,
+                'end': None if token.get('end') is None else token['end'] + clip_start,
+            }
+            for token in request_alignment(self.storage.url(name), ' '.join(word_texts))
+        ]
+        result = align_words(word_texts, tokens)
+        return result._replace(alignments=[
+            alignment for alignment in result.alignments
+            if start <= alignment.start and (alignment.end if alignment.end is not None else alignment.start) <= end
+        ])
+
+
+def estimate_audio_spans(word_texts, windows, duration):
+    """
+    Estimated `(start, end)` seconds of the recording holding each `(start, end)` word window.
+
+    Nothing is timed yet, so words are taken to last in proportion to their
+    normalized length. The estimate is exact at both ends of the recording and
+    drifts in between. Each side is therefore widened by
+    FORCED_ALIGNMENT_AUDIO_MARGIN seconds, plus FORCED_ALIGNMENT_AUDIO_DRIFT
+    of the distance to the nearer end.
+    """
+    offsets = list(itertools.accumulate((len(normalize_arabic(text)) + 1 for text in word_texts), initial=0))
+    total = offsets[-1] or 1
+
+    def widen(time, direction):
+        margin = settings.FORCED_ALIGNMENT_AUDIO_MARGIN + settings.FORCED_ALIGNMENT_AUDIO_DRIFT * min(time, duration - time)
+        return min(max(time + direction * margin, 0.0), duration)
+
+    return [
+        (widen(duration * offsets[start] / total, -1), widen(duration * offsets[end] / total, 1))
+        for start, end in windows
+    ]
+
+
+def align_recitation(audio_url, word_texts, ayah_ids):
+    """
+    Force-align a recitation of the words, one overlapping ayah window per request.
+
+    Each window goes with its estimated span of the recording only (see
+    `estimate_audio_spans`), and its times come back in seconds of the whole
+    recording. Windows are sent concurrently (at most
+    FORCED_ALIGNMENT_MAX_PARALLEL at a time) and each is retried on its own, so
+    a slow or failed window does not restart the whole surah. Where windows
+    overlap, the better scored alignment of a word wins. On a tie the one
+    farther from its window's edge wins. Raises if a window still fails after
+    its retries.
+    """
+    windows = ayah_windows(ayah_ids, settings.FORCED_ALIGNMENT_WINDOW_AYAHS, settings.FORCED_ALIGNMENT_WINDOW_OVERLAP)
+    with RecordingClips(audio_url) as clips:
+        spans = estimate_audio_spans(word_texts, windows, clips.duration)
+        with ThreadPoolExecutor(max_workers=settings.FORCED_ALIGNMENT_MAX_PARALLEL) as executor:
+            results = list(executor.map(
+                lambda window, span: clips.align(word_texts[window[0]:window[1]], *span),
+                windows,
+                spans,
+            ))
+
+    best = {}
+    for (start, end), result in zip(windows, results):
+        for alignment in result.alignments:
+            edge_distance = min(alignment.word_index, end - start - 1 - alignment.word_index)
+            word_index = start + alignment.word_index
+            current = best.get(word_index)
+            if current is None or (alignment.score, edge_distance) > current[:2]:
+                best[word_index] = (alignment.score, edge_distance, alignment._replace(word_index=word_index))
+    return AlignmentResult([best[i][2] for i in sorted(best)], len(word_texts))
+
+
+def low_confidence_ranges(result, ayah_ids, min_score):
+    """
+    Word slices `(start, end)` holding unaligned words or words scored below `min_score`.
+
+    Ranges are widened to whole ayahs and adjacent ones merged, so each is a
+    natural unit to send back to the aligner.
+    """
+    scores = {alignment.word_index: alignment.score for alignment in result.alignments}
+    ranges = []
+    for i, ayah_id in enumerate(ayah_ids):
+        if scores.get(i, 0.0) >= min_score:
+            continue
+        if ranges and ranges[-1][1] > i:
+            continue
+        start = i
+        while start > 0 and ayah_ids[start - 1] == ayah_id:
+            start -= 1
+        end = i + 1
+        while end < len(ayah_ids) and ayah_ids[end] == ayah_id:
+            end += 1
+        if ranges and ranges[-1][1] == start:
+            ranges[-1] = (ranges[-1][0], end)
+        else:
+            ranges.append((start, end))
+    return ranges
+
+
+def realign_ranges(audio_url, word_texts, result, ranges):
+    """
+    Send only the `ranges` of words back to the aligner and merge the answers into `result`.
+
+    Each range goes with the clip of the recording between the last
+    confidently aligned word before it and the first one after it, through
+    the same RecordingClips as `align_recitation`. A word takes the new
+    alignment only when it falls inside that span and scores better than the
+    old one. Returns the merged AlignmentResult and the indices of the words
+    whose alignment changed.
+    """
+    by_index = {alignment.word_index: alignment for alignment in result.alignments}
+
+    def audio_span(start, end, duration):
+        before = next((by_index[i] for i in range(start - 1, -1, -1) if i in by_index), None)
+        after = next((by_index[i] for i in range(end, len(word_texts)) if i in by_index), None)
+        span_start = (before.end if before.end is not None else before.start) if before else 0.0
+        span_end = after.start if after else duration
+        return span_start, span_end
+
+    with RecordingClips(audio_url) as clips:
+        spans = [audio_span(start, end, clips.duration) for start, end in ranges]
+        with ThreadPoolExecutor(max_workers=settings.FORCED_ALIGNMENT_MAX_PARALLEL) as executor:
+            results = list(executor.map(
+                lambda word_range, span: clips.align(word_texts[word_range[0]:word_range[1]], *span),
+                ranges,
+                spans,
+            ))
+
+    changed = set()
+    for (start, end), range_result in zip(ranges, results):
+        # RecordingClips.align has already dropped the words placed outside the span
+        for alignment in range_result.alignments:
+            word_index = start + alignment.word_index
+            current = by_index.get(word_index)
+            if current is None or alignment.score > current.score:
+                by_index[word_index] = alignment._replace(word_index=word_index)
+                changed.add(word_index)
+    return AlignmentResult([by_index[i] for i in sorted(by_index)], len(word_texts)), changed
+
+
+def surah_text_hash(word_texts):
+    """SHA256 of the normalized text, the same for every mushaf whose surah reads the same."""
+    return hashlib.sha256(' '.join(normalize_arabic(text) for text in word_texts).encode('utf-8')).hexdigest()
+
+
+def load_cached_alignment(file_hash, text_hash):
+    """AlignmentResult stored for the audio and text hashes, or None."""
+    from quran.models import RecitationAlignment
+    cached = RecitationAlignment.objects.filter(file_hash=file_hash, text_hash=text_hash).first()
+    if cached is None:
+        return None
+    return AlignmentResult([WordAlignment(*alignment) for alignment in cached.alignments], cached.words_count)
+
+
+def save_cached_alignment(file_hash, text_hash, result):
+    from quran.models import RecitationAlignment
+    RecitationAlignment.objects.update_or_create(
+        file_hash=file_hash,
+        text_hash=text_hash,
+        defaults={
+            'alignments': [list(alignment) for alignment in result.alignments],
+            'words_count': result.words_count,
+        },
+    )
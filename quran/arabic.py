@@ -0,0 +1,32 @@
+import re
+
+# Harakat, Quranic annotation marks, superscript alef and tatweel
+TASHKEEL_RE = re.compile(r'[\u0610-\u061A\u064B-\u065F\u0670\u06D6-\u06DC\u06DF-\u06E8\u06EA-\u06ED\u0640]')
+LETTER_VARIANTS = str.maketrans({
+    '\u0622': '\u0627',  # alef with madda
+    '\u0623': '\u0627',  # alef with hamza above
+    '\u0625': '\u0627',  # alef with hamza below
+    '\u0671': '\u0627',  # alef wasla
+    '\u0649': '\u064A',  # alef maksura
+    '\u0626': '\u064A',  # ya with hamza above
+    '\u06CC': '\u064A',  # farsi ya
+    '\u0629': '\u0647',  # ta marbuta
+    '\u0624': '\u0648',  # waw with hamza above
+})
+WHITESPACE_RE = re.compile(r'\s+')
+
+
+def normalize_arabic(text):
+    """
+    Fold Arabic text to the form users type: no tashkeel, and one letter
+    for the alef, ya and ta marbuta variants. Latin letters are casefolded.
+    """
+    if not text:
+        return ''
+    text = TASHKEEL_RE.sub('', text).translate(LETTER_VARIANTS).casefold()
+    return WHITESPACE_RE.sub(' ', text).strip()
+
+
+def search_terms(query):
+    """Split a search query into distinct normalized terms, in order."""
+    return list(dict.fromkeys(normalize_arabic(query).split()))
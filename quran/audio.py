@@ -0,0 +1,103 @@
+import bisect
+
+# Layer III bitrates in kbps by bitrate index, for MPEG-1 and for MPEG-2/2.5; 0 is free format
+_BITRATES = {
+    True: (0, 32, 40, 48, 56, 64, 80, 96, 112, 128, 160, 192, 224, 256, 320, None),
+    False: (0, 8, 16, 24, 32, 40, 48, 56, 64, 80, 96, 112, 128, 144, 160, None),
+}
+# Sample rates by version bits (3 MPEG-1, 2 MPEG-2, 0 MPEG-2.5) and sample rate index
+_SAMPLE_RATES = {
+    3: (44100, 48000, 32000, None),
+    2: (22050, 24000, 16000, None),
+    0: (11025, 12000, 8000, None),
+}
+# Markers of the header frame encoders put before the audio
+_INFO_FRAME_TAGS = (b'Xing', b'Info', b'VBRI')
+
+
+def _frame_header(data, pos):
+    """`(length, seconds)` of the MPEG Layer III frame starting at `pos`, or None if there is none."""
+    if pos + 4 > len(data) or data[pos] != 0xFF or data[pos + 1] & 0xE0 != 0xE0:
+        return None
+    version = (data[pos + 1] >> 3) & 3
+    layer = (data[pos + 1] >> 1) & 3
+    if version not in _SAMPLE_RATES or layer != 1:
+        return None
+    mpeg1 = version == 3
+    bitrate = _BITRATES[mpeg1][data[pos + 2] >> 4]
+    sample_rate = _SAMPLE_RATES[version][(data[pos + 2] >> 2) & 3]
+    if not bitrate or sample_rate is None:
+        return None
+    padding = (data[pos + 2] >> 1) & 1
+    samples = 1152 if mpeg1 else 576
+    return samples // 8 * bitrate * 1000 // sample_rate + padding, samples / sample_rate
+
+
+def _id3v2_size(data):
+    if data[:3] != b'ID3' or len(data) < 10:
+        return 0
+    size = (data[6] & 0x7F) << 21 | (data[7] & 0x7F) << 14 | (data[8] & 0x7F) << 7 | data[9] & 0x7F
+    # A footer repeats the 10 byte header
+    return 10 + size + (10 if data[5] & 0x10 else 0)
+
+
+class MP3Frames:
+    """
+    Index of the audio frames of an MP3 recording, to cut clips out of it without decoding.
+
+    Every Layer III frame holds a fixed number of samples, so the time of each
+    frame is known and a run of whole frames plays on its own. The first frame
+    or two of a clip may lean on a bit reservoir left before the cut; decoders
+    play those as silence, so clip times are good to a frame or two (about 50ms).
+    Tags and the leading Xing/Info/VBRI header frame are left out.
+
+    `data` is the bytes of the recording or an mmap of its file; only the
+    clips are copied out of it.
+    """
+
+    def __init__(self, data):
+        self.data = data
+        self.offsets = []
+        self.times = []
+        self.duration = 0.0
+        pos = _id3v2_size(data)
+        while pos is not None:
+            header = _frame_header(data, pos)
+            if header is None:
+                pos = self._resync(pos + 1)
+                continue
+            length, seconds = header
+            if pos + length > len(data):
+                break
+            if self.offsets or not any(tag in data[pos:pos + 64] for tag in _INFO_FRAME_TAGS):
+                self.offsets.append(pos)
+                self.times.append(self.duration)
+                self.duration += seconds
+            pos += length
+        self.end = self.offsets[-1] + _frame_header(data, self.offsets[-1])[0] if self.offsets else 0
+
+    def _resync(self, pos):
+        """Offset of the next frame header followed by another one, or None at the end of the data."""
+        while True:
+            pos = self.data.find(b'\xff', pos)
+            if pos < 0:
+                return None
+            header = _frame_header(self.data, pos)
+            if header is not None:
+                following = pos + header[0]
+                if following == len(self.data) or _frame_header(self.data, following) is not None:
+                    return pos
+            pos += 1
+
+    def clip(self, start, end):
+        """
+        The whole frames covering `start` to `end` seconds, as MP3 bytes.
+
+        Returns `(data, clip_start, clip_end)`, the clip bounds being the times
+        of its first frame and of the end of its last one.
+        """
+        first = max(bisect.bisect_right(self.times, start) - 1, 0)
+        last = max(bisect.bisect_left(self.times, end), first + 1)
+        stop = self.offsets[last] if last < len(self.offsets) else self.end
+        clip_end = self.times[last] if last < len(self.times) else self.duration
+        return self.data[self.offsets[first]:stop], self.times[first], clip_end
@@ -0,0 +1,174 @@
+from collections import defaultdict
+
+from django.db import transaction
+from django.db.models import F, Min, Q
+
+from quran.models import Ayah, AyahBreaker, AyahBreakerOrdinal, AyahBreakerType, TakhtitWordPosition, Word, WordBreaker
+
+
+def rebuild_ayah_breaker_ordinals(takhtit, breaker_type=None):
+    """
+    Recompute the running breaker numbers of a Takhtit.
+
+    Only the given breaker type is rebuilt when `breaker_type` is set,
+    otherwise every type of the takhtit is. Returns the number of ordinals written.
+    """
+    breakers = AyahBreaker.objects.filter(takhtit=takhtit)
+    ordinals = AyahBreakerOrdinal.objects.filter(takhtit=takhtit)
+    if breaker_type is not None:
+        breakers = breakers.filter(type=breaker_type)
+        ordinals = ordinals.filter(type=breaker_type)
+    rows = breakers.order_by('type', 'ayah__surah__number', 'ayah__number').values_list('type', 'ayah_id')
+
+    counters = defaultdict(int)
+    seen = set()
+    ordinal_objs = []
+    for br_type, ayah_id in rows:
+        # Several breakers of the same type on one ayah still start a single section
+        if (br_type, ayah_id) in seen:
+            continue
+        seen.add((br_type, ayah_id))
+        counters[br_type] += 1
+        ordinal_objs.append(AyahBreakerOrdinal(
+            ayah_id=ayah_id,
+            takhtit_id=takhtit.id,
+            type=br_type,
+            number=counters[br_type],
+        ))
+
+    with transaction.atomic():
+        ordinals.delete()
+        AyahBreakerOrdinal.objects.bulk_create(ordinal_objs)
+    return len(ordinal_objs)
+
+
+def load_ayah_breaker_ordinals(ayah_ids, takhtit_uuid=None):
+    """
+    Return `{ayah_id: [{'name': type, 'number': n}, ...]}` for the given ayahs in two queries.
+
+    Without a takhtit each breaker type is read from the oldest takhtit of the
+    mushaf that has breakers of that type, so all ayahs share one layout.
+    Ayahs that start no section are absent from the result.
+    """
+    ordinals = AyahBreakerOrdinal.objects.filter(ayah_id__in=ayah_ids)
+    if takhtit_uuid is not None:
+        ordinals = ordinals.filter(takhtit__uuid=takhtit_uuid)
+    else:
+        layouts = (
+            AyahBreakerOrdinal.objects
+            .filter(takhtit__mushaf_id__in=Ayah.objects.filter(id__in=ayah_ids).values('surah__mushaf_id'))
+            .values('takhtit__mushaf_id', 'type')
+            .annotate(takhtit_id=Min('takhtit_id'))
+            .values_list('type', 'takhtit_id')
+        )
+        chosen = Q(pk__in=[])
+        for br_type, takhtit_id in layouts:
+            chosen |= Q(type=br_type, takhtit_id=takhtit_id)
+        ordinals = ordinals.filter(chosen)
+    rows = ordinals.order_by('takhtit_id', 'id').values_list('ayah_id', 'type', 'number')
+
+    breakers_by_ayah = {}
+    for ayah_id, br_type, number in rows:
+        breakers_by_ayah.setdefault(ayah_id, []).append({'name': br_type, 'number': number})
+    return breakers_by_ayah
+
+
+def rebuild_takhtit_word_positions(takhtit):
+    """
+    Recompute the page and line of every word of the Takhtit's Mushaf.
+
+    A page breaker starts a new page (and line) at the first word of its ayah,
+    a line breaker starts a new line at its word. Returns the number of rows written.
+    """
+    page_ayah_ids = set(
+        AyahBreaker.objects.filter(takhtit=takhtit, type=AyahBreakerType.PAGE).values_list('ayah_id', flat=True)
+    )
+    line_word_ids = set(
+        WordBreaker.objects.filter(takhtit=takhtit, type='line').values_list('word_id', flat=True)
+    )
+    words = (
+        Word.objects
+        .filter(ayah__surah__mushaf_id=takhtit.mushaf_id)
+        .order_by('ayah__surah__number', 'ayah__number', 'id')
+        .values_list('id', 'ayah_id')
+    )
+
+    page, line = 0, 1
+    previous_ayah_id = None
+    position_objs = []
+    for position, (word_id, ayah_id) in enumerate(words, start=1):
+        if ayah_id != previous_ayah_id and ayah_id in page_ayah_ids:
+            page, line = page + 1, 1
+        elif word_id in line_word_ids and position > 1:
+            line += 1
+        previous_ayah_id = ayah_id
+        position_objs.append(TakhtitWordPosition(
+            takhtit_id=takhtit.id,
+            word_id=word_id,
+            page=page,
+            line=line,
+            position=position,
+        ))
+
+    with transaction.atomic():
+        TakhtitWordPosition.objects.filter(takhtit=takhtit).delete()
+        TakhtitWordPosition.objects.bulk_create(position_objs, batch_size=5000)
+    return len(position_objs)
+
+
+def update_takhtit_word_positions(takhtit, word_id):
+    """
+    Bring the positions up to date after a page or line breaker was added at `word_id`.
+
+    A new breaker only moves words of the page holding it, so just that page is
+    recomputed; if it got split, the later pages are renumbered with one UPDATE.
+    Falls back to `rebuild_takhtit_word_positions` when the word has no position
+    yet. Returns the number of rows changed.
+    """
+    positions = TakhtitWordPosition.objects.filter(takhtit=takhtit)
+    current_page = positions.filter(word_id=word_id).values_list('page', flat=True).first()
+    if current_page is None:
+        return rebuild_takhtit_word_positions(takhtit)
+
+    rows = list(
+        positions
+        .filter(page=current_page)
+        .order_by('position')
+        .values_list('id', 'word_id', 'word__ayah_id', 'page', 'line', 'position')
+    )
+    # Carry the layout on from the last word of the previous page, which does not move
+    previous = (
+        positions
+        .filter(page__lt=current_page)
+        .order_by('-page', '-position')
+        .values_list('page', 'line', 'word__ayah_id')
+        .first()
+    )
+    page, line, previous_ayah_id = previous if previous else (0, 1, None)
+    page_ayah_ids = set(
+        AyahBreaker.objects
+        .filter(takhtit=takhtit, type=AyahBreakerType.PAGE, ayah_id__in={row[2] for row in rows})
+        .values_list('ayah_id', flat=True)
+    )
+    line_word_ids = set(
+        WordBreaker.objects
+        .filter(takhtit=takhtit, type='line', word_id__in=[row[1] for row in rows])
+        .values_list('word_id', flat=True)
+    )
+
+    changed_objs = []
+    for pk, row_word_id, ayah_id, old_page, old_line, position in rows:
+        if ayah_id != previous_ayah_id and ayah_id in page_ayah_ids:
+            page, line = page + 1, 1
+        elif row_word_id in line_word_ids and position > 1:
+            line += 1
+        previous_ayah_id = ayah_id
+        if (page, line) != (old_page, old_line):
+            changed_objs.append(TakhtitWordPosition(id=pk, page=page, line=line))
+
+    with transaction.atomic():
+        shifted = 0
+        if page != current_page:
+            shifted = positions.filter(page__gt=current_page).update(page=F('page') + page - current_page)
+        TakhtitWordPosition.objects.bulk_update(changed_objs, ['page', 'line'])
+    return shifted + len(changed_objs)
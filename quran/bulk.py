@@ -0,0 +1,95 @@
+import io
+
+from django.db import connections, router
+from django.utils import timezone
+
+COPY_BATCH_SIZE = 10000
+_COPY_ESCAPES = str.maketrans({'\\': '\\\\', '\t': '\\t', '\n': '\\n', '\r': '\\r'})
+
+# Fields whose attribute values are written as they are, skipping get_db_prep_save
+_PLAIN_FIELD_TYPES = {
+    'AutoField', 'BigAutoField', 'SmallAutoField', 'IntegerField', 'BigIntegerField', 'SmallIntegerField',
+    'PositiveIntegerField', 'PositiveBigIntegerField', 'PositiveSmallIntegerField',
+    'CharField', 'TextField', 'BooleanField', 'UUIDField', 'ForeignKey',
+}
+
+
+def _copy_text(value):
+    """Format a database value for the COPY text format."""
+    if value is None:
+        return '\\N'
+    if value is True:
+        return 't'
+    if value is False:
+        return 'f'
+    if isinstance(value, int):
+        return str(value)
+    return str(value).translate(_COPY_ESCAPES)
+
+
+def _column_getters(fields, connection, now):
+    """One function per field returning the COPY text of an instance's value, like `Field.pre_save` would."""
+    getters = []
+    for field in fields:
+        if getattr(field, 'auto_now', False) or getattr(field, 'auto_now_add', False):
+            # One timestamp for the whole batch, also set on the instances
+            def getter(obj, attname=field.attname, text=_copy_text(field.get_db_prep_save(now, connection))):
+                setattr(obj, attname, now)
+                return text
+        elif field.get_internal_type() in _PLAIN_FIELD_TYPES:
+            def getter(obj, attname=field.attname):
+                return _copy_text(getattr(obj, attname))
+        else:
+            def getter(obj, field=field):
+                return _copy_text(field.get_db_prep_save(field.pre_save(obj, True), connection))
+        getters.append(getter)
+    return getters
+
+
+def copy_insert(model, objs, batch_size=COPY_BATCH_SIZE, using=None):
+    """
+    Insert unsaved model instances with Postgres `COPY FROM STDIN`, `batch_size` rows at a time.
+
+    Behaves like `bulk_create`: field defaults and auto_now(_add) values are
+    applied, primary keys are set on the instances and no signals are sent.
+    The keys are drawn from the table's sequence with one query per batch, so
+    rows referencing `objs` can be built right away. Other databases fall back
+    to `bulk_create`.
+    """
+    using = using or router.db_for_write(model)
+    connection = connections[using]
+    if connection.vendor != 'postgresql':
+        return model.objects.using(using).bulk_create(objs, batch_size=batch_size)
+
+    opts = model._meta
+    fields = opts.concrete_fields
+    relations = [field for field in fields if field.is_relation]
+    quote_name = connection.ops.quote_name
+    sql = 'COPY {} ({}) FROM STDIN'.format(
+        quote_name(opts.db_table),
+        ', '.join(quote_name(field.column) for field in fields),
+    )
+    with connection.cursor() as cursor:
+        for start in range(0, len(objs), batch_size):
+            batch = objs[start:start + batch_size]
+            without_pk = [obj for obj in batch if obj.pk is None]
+            if without_pk:
+                cursor.execute(
+                    'SELECT nextval(pg_get_serial_sequence(%s, %s)) FROM generate_series(1, %s)',
+                    [opts.db_table, opts.pk.column, len(without_pk)],
+                )
+                for obj, (pk,) in zip(without_pk, cursor.fetchall()):
+                    obj.pk = pk
+            getters = _column_getters(fields, connection, timezone.now())
+            buffer = io.StringIO()
+            for obj in batch:
+                if any(getattr(obj, field.attname) is None for field in relations):
+                    obj._prepare_related_fields_for_save(operation_name='copy_insert')
+                buffer.write('\t'.join([getter(obj) for getter in getters]))
+                buffer.write('\n')
+            buffer.seek(0)
+            cursor.copy_expert(sql, buffer)
+            for obj in batch:
+                obj._state.adding = False
+                obj._state.db = using
+    return objs
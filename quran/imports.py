@@ -0,0 +1,146 @@
+import codecs
+import json
+import uuid
+
+IMPORT_STORAGE_LOCATION = 'imports'
+IMPORT_READ_CHUNK_SIZE = 64 * 1024
+
+
+def get_import_storage():
+    from core.views import Storage
+    storage = Storage()
+    storage.location = IMPORT_STORAGE_LOCATION
+    # Staged uploads are only read back by the workers
+    storage.default_acl = None
+    return storage
+
+
+def stage_import_file(file, kind):
+    """Store an uploaded import file and return its name in the import storage."""
+    return get_import_storage().save(f"{kind}/{uuid.uuid4()}.json", file)
+
+
+class JSONStreamReader:
+    """
+    Decode a JSON document from a binary file piece by piece.
+
+    Only the value being decoded is kept in the buffer, so walking a large
+    top-level array with `iter_array` holds one element in memory at a time.
+    """
+
+    def __init__(self, fp, chunk_size=IMPORT_READ_CHUNK_SIZE):
+        self.fp = fp
+        self.chunk_size = chunk_size
+        self.decoder = json.JSONDecoder()
+        self.utf8 = codecs.getincrementaldecoder('utf-8-sig')()
+        self.buffer = ''
+        self.pos = 0
+        self.eof = False
+
+    def _fill(self, size):
+        if self.eof:
+            return False
+        data = self.fp.read(size)
+        self.eof = not data
+        self.buffer = self.buffer[self.pos:] + self.utf8.decode(data, final=self.eof)
+        self.pos = 0
+        return True
+
+    def peek(self):
+        """Return the next non-whitespace character without consuming it."""
+        while True:
+            while self.pos < len(self.buffer) and self.buffer[self.pos] in ' \t\r\n':
+                self.pos += 1
+            if self.pos < len(self.buffer):
+                return self.buffer[self.pos]
+            if not self._fill(self.chunk_size):
+                raise ValueError('Unexpected end of JSON data.')
+
+    def expect(self, char):
+        found = self.peek()
+        if found != char:
+            raise ValueError(f'Expected {char!r} in JSON data, found {found!r}.')
+        self.pos += 1
+
+    def value(self):
+        """Decode and consume the next complete JSON value."""
+        self.peek()
+        while True:
+            try:
+                value, end = self.decoder.raw_decode(self.buffer, self.pos)
+            except json.JSONDecodeError:
+                # Grow the read size with the pending value, so decoding stays linear
+                if not self._fill(max(self.chunk_size, len(self.buffer))):
+                    raise
+                continue
+            # A number at the end of the buffer may go on in the next chunk
+            if end == len(self.buffer) and self._fill(self.chunk_size):
+                continue
+            self.pos = end
+            return value
+
+    def iter_array(self):
+        """Yield the elements of the array starting at the current position."""
+        self.expect('[')
+        if self.peek() == ']':
+            self.pos += 1
+            return
+        while True:
+            yield self.value()
+            separator = self.peek()
+            self.pos += 1
+            if separator == ']':
+                return
+            if separator != ',':
+                raise ValueError(f"Expected ',' or ']' in JSON array, found {separator!r}.")
+
+    def iter_object_keys(self):
+        """
+        Yield the keys of the object starting at the current position.
+
+        The caller must consume each key's value (with `value` or `iter_array`)
+        before asking for the next key.
+        """
+        self.expect('{')
+        if self.peek() == '}':
+            self.pos += 1
+            return
+        while True:
+            key = self.value()
+            if not isinstance(key, str):
+                raise ValueError('JSON object keys must be strings.')
+            self.expect(':')
+            yield key
+            separator = self.peek()
+            self.pos += 1
+            if separator == '}':
+                return
+            if separator != ',':
+                raise ValueError(f"Expected ',' or '}}' in JSON object, found {separator!r}.")
+
+
+def read_json_fields(fp, streamed_key):
+    """
+    Return the top-level fields of a JSON object file except `streamed_key`.
+
+    The `streamed_key` array is skipped one element at a time.
+    """
+    reader = JSONStreamReader(fp)
+    fields = {}
+    for key in reader.iter_object_keys():
+        if key == streamed_key:
+            for _ in reader.iter_array():
+                pass
+        else:
+            fields[key] = reader.value()
+    return fields
+
+
+def iter_json_array_field(fp, key):
+    """Yield the elements of the top-level `key` array of a JSON object file, one at a time."""
+    reader = JSONStreamReader(fp)
+    for found in reader.iter_object_keys():
+        if found == key:
+            yield from reader.iter_array()
+        else:
+            reader.value()
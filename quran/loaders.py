@@ -0,0 +1,46 @@
+from django.db.models import Count, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+from quran.models import Ayah, Word, WordBreaker
+
+
+def load_ayah_words(ayah_ids):
+    """Return `{ayah_id: [Word, ...]}` with words in creation order, in one query."""
+    words_by_ayah = {}
+    words = Word.objects.filter(ayah_id__in=ayah_ids).only('id', 'ayah_id', 'text').order_by('ayah_id', 'id')
+    for word in words:
+        words_by_ayah.setdefault(word.ayah_id, []).append(word)
+    return words_by_ayah
+
+
+def load_word_breakers(ayah_ids, takhtit_uuid=None):
+    """Return `{word_id: [{'name': type}, ...]}` for every word of the given ayahs, in one query."""
+    word_breakers = WordBreaker.objects.filter(word__ayah_id__in=ayah_ids)
+    if takhtit_uuid is not None:
+        word_breakers = word_breakers.filter(takhtit__uuid=takhtit_uuid)
+    breakers_by_word = {}
+    for word_id, br_type in word_breakers.order_by('id').values_list('word_id', 'type'):
+        breakers_by_word.setdefault(word_id, []).append({'name': br_type})
+    return breakers_by_word
+
+
+def with_ayah_stats(surahs):
+    """
+    Annotate a Surah queryset with what SurahSerializer reports about its ayahs.
+
+    Adds `ayahs_count`, `first_ayah_is_bismillah` and `first_ayah_bismillah_text`
+    so a surah listing is served in a single query.
+    """
+    first_ayah = Ayah.objects.filter(surah=OuterRef('pk')).order_by('number')
+    ayahs_count = (
+        Ayah.objects.filter(surah=OuterRef('pk'))
+        .order_by()
+        .values('surah')
+        .annotate(count=Count('id'))
+        .values('count')
+    )
+    return surahs.annotate(
+        ayahs_count=Coalesce(Subquery(ayahs_count), 0),
+        first_ayah_is_bismillah=Subquery(first_ayah.values('is_bismillah')[:1]),
+        first_ayah_bismillah_text=Subquery(first_ayah.values('bismillah_text')[:1]),
+    )
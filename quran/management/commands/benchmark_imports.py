@@ -0,0 +1,126 @@
+import json
+import random
+import tempfile
+import time
+import uuid
+from unittest import mock
+
+from django.contrib.auth import get_user_model
+from django.core.files.base import ContentFile
+from django.core.files.storage import FileSystemStorage
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+
+from core.models import Notification
+from quran.models import AyahTranslation, Mushaf, Word
+
+# Ayahs per surah of the Hafs mushaf, so the generated import has the real shape
+SURAH_AYAHS = [
+    7, 286, 200, 176, 120, 165, 206, 75, 129, 109, 123, 111, 43, 52, 99, 128, 111, 110, 98, 135,
+    112, 78, 118, 64, 77, 227, 93, 88, 69, 60, 34, 30, 73, 54, 45, 83, 182, 88, 75, 85,
+    54, 53, 89, 59, 37, 35, 38, 29, 18, 45, 60, 49, 62, 55, 78, 96, 29, 22, 24, 13,
+    14, 11, 11, 18, 12, 12, 30, 52, 52, 44, 28, 28, 20, 56, 40, 31, 50, 40, 46, 42,
+    29, 19, 36, 25, 22, 17, 19, 26, 30, 20, 15, 21, 11, 8, 8, 19, 5, 8, 8, 11,
+    11, 8, 3, 9, 5, 4, 7, 3, 6, 3, 5, 4, 5, 6,
+]
+LETTERS = 'ابتثجحخدذرزسشصضطظعغفقكلمنهوي'
+TRANSLATION_WORDS = ['mercy', 'lord', 'the', 'worlds', 'praise', 'guide', 'path', 'day', 'judgement', 'those']
+
+
+class Command(BaseCommand):
+    help = (
+        "Time import_mushaf_task and import_translation_task on a generated full-size mushaf "
+        "(114 surahs, 6236 ayahs, about 77k words) and an English translation of it. "
+        "The imported rows are deleted afterwards."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--username', help='User the imports run as. Defaults to the first superuser.')
+        parser.add_argument('--seed', type=int, default=1, help='Seed of the generated text.')
+        parser.add_argument('--keep', action='store_true', help='Keep the imported mushaf and translation.')
+
+    def handle(self, *args, **options):
+        from quran import tasks
+
+        user = self.get_user(options['username'])
+        rng = random.Random(options['seed'])
+        short_name = f'benchmark-{uuid.uuid4().hex[:8]}'
+        mushaf_data = self.generate_mushaf(rng, short_name)
+        translation_data = self.generate_translation(rng, short_name, user.username)
+        words = sum(len(ayah['words']) for surah in mushaf_data['surahs'] for ayah in surah['ayahs'])
+        self.stdout.write(f'{len(SURAH_AYAHS)} surahs, {sum(SURAH_AYAHS)} ayahs, {words} words')
+
+        last_notification_id = Notification.objects.order_by('-id').values_list('id', flat=True).first() or 0
+        with tempfile.TemporaryDirectory() as location:
+            storage = FileSystemStorage(location=location)
+            file_name = storage.save('mushafs/benchmark.json', ContentFile(json.dumps(mushaf_data, ensure_ascii=False).encode()))
+            # The staged file is read back from a local directory instead of the bucket
+            with mock.patch.object(tasks, 'get_import_storage', return_value=storage):
+                self.run_timed('mushaf import', tasks.import_mushaf_task, file_name, user.id)
+            self.run_timed('translation import', tasks.import_translation_task, translation_data, user.id)
+
+        mushaf = Mushaf.objects.filter(short_name=short_name).first()
+        if mushaf is None:
+            raise CommandError('The mushaf import failed, see the notifications of the user.')
+        self.stdout.write(
+            f'imported {Word.objects.filter(ayah__surah__mushaf=mushaf).count()} words and '
+            f'{AyahTranslation.objects.filter(translation__mushaf=mushaf).count()} ayah translations'
+        )
+        if not options['keep']:
+            mushaf.delete()
+            Notification.objects.filter(user=user, id__gt=last_notification_id).delete()
+
+    def run_timed(self, label, task, *args):
+        with CaptureQueriesContext(connection) as queries:
+            start = time.perf_counter()
+            result = task(*args)
+            elapsed = time.perf_counter() - start
+        self.stdout.write(f'{label}: {elapsed:.2f}s, {len(queries)} queries ({result})')
+
+    def get_user(self, username):
+        User = get_user_model()
+        if username:
+            user = User.objects.filter(username=username).first()
+        else:
+            user = User.objects.filter(is_superuser=True).order_by('id').first()
+        if user is None:
+            raise CommandError('No user to run the imports as; pass --username.')
+        return user
+
+    def generate_mushaf(self, rng, short_name):
+        def word():
+            return ''.join(rng.choice(LETTERS) + 'َ' for _ in range(rng.randint(2, 6)))
+
+        surahs = []
+        for number, ayahs_count in enumerate(SURAH_AYAHS, start=1):
+            ayahs = [
+                {
+                    'number': ayah_number,
+                    'sajdah': None,
+                    'is_bismillah': False,
+                    'bismillah_text': None,
+                    'words': [{'text': word()} for _ in range(rng.randint(9, 16))],
+                }
+                for ayah_number in range(1, ayahs_count + 1)
+            ]
+            surahs.append({'number': number, 'name': f'Surah {number}', 'period': 'makki', 'ayahs': ayahs})
+        return {'mushaf': {'name': 'Benchmark', 'short_name': short_name, 'source': 'benchmark'}, 'surahs': surahs}
+
+    def generate_translation(self, rng, short_name, translator_username):
+        return {
+            'translator_username': translator_username,
+            'mushaf': short_name,
+            'source': 'benchmark',
+            'language': 'en',
+            'surahs': [
+                {
+                    'number': number,
+                    'ayah_translations': [
+                        {'number': ayah_number, 'text': ' '.join(rng.choice(TRANSLATION_WORDS) for _ in range(25))}
+                        for ayah_number in range(1, ayahs_count + 1)
+                    ],
+                }
+                for number, ayahs_count in enumerate(SURAH_AYAHS, start=1)
+            ],
+        }
@@ -0,0 +1,54 @@
+# Generated by Django 5.1.7 on 2026-10-17 23:41
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+def populate_ayah_breaker_ordinals(apps, schema_editor):
+    AyahBreaker = apps.get_model('quran', 'AyahBreaker')
+    AyahBreakerOrdinal = apps.get_model('quran', 'AyahBreakerOrdinal')
+    rows = (
+        AyahBreaker.objects
+        .filter(takhtit__isnull=False)
+        .order_by('takhtit_id', 'type', 'ayah__surah__number', 'ayah__number')
+        .values_list('takhtit_id', 'type', 'ayah_id')
+    )
+    counters = {}
+    seen = set()
+    ordinal_objs = []
+    for takhtit_id, br_type, ayah_id in rows:
+        if (takhtit_id, br_type, ayah_id) in seen:
+            continue
+        seen.add((takhtit_id, br_type, ayah_id))
+        counters[(takhtit_id, br_type)] = counters.get((takhtit_id, br_type), 0) + 1
+        ordinal_objs.append(AyahBreakerOrdinal(
+            ayah_id=ayah_id,
+            takhtit_id=takhtit_id,
+            type=br_type,
+            number=counters[(takhtit_id, br_type)],
+        ))
+    AyahBreakerOrdinal.objects.bulk_create(ordinal_objs, batch_size=5000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('quran', '0006_remove_wordbreaker_name_wordbreaker_takhtit_and_more'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='AyahBreakerOrdinal',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('type', models.CharField(choices=[('page', 'Page'), ('juz', 'Juz'), ('hizb', 'Hizb'), ('rub', 'Rub'), ('manzil', 'Manzil'), ('ruku', 'Ruku')], max_length=20)),
+                ('number', models.IntegerField()),
+                ('ayah', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='breaker_ordinals', to='quran.ayah')),
+                ('takhtit', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='ayah_breaker_ordinals', to='quran.takhtit')),
+            ],
+            options={
+                'unique_together': {('ayah', 'takhtit', 'type')},
+            },
+        ),
+        migrations.RunPython(populate_ayah_breaker_ordinals, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,33 @@
+# Generated by Django 5.1.7 on 2026-10-17 23:43
+
+import django.db.models.deletion
+import uuid
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('quran', '0007_ayahbreakerordinal'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='MushafSnapshot',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('uuid', models.UUIDField(default=uuid.uuid4, editable=False, unique=True)),
+                ('version', models.IntegerField()),
+                ('path', models.CharField(max_length=255)),
+                ('etag', models.CharField(max_length=64)),
+                ('size', models.BigIntegerField()),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('mushaf', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='snapshots', to='quran.mushaf')),
+            ],
+            options={
+                'ordering': ['-version'],
+                'unique_together': {('mushaf', 'version')},
+            },
+        ),
+    ]
@@ -0,0 +1,28 @@
+# Generated by Django 5.1.7 on 2026-10-17 23:46
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('quran', '0008_mushafsnapshot'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='mushaf',
+            name='content_version',
+            field=models.PositiveIntegerField(default=1),
+        ),
+        migrations.AddField(
+            model_name='takhtit',
+            name='content_version',
+            field=models.PositiveIntegerField(default=1),
+        ),
+        migrations.AddField(
+            model_name='translation',
+            name='content_version',
+            field=models.PositiveIntegerField(default=1),
+        ),
+    ]
@@ -0,0 +1,68 @@
+# Generated by Django 5.1.7 on 2026-10-17 23:52
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+def populate_takhtit_word_positions(apps, schema_editor):
+    Takhtit = apps.get_model('quran', 'Takhtit')
+    AyahBreaker = apps.get_model('quran', 'AyahBreaker')
+    WordBreaker = apps.get_model('quran', 'WordBreaker')
+    Word = apps.get_model('quran', 'Word')
+    TakhtitWordPosition = apps.get_model('quran', 'TakhtitWordPosition')
+    for takhtit in Takhtit.objects.all():
+        page_ayah_ids = set(
+            AyahBreaker.objects.filter(takhtit=takhtit, type='page').values_list('ayah_id', flat=True)
+        )
+        line_word_ids = set(
+            WordBreaker.objects.filter(takhtit=takhtit, type='line').values_list('word_id', flat=True)
+        )
+        words = (
+            Word.objects
+            .filter(ayah__surah__mushaf_id=takhtit.mushaf_id)
+            .order_by('ayah__surah__number', 'ayah__number', 'id')
+            .values_list('id', 'ayah_id')
+        )
+        page, line = 0, 1
+        previous_ayah_id = None
+        position_objs = []
+        for position, (word_id, ayah_id) in enumerate(words, start=1):
+            if ayah_id != previous_ayah_id and ayah_id in page_ayah_ids:
+                page, line = page + 1, 1
+            elif word_id in line_word_ids and position > 1:
+                line += 1
+            previous_ayah_id = ayah_id
+            position_objs.append(TakhtitWordPosition(
+                takhtit_id=takhtit.id,
+                word_id=word_id,
+                page=page,
+                line=line,
+                position=position,
+            ))
+        TakhtitWordPosition.objects.bulk_create(position_objs, batch_size=5000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('quran', '0009_content_version'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='TakhtitWordPosition',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('page', models.IntegerField()),
+                ('line', models.IntegerField()),
+                ('position', models.IntegerField()),
+                ('takhtit', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='word_positions', to='quran.takhtit')),
+                ('word', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='takhtit_positions', to='quran.word')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['takhtit', 'page', 'position'], name='quran_takht_takhtit_833a96_idx')],
+                'unique_together': {('takhtit', 'word')},
+            },
+        ),
+        migrations.RunPython(populate_takhtit_word_positions, migrations.RunPython.noop),
+    ]
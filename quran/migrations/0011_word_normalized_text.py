@@ -0,0 +1,42 @@
+# Generated by Django 5.1.7 on 2026-10-17 23:53
+
+import django.contrib.postgres.indexes
+from django.conf import settings
+from django.contrib.postgres.operations import TrigramExtension
+from django.db import migrations, models
+
+from quran.arabic import normalize_arabic
+
+
+def populate_normalized_text(apps, schema_editor):
+    Word = apps.get_model('quran', 'Word')
+    batch = []
+    for word in Word.objects.only('id', 'text').iterator(chunk_size=5000):
+        word.normalized_text = normalize_arabic(word.text)
+        batch.append(word)
+        if len(batch) == 5000:
+            Word.objects.bulk_update(batch, ['normalized_text'])
+            batch = []
+    Word.objects.bulk_update(batch, ['normalized_text'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('quran', '0010_takhtitwordposition'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        TrigramExtension(),
+        migrations.AddField(
+            model_name='word',
+            name='normalized_text',
+            field=models.TextField(default='', editable=False),
+        ),
+        migrations.RunPython(populate_normalized_text, migrations.RunPython.noop),
+        migrations.AddIndex(
+            model_name='word',
+            index=django.contrib.postgres.indexes.GinIndex(fields=['normalized_text'], name='word_normalized_text_trgm', opclasses=['gin_trgm_ops']),
+        ),
+    ]
@@ -0,0 +1,70 @@
+# Generated by Django 5.1.7 on 2026-10-17 23:55
+
+import django.contrib.postgres.indexes
+import django.contrib.postgres.search
+from django.conf import settings
+from django.contrib.postgres.search import SearchVector
+from django.db import migrations
+
+# quran.search.TEXT_SEARCH_CONFIGS as of this migration; importing it would load the live models
+TEXT_SEARCH_CONFIGS = {
+    'ar': 'arabic',
+    'ca': 'catalan',
+    'da': 'danish',
+    'de': 'german',
+    'el': 'greek',
+    'en': 'english',
+    'es': 'spanish',
+    'eu': 'basque',
+    'fi': 'finnish',
+    'fr': 'french',
+    'ga': 'irish',
+    'hi': 'hindi',
+    'hu': 'hungarian',
+    'hy': 'armenian',
+    'id': 'indonesian',
+    'it': 'italian',
+    'lt': 'lithuanian',
+    'nb': 'norwegian',
+    'ne': 'nepali',
+    'nl': 'dutch',
+    'no': 'norwegian',
+    'pt': 'portuguese',
+    'ro': 'romanian',
+    'ru': 'russian',
+    'sr': 'serbian',
+    'sv': 'swedish',
+    'ta': 'tamil',
+    'tr': 'turkish',
+    'yi': 'yiddish',
+}
+
+
+def populate_search_vectors(apps, schema_editor):
+    Translation = apps.get_model('quran', 'Translation')
+    AyahTranslation = apps.get_model('quran', 'AyahTranslation')
+    for translation_id, language in Translation.objects.values_list('id', 'language'):
+        AyahTranslation.objects.filter(translation_id=translation_id).update(
+            search_vector=SearchVector('text', config=TEXT_SEARCH_CONFIGS.get(language, 'simple'))
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('quran', '0011_word_normalized_text'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='ayahtranslation',
+            name='search_vector',
+            field=django.contrib.postgres.search.SearchVectorField(editable=False, null=True),
+        ),
+        migrations.RunPython(populate_search_vectors, migrations.RunPython.noop),
+        migrations.AddIndex(
+            model_name='ayahtranslation',
+            index=django.contrib.postgres.indexes.GinIndex(fields=['search_vector'], name='ayahtranslation_search_gin'),
+        ),
+    ]
@@ -0,0 +1,28 @@
+# Generated by Django 5.1.7 on 2026-10-18 00:07
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('quran', '0012_ayahtranslation_search_vector'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='RecitationAlignment',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('file_hash', models.CharField(max_length=64)),
+                ('text_hash', models.CharField(max_length=64)),
+                ('alignments', models.JSONField()),
+                ('words_count', models.IntegerField()),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'unique_together': {('file_hash', 'text_hash')},
+            },
+        ),
+    ]
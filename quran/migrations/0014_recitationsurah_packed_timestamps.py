@@ -0,0 +1,66 @@
+# Generated by Django 5.1.7 on 2026-10-18 00:09
+
+import struct
+
+from django.db import migrations, models
+
+# quran.timestamps as of this migration; importing it would load the live models
+_PACKED_ENTRY = struct.Struct('<iii')
+NONE = -1
+
+
+def time_to_ms(value):
+    return ((value.hour * 60 + value.minute) * 60 + value.second) * 1000 + value.microsecond // 1000
+
+
+def pack_timestamps(entries):
+    return b''.join(
+        _PACKED_ENTRY.pack(NONE if word_ordinal is None else word_ordinal, start_ms, NONE if end_ms is None else end_ms)
+        for word_ordinal, start_ms, end_ms in entries
+    )
+
+
+def pack_existing_timestamps(apps, schema_editor):
+    RecitationSurah = apps.get_model('quran', 'RecitationSurah')
+    RecitationSurahTimestamp = apps.get_model('quran', 'RecitationSurahTimestamp')
+    Word = apps.get_model('quran', 'Word')
+    for recitation_surah in RecitationSurah.objects.filter(timestamps__isnull=False).select_related('surah__mushaf').distinct():
+        word_ordinals = {
+            word_id: ordinal
+            for ordinal, word_id in enumerate(
+                Word.objects.filter(ayah__surah_id=recitation_surah.surah_id).order_by('ayah__number', 'id').values_list('id', flat=True)
+            )
+        }
+        rows = (
+            RecitationSurahTimestamp.objects
+            .filter(recitation_surah=recitation_surah)
+            .order_by('start_time', 'id')
+            .values_list('word_id', 'start_time', 'end_time')
+        )
+        recitation_surah.packed_timestamps = pack_timestamps(
+            (word_ordinals.get(word_id), time_to_ms(start_time), time_to_ms(end_time) if end_time else None)
+            for word_id, start_time, end_time in rows
+        )
+        recitation_surah.packed_mushaf_version = recitation_surah.surah.mushaf.content_version
+        recitation_surah.save(update_fields=['packed_timestamps', 'packed_mushaf_version'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('quran', '0013_recitationalignment'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='recitationsurah',
+            name='packed_timestamps',
+            field=models.BinaryField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='recitationsurah',
+            name='packed_mushaf_version',
+            field=models.PositiveIntegerField(blank=True, editable=False, null=True),
+        ),
+        migrations.RunPython(pack_existing_timestamps, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,23 @@
+# Generated by Django 5.1.7 on 2026-10-18 00:21
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('quran', '0014_recitationsurah_packed_timestamps'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='ayahtranslation',
+            index=models.Index(fields=['translation', 'ayah', 'id'], name='quran_ayaht_transla_05199c_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='word',
+            index=models.Index(fields=['ayah', 'id'], name='quran_word_ayah_id_ef0965_idx'),
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.1.7 on 2026-10-18 00:39
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('quran', '0015_ayahtranslation_quran_ayaht_transla_05199c_idx_and_more'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='mushafsnapshot',
+            name='source_version',
+            field=models.TextField(default='', editable=False),
+        ),
+    ]
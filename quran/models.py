@@ -1,3 +1,5 @@
+from django.contrib.postgres.indexes import GinIndex
+from django.contrib.postgres.search import SearchVectorField
 from django.db import models
 from account.models import CustomUser
 from core.models import File
@@ -15,6 +17,7 @@ class Mushaf(models.Model):
     name = models.TextField()
     source = models.TextField(default="")
     status = models.CharField(max_length=50, choices=Status.choices, default=Status.DRAFT)
+    content_version = models.PositiveIntegerField(default=1)  # bumped by quran.versions when any descendant row changes
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
@@ -74,9 +77,17 @@ class Word(models.Model):
     creator = models.ForeignKey(CustomUser, on_delete=models.CASCADE, related_name='words')
     ayah = models.ForeignKey(Ayah, on_delete=models.CASCADE, related_name='words')
     text = models.TextField()
+    normalized_text = models.TextField(default="", editable=False)  # quran.arabic.normalize_arabic(text), kept by quran.signals
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
+    class Meta:
+        indexes = [
+            GinIndex(fields=['normalized_text'], opclasses=['gin_trgm_ops'], name='word_normalized_text_trgm'),
+            # Keyset pagination order
+            models.Index(fields=['ayah', 'id']),
+        ]
+
     def __str__(self):
         return self.text
 
@@ -90,6 +101,7 @@ class Translation(models.Model):
     source = models.CharField(max_length=300, blank=True, null=True)
     # approved = models.BooleanField(default=False)
     status = models.CharField(max_length=50, choices=Status.choices, default=Status.DRAFT)
+    content_version = models.PositiveIntegerField(default=1)  # bumped by quran.versions when any AyahTranslation changes
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
@@ -106,11 +118,17 @@ class AyahTranslation(models.Model):
     ayah = models.ForeignKey(Ayah, on_delete=models.CASCADE, related_name='translations')
     text = models.TextField()
     bismillah = models.TextField(blank=True, null=True)
+    search_vector = SearchVectorField(null=True, editable=False)  # text in the translation language's config, kept by quran.signals
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
-    #class Meta:
-    #    unique_together = ['translation', 'ayah']
+    class Meta:
+        #unique_together = ['translation', 'ayah']
+        indexes = [
+            GinIndex(fields=['search_vector'], name='ayahtranslation_search_gin'),
+            # Keyset pagination order of a translation's ayahs
+            models.Index(fields=['translation', 'ayah', 'id']),
+        ]
 
     def __str__(self):
         return f"{self.translation.language} - {self.ayah}"
@@ -128,6 +146,7 @@ class Takhtit(models.Model):
     creator = models.ForeignKey(CustomUser, on_delete=models.CASCADE, related_name='takhtits')
     mushaf = models.ForeignKey(Mushaf, on_delete=models.CASCADE, related_name='takhtits')
     account = models.ForeignKey(CustomUser, on_delete=models.CASCADE, related_name='takhtit_accounts')
+    content_version = models.PositiveIntegerField(default=1)  # bumped by quran.versions when any breaker changes
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
@@ -147,6 +166,22 @@ class AyahBreaker(models.Model):
     def __str__(self):
         return f"{self.type} - {self.ayah}"
 
+class AyahBreakerOrdinal(models.Model):
+    """Running number of a breaker type at an ayah within a Takhtit (e.g. page 23 starts here).
+
+    Rows are derived from AyahBreaker and rebuilt by quran.breakers whenever breakers change.
+    """
+    ayah = models.ForeignKey(Ayah, on_delete=models.CASCADE, related_name='breaker_ordinals')
+    takhtit = models.ForeignKey(Takhtit, on_delete=models.CASCADE, related_name='ayah_breaker_ordinals')
+    type = models.CharField(max_length=20, choices=AyahBreakerType.choices)
+    number = models.IntegerField()
+
+    class Meta:
+        unique_together = ['ayah', 'takhtit', 'type']
+
+    def __str__(self):
+        return f"{self.type} {self.number} - {self.ayah_id}"
+
 class WordBreaker(models.Model):
     uuid = models.UUIDField(default=uuid.uuid4, editable=False, unique=True)
     creator = models.ForeignKey(CustomUser, on_delete=models.CASCADE, related_name='word_breakers')
@@ -163,6 +198,25 @@ class WordBreaker(models.Model):
     def __str__(self):
         return f"{self.type} - {self.word}"
 
+class TakhtitWordPosition(models.Model):
+    """Page and line of every word of the Mushaf in a Takhtit's layout.
+
+    Rows are derived from the page AyahBreakers and line WordBreakers and rebuilt
+    by quran.breakers whenever they change, so a page is one index range scan.
+    """
+    takhtit = models.ForeignKey(Takhtit, on_delete=models.CASCADE, related_name='word_positions')
+    word = models.ForeignKey(Word, on_delete=models.CASCADE, related_name='takhtit_positions')
+    page = models.IntegerField()  # 0 for words before the first page breaker
+    line = models.IntegerField()
+    position = models.IntegerField()  # ordinal of the word in the Mushaf
+
+    class Meta:
+        unique_together = ['takhtit', 'word']
+        indexes = [models.Index(fields=['takhtit', 'page', 'position'])]
+
+    def __str__(self):
+        return f"page {self.page} line {self.line} - {self.word_id}"
+
 class Recitation(models.Model):
     uuid = models.UUIDField(default=uuid.uuid4, editable=False, unique=True)
     creator = models.ForeignKey(CustomUser, on_delete=models.CASCADE, related_name='recitations')
@@ -185,6 +239,10 @@ class RecitationSurah(models.Model):
     recitation = models.ForeignKey(Recitation, on_delete=models.CASCADE, related_name='recitation_surahs')
     surah = models.ForeignKey(Surah, on_delete=models.CASCADE, related_name='recitation_surahs')
     file = models.ForeignKey(File, on_delete=models.CASCADE, related_name='recitation_surahs')
+    # Word timestamps packed by quran.timestamps, read instead of the RecitationSurahTimestamp rows
+    packed_timestamps = models.BinaryField(null=True, blank=True, editable=False)
+    # Mushaf content_version the packed word ordinals were taken at; other versions are packed again on read
+    packed_mushaf_version = models.PositiveIntegerField(null=True, blank=True, editable=False)
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
@@ -207,4 +265,39 @@ class RecitationSurahTimestamp(models.Model):
         ordering = ['start_time']
 
     def __str__(self):
-        return f"Timestamp for {self.recitation_surah} at {self.start_time}"
\ No newline at end of file
+        return f"Timestamp for {self.recitation_surah} at {self.start_time}"
+
+class RecitationAlignment(models.Model):
+    """Forced alignment of one audio file to one surah text, reused for any recitation of the same pair."""
+    file_hash = models.CharField(max_length=64)  # File.file_hash of the audio
+    text_hash = models.CharField(max_length=64)  # SHA256 of the normalized surah text
+    # [word_index, start, end, score] per aligned word, times in seconds
+    alignments = models.JSONField()
+    words_count = models.IntegerField()
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        unique_together = ['file_hash', 'text_hash']
+
+    def __str__(self):
+        return f"Alignment of {self.file_hash[:12]} to {self.text_hash[:12]}"
+
+class MushafSnapshot(models.Model):
+    """Compiled, gzip-compressed JSON copy of a whole Mushaf kept in object storage for offline clients."""
+    uuid = models.UUIDField(default=uuid.uuid4, editable=False, unique=True)
+    mushaf = models.ForeignKey(Mushaf, on_delete=models.CASCADE, related_name='snapshots')
+    version = models.IntegerField()
+    path = models.CharField(max_length=255)
+    etag = models.CharField(max_length=64)  # SHA256 of the stored bytes
+    size = models.BigIntegerField()  # size in bytes
+    source_version = models.TextField(default="", editable=False)  # quran.snapshots.snapshot_source_version it was built from
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        ordering = ['-version']
+        unique_together = ['mushaf', 'version']
+
+    def __str__(self):
+        return f"{self.mushaf} snapshot v{self.version}"
@@ -0,0 +1,67 @@
+import re
+
+from quran.models import Ayah
+from quran.structure import get_mushaf_structure
+
+VERSE_REFERENCE_RE = re.compile(r'^\s*(\d+)\s*:\s*(\d+)\s*(?:-\s*(\d+)\s*)?$')
+
+
+def parse_verse_reference(reference):
+    """
+    Parse '2:255' or '2:1-5' into `(surah, first_ayah, last_ayah)`.
+
+    Raises ValueError for anything else, including reversed ranges.
+    """
+    match = VERSE_REFERENCE_RE.match(reference) if isinstance(reference, str) else None
+    if match is None:
+        raise ValueError(f"Invalid verse reference: {reference!r}. Expected 'surah:ayah' or 'surah:first-last'.")
+    surah, first = int(match.group(1)), int(match.group(2))
+    last = int(match.group(3)) if match.group(3) else first
+    if last < first:
+        raise ValueError(f"Invalid verse range: {reference!r}. The last ayah comes before the first.")
+    return surah, first, last
+
+
+def resolve_verse_references(mushaf, references):
+    """
+    Resolve verse references of a Mushaf to its ayahs.
+
+    Returns `(resolved, errors)`: `resolved` is a list of
+    `{'reference': str, 'ayahs': [{'id', 'uuid', 'surah', 'ayah'}, ...]}` in input order,
+    `errors` maps each invalid or unknown reference to a message. Numbers are
+    resolved through the mushaf structure index, and all UUIDs are read with one query.
+    """
+    structure = get_mushaf_structure(mushaf)
+    resolved = []
+    errors = {}
+    for reference in references:
+        try:
+            surah, first, last = parse_verse_reference(reference)
+        except ValueError as e:
+            errors[str(reference)] = str(e)
+            continue
+        ayahs_count = structure.surah_ayahs_count(surah)
+        if ayahs_count is None:
+            errors[reference] = f"Surah {surah} does not exist in this mushaf."
+            continue
+        if structure.ayah_id(surah, first) is None or structure.ayah_id(surah, last) is None:
+            errors[reference] = f"Surah {surah} has {ayahs_count} ayahs."
+            continue
+        resolved.append((reference, surah, structure.ayah_ids_between(surah, first, last)))
+
+    ayah_ids = {ayah_id for _, _, ids in resolved for ayah_id in ids}
+    ayahs = {
+        ayah_id: (ayah_uuid, number)
+        for ayah_id, ayah_uuid, number in Ayah.objects.filter(id__in=ayah_ids).values_list('id', 'uuid', 'number')
+    } if ayah_ids else {}
+
+    results = []
+    for reference, surah, ids in resolved:
+        results.append({
+            'reference': reference,
+            'ayahs': [
+                {'id': ayah_id, 'uuid': ayahs[ayah_id][0], 'surah': surah, 'ayah': ayahs[ayah_id][1]}
+                for ayah_id in ids if ayah_id in ayahs
+            ],
+        })
+    return results, errors
@@ -0,0 +1,100 @@
+from django.contrib.postgres.search import SearchVector, TrigramSimilarity
+from django.db.models import Case, IntegerField, Q, Value, When
+from rest_framework import filters
+
+from quran.arabic import normalize_arabic, search_terms
+from quran.models import Word
+
+# Text search configurations shipped with PostgreSQL, by Translation.language
+TEXT_SEARCH_CONFIGS = {
+    'ar': 'arabic',
+    'ca': 'catalan',
+    'da': 'danish',
+    'de': 'german',
+    'el': 'greek',
+    'en': 'english',
+    'es': 'spanish',
+    'eu': 'basque',
+    'fi': 'finnish',
+    'fr': 'french',
+    'ga': 'irish',
+    'hi': 'hindi',
+    'hu': 'hungarian',
+    'hy': 'armenian',
+    'id': 'indonesian',
+    'it': 'italian',
+    'lt': 'lithuanian',
+    'nb': 'norwegian',
+    'ne': 'nepali',
+    'nl': 'dutch',
+    'no': 'norwegian',
+    'pt': 'portuguese',
+    'ro': 'romanian',
+    'ru': 'russian',
+    'sr': 'serbian',
+    'sv': 'swedish',
+    'ta': 'tamil',
+    'tr': 'turkish',
+    'yi': 'yiddish',
+}
+
+
+def text_search_config(language):
+    """PostgreSQL text search configuration for a language code; 'simple' when it has no stemmer."""
+    return TEXT_SEARCH_CONFIGS.get(language, 'simple')
+
+
+def update_search_vectors(ayah_translations, language):
+    """Recompute `search_vector` of an AyahTranslation queryset in one UPDATE."""
+    return ayah_translations.update(search_vector=SearchVector('text', config=text_search_config(language)))
+
+
+class WordSearchFilter(filters.SearchFilter):
+    """
+    Search over `Word.normalized_text`, so the query matches with or without tashkeel.
+
+    The trigram GIN index serves the substring match; words are ranked by
+    trigram similarity to the query.
+    """
+
+    def get_search_terms(self, request):
+        return search_terms(request.query_params.get(self.search_param, ''))
+
+    def filter_queryset(self, request, queryset, view):
+        terms = self.get_search_terms(request)
+        if not terms:
+            return queryset
+        matched = Q()
+        for term in terms:
+            matched |= Q(normalized_text__contains=term)
+        query = normalize_arabic(request.query_params.get(self.search_param, ''))
+        return (
+            queryset.filter(matched)
+            .annotate(search_rank=TrigramSimilarity('normalized_text', query))
+            .order_by('-search_rank', 'ayah_id', 'id')
+        )
+
+
+class AyahSearchFilter(WordSearchFilter):
+    """
+    Search ayahs through the normalized text of their words.
+
+    Ayahs are ranked by how many distinct query terms they contain; the
+    serializer reports which words matched (see AyahSerializer).
+    """
+
+    def filter_queryset(self, request, queryset, view):
+        terms = self.get_search_terms(request)
+        if not terms:
+            return queryset
+        matched = Q()
+        rank = Value(0)
+        for term in terms:
+            ayah_ids = Word.objects.filter(normalized_text__contains=term).values('ayah_id')
+            matched |= Q(id__in=ayah_ids)
+            rank = rank + Case(When(id__in=ayah_ids, then=1), default=0, output_field=IntegerField())
+        return (
+            queryset.filter(matched)
+            .annotate(search_rank=rank)
+            .order_by('-search_rank', 'surah__number', 'number', 'id')
+        )
@@ -16,10 +16,12 @@ from quran.models import (
     Recitation,
     File,
     RecitationSurah,
-    RecitationSurahTimestamp,
     Status,
 )
 from account.models import CustomUser
+from quran.arabic import normalize_arabic
+from quran.breakers import load_ayah_breaker_ordinals
+from quran.loaders import load_ayah_words, load_word_breakers
 
 class MushafSerializer(serializers.ModelSerializer):
     class Meta:
@@ -50,16 +52,23 @@ class SurahSerializer(serializers.ModelSerializer):
         read_only_fields = ['creator']
 
     def get_bismillah(self, instance):
-        # Get the first ayah of this surah
-        first_ayah = instance.ayahs.order_by('number').first()
-        text = first_ayah.bismillah_text if first_ayah and first_ayah.bismillah_text is not None else ""
-        is_ayah = first_ayah.is_bismillah if first_ayah else False
+        if hasattr(instance, 'first_ayah_is_bismillah'):
+            # Annotated by quran.loaders.with_ayah_stats
+            is_ayah = bool(instance.first_ayah_is_bismillah)
+            text = instance.first_ayah_bismillah_text
+        else:
+            # Get the first ayah of this surah
+            first_ayah = instance.ayahs.order_by('number').first()
+            is_ayah = first_ayah.is_bismillah if first_ayah else False
+            text = first_ayah.bismillah_text if first_ayah else None
         return {
             'is_ayah': is_ayah,
-            'text': text
+            'text': text if text is not None else ""
         }
 
     def get_number_of_ayahs(self, instance):
+        if hasattr(instance, 'ayahs_count'):
+            return instance.ayahs_count
         return instance.ayahs.count()
 
     def get_names(self, instance):
@@ -96,6 +105,23 @@ class SurahInAyahSerializer(serializers.ModelSerializer):
             'transliteration': instance.name_transliteration
         }]
 
+class AyahListSerializer(serializers.ListSerializer):
+    """Loads the per-page data of AyahSerializer once so each ayah only does keyed lookups."""
+
+    def to_representation(self, data):
+        iterable = data.all() if isinstance(data, models.manager.BaseManager) else data
+        ayahs = list(iterable)
+        ayah_ids = [ayah.id for ayah in ayahs]
+        if 'text' in self.child.fields:
+            self.context['words_by_ayah'] = load_ayah_words(ayah_ids)
+            if self.context.get('text_format') == 'word':
+                self.context['word_breakers'] = load_word_breakers(ayah_ids, self.context.get('takhtit_uuid'))
+        if 'breakers' in self.child.fields:
+            self.context['breaker_ordinals'] = load_ayah_breaker_ordinals(
+                ayah_ids, self.context.get('takhtit_uuid')
+            )
+        return [self.child.to_representation(ayah) for ayah in ayahs]
+
 class AyahSerializer(serializers.ModelSerializer):
     text = serializers.SerializerMethodField()
     breakers = serializers.SerializerMethodField()
@@ -106,30 +132,29 @@ class AyahSerializer(serializers.ModelSerializer):
         model = Ayah
         fields = ['uuid', 'number', 'sajdah', 'text', 'breakers', 'bismillah', 'surah']
         read_only_fields = ['creator']
+        list_serializer_class = AyahListSerializer
     
     def get_surah(self, instance):
         if instance.number == 1:
             return SurahSerializer(instance.surah).data
         return None
 
+    def get_words(self, instance):
+        words_by_ayah = self.context.get('words_by_ayah')
+        if words_by_ayah is not None:
+            return words_by_ayah.get(instance.id, [])
+        # Sort in Python so a prefetch_related('words') cache is reused
+        return sorted(instance.words.all(), key=lambda word: word.id)
+
     def get_text(self, instance):
-        words = list(instance.words.all().order_by('id'))
+        words = self.get_words(instance)
         if not words:
             return [] if self.context.get('text_format') == 'word' else ''
             
         if self.context.get('text_format') == 'word':
-            # Get all word breakers for these words
-            word_ids = [word.id for word in words]
-            word_breakers = WordBreaker.objects.filter(word_id__in=word_ids)
-            
-            # Group breakers by word_id
-            breakers_by_word = {}
-            for breaker in word_breakers:
-                if breaker.word_id not in breakers_by_word:
-                    breakers_by_word[breaker.word_id] = []
-                breakers_by_word[breaker.word_id].append({
-                    'name': breaker.name
-                })
+            breakers_by_word = self.context.get('word_breakers')
+            if breakers_by_word is None:
+                breakers_by_word = load_word_breakers([instance.id], self.context.get('takhtit_uuid'))
             
             # Return words with their breakers (only if they have any)
             result = []
@@ -143,47 +168,10 @@ class AyahSerializer(serializers.ModelSerializer):
         return ' '.join(word.text for word in words)
 
     def get_breakers(self, instance):
-        breakers = instance.breakers.all()
-        if not breakers.exists():
-            return None
-            
-        # Get all breakers up to current ayah across all surahs
-        current_surah = instance.surah
-        current_number = instance.number
-        
-        all_breakers = AyahBreaker.objects.filter(
-            models.Q(
-                ayah__surah__number__lt=current_surah.number
-            ) | models.Q(
-                ayah__surah=current_surah,
-                ayah__number__lte=current_number
-            )
-        ).order_by('ayah__surah__number', 'ayah__number')
-        
-        # Keep running count of breakers
-        breaker_counts = {}
-        ayah_breakers = {}
-        
-        for breaker in all_breakers:
-            # Update count for this breaker name
-            if breaker.name not in breaker_counts:
-                breaker_counts[breaker.name] = 1
-            else:
-                breaker_counts[breaker.name] += 1
-                
-            # Store current counts for this ayah
-            if breaker.ayah_id not in ayah_breakers:
-                ayah_breakers[breaker.ayah_id] = []
-            
-            # Only add if name not already in this ayah's breakers
-            if not any(b['name'] == breaker.name for b in ayah_breakers[breaker.ayah_id]):
-                ayah_breakers[breaker.ayah_id].append({
-                    'name': breaker.name,
-                    'number': breaker_counts[breaker.name]
-                })
-        
-        # Return breakers for current ayah
-        return ayah_breakers.get(instance.id, None)
+        breaker_ordinals = self.context.get('breaker_ordinals')
+        if breaker_ordinals is None:
+            breaker_ordinals = load_ayah_breaker_ordinals([instance.id], self.context.get('takhtit_uuid'))
+        return breaker_ordinals.get(instance.id, None)
 
     def get_bismillah(self, instance):
         # Always return a bismillah object with text (never null)
@@ -209,6 +197,13 @@ class AyahSerializer(serializers.ModelSerializer):
                         representation['surah']['bismillah'] = representation['bismillah']
                     # Remove bismillah from top level
                     representation.pop('bismillah', None)
+        search_terms = self.context.get('search_terms')
+        if search_terms:
+            # Positions of the words that matched the search query
+            representation['matches'] = [
+                position for position, word in enumerate(self.get_words(instance))
+                if any(term in normalize_arabic(word.text) for term in search_terms)
+            ]
         return representation
 
     def create(self, validated_data):
@@ -275,6 +270,19 @@ class AyahTranslationNestedSerializer(serializers.ModelSerializer):
             return obj.bismillah
         return None
 
+class AyahTranslationSearchResultSerializer(serializers.ModelSerializer):
+    """Serializer for translation search results; expects the `search_rank` and `headline` annotations"""
+    translation_uuid = serializers.UUIDField(source='translation.uuid', read_only=True)
+    ayah_uuid = serializers.UUIDField(source='ayah.uuid', read_only=True)
+    surah = serializers.IntegerField(source='ayah.surah.number', read_only=True, help_text="Surah number")
+    ayah = serializers.IntegerField(source='ayah.number', read_only=True, help_text="Ayah number")
+    headline = serializers.CharField(read_only=True, help_text="Text fragment with the matches wrapped in <b></b>")
+    rank = serializers.FloatField(source='search_rank', read_only=True)
+
+    class Meta:
+        model = AyahTranslation
+        fields = ['uuid', 'translation_uuid', 'ayah_uuid', 'surah', 'ayah', 'text', 'headline', 'rank']
+
 class LangCodeField(serializers.ChoiceField):
     """A field for ISO 639-1 language codes."""
     def __init__(self, **kwargs):
@@ -515,54 +523,55 @@ class RecitationSerializer(serializers.ModelSerializer):
 
         # Add recitation_surahs with file_url for each
         from quran.models import RecitationSurah
-        recitation_surahs = RecitationSurah.objects.filter(recitation=instance)
+        recitation_surahs = RecitationSurah.objects.filter(recitation=instance).defer('packed_timestamps')
         representation['recitation_surahs'] = RecitationSurahSerializer(recitation_surahs, many=True, context=self.context).data
 
         return representation
 
+    def _word_timestamps(self, obj):
+        # Shared by words_timestamps and ayahs_timestamps, so the timestamps are read once per recitation
+        from quran.timestamps import recitation_word_timestamps
+        cache = self.__dict__.setdefault('_word_timestamps_cache', {})
+        if obj.pk not in cache:
+            cache[obj.pk] = recitation_word_timestamps(obj)
+        return cache[obj.pk]
+
     def get_ayahs_timestamps(self, obj):
-        # Get all timestamps ordered by start time
-        from quran.models import RecitationSurahTimestamp
-        timestamps = RecitationSurahTimestamp.objects.filter(recitation_surah__recitation=obj).order_by('start_time')
+        from quran.timestamps import format_ms
+        timestamps = self._word_timestamps(obj)
+        if not timestamps:
+            return []
 
-        # Collect all surah IDs associated with this recitation
+        # The first word of an ayah is the one with the lowest id
         surah_ids = obj.recitation_surahs.values_list('surah_id', flat=True)
-        ayahs = Ayah.objects.filter(surah_id__in=surah_ids).all()
-        ayahs_first_words_as_id = set()
-        for ayah in ayahs:
-            words_with_id = ayah.words.values("id").first()
-            ayahs_first_words_as_id.add(words_with_id['id'])
+        ayahs_first_words_as_id = set(
+            Word.objects
+            .filter(ayah__surah_id__in=surah_ids)
+            .order_by('ayah_id', 'id')
+            .distinct('ayah_id')
+            .values_list('id', flat=True)
+        )
 
-        if not timestamps:
-            return []
-        
         # Skip the first ayah and get start times of remaining ayahs
         ayah_start_times = []
-        for timestamp in timestamps[1:]:  # Skip first timestamp
-            start_time = timestamp.start_time.strftime('%H:%M:%S.%f')[:-3]  # Remove last 3 digits of microseconds
-            if timestamp.word_id in ayahs_first_words_as_id:
-                ayah_start_times.append(start_time)
+        for start_ms, _, word_id, _ in timestamps[1:]:  # Skip first timestamp
+            if word_id in ayahs_first_words_as_id:
+                ayah_start_times.append(format_ms(start_ms))
         return ayah_start_times
 
     # Deprecated – validation now occurs in upload endpoint if needed
 
     def get_words_timestamps(self, obj):
         """Return word-level timestamps for this recitation across all linked surahs."""
-        from quran.models import RecitationSurahTimestamp
-        timestamps = []
-        qs = RecitationSurahTimestamp.objects.filter(recitation_surah__recitation=obj).order_by('start_time')
-        for timestamp in qs:
-            # Format the time as HH:MM:SS.mmm
-            start_time = timestamp.start_time.strftime('%H:%M:%S.%f')[:-3]  # Trim microseconds to milliseconds
-            end_time = timestamp.end_time.strftime('%H:%M:%S.%f')[:-3] if timestamp.end_time else None
-            timestamps.append(
-                {
-                    'start': start_time,
-                    'end': end_time,
-                    'word_uuid': str(timestamp.word.uuid) if timestamp.word else None,
-                }
-            )
-        return timestamps
+        from quran.timestamps import format_ms
+        return [
+            {
+                'start': format_ms(start_ms),
+                'end': format_ms(end_ms) if end_ms is not None else None,
+                'word_uuid': str(word_uuid) if word_uuid else None,
+            }
+            for start_ms, end_ms, _, word_uuid in self._word_timestamps(obj)
+        ]
 
 class TranslationListSerializer(serializers.ModelSerializer):
     mushaf_uuid = serializers.SerializerMethodField()
@@ -648,4 +657,40 @@ class WordBreakersResponseSerializer(serializers.Serializer):
 class WordBreakerDetailResponseSerializer(serializers.Serializer):
     """Serializer for individual word breaker responses"""
     word_uuid = serializers.UUIDField(help_text="UUID of the word")
-    type = serializers.CharField(help_text="Breaker type (always 'line')") 
\ No newline at end of file
+    type = serializers.CharField(help_text="Breaker type (always 'line')") 
+
+class MushafPageWordSerializer(serializers.Serializer):
+    """A word of a printed page"""
+    uuid = serializers.UUIDField(help_text="UUID of the word")
+    text = serializers.CharField(help_text="Text of the word")
+    ayah_uuid = serializers.UUIDField(help_text="UUID of the ayah")
+    surah = serializers.IntegerField(help_text="Surah number")
+    ayah = serializers.IntegerField(help_text="Ayah number")
+
+class MushafPageLineSerializer(serializers.Serializer):
+    """A line of a printed page"""
+    line = serializers.IntegerField(help_text="Line number within the page")
+    words = MushafPageWordSerializer(many=True)
+
+class MushafPageResponseSerializer(serializers.Serializer):
+    """Serializer for the mushaf pages endpoint response"""
+    page = serializers.IntegerField(help_text="Page number")
+    takhtit_uuid = serializers.UUIDField(help_text="UUID of the takhtit the layout comes from")
+    lines = MushafPageLineSerializer(many=True)
+
+class ResolvedAyahSerializer(serializers.Serializer):
+    """An ayah matched by a verse reference"""
+    id = serializers.IntegerField()
+    uuid = serializers.UUIDField()
+    surah = serializers.IntegerField(help_text="Surah number")
+    ayah = serializers.IntegerField(help_text="Ayah number")
+
+class ResolvedReferenceSerializer(serializers.Serializer):
+    """A verse reference and the ayahs it covers"""
+    reference = serializers.CharField(help_text="The verse reference as given, e.g. '2:1-5'")
+    ayahs = ResolvedAyahSerializer(many=True)
+
+class MushafResolveResponseSerializer(serializers.Serializer):
+    """Serializer for the mushaf resolve endpoint response"""
+    results = ResolvedReferenceSerializer(many=True)
+    errors = serializers.DictField(child=serializers.CharField(), help_text="Message for each invalid or unknown reference")
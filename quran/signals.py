@@ -0,0 +1,135 @@
+from django.db import transaction
+from django.db.models import Model, QuerySet
+from django.db.models.signals import post_delete, post_save, pre_delete, pre_save
+from django.dispatch import receiver
+
+from quran.models import (
+    Mushaf,
+    Surah,
+    Ayah,
+    Word,
+    Translation,
+    AyahTranslation,
+    Takhtit,
+    AyahBreaker,
+    WordBreaker,
+)
+from quran.arabic import normalize_arabic
+from quran.search import text_search_config, update_search_vectors
+from quran.versions import batched_content_version_bumps, bump_content_version
+
+
+def _skip(sender, instance, kwargs):
+    """
+    Fixture loads and cascade deletes are skipped; the row that started a cascade bumps its parent.
+
+    Rows cascaded from a surah, ayah or word keep their Translation or Takhtit,
+    those are bumped by `text_deleting` instead.
+    """
+    if kwargs.get('raw'):
+        return True
+    origin = kwargs.get('origin')
+    if isinstance(origin, Model):
+        return origin is not instance
+    if isinstance(origin, QuerySet):
+        return origin.model is not sender
+    return False
+
+
+@receiver(post_save, sender=Surah)
+@receiver(post_delete, sender=Surah)
+def surah_changed(sender, instance, **kwargs):
+    if not _skip(sender, instance, kwargs):
+        bump_content_version(Mushaf, 'id', instance.mushaf_id)
+
+
+@receiver(post_save, sender=Ayah)
+@receiver(post_delete, sender=Ayah)
+def ayah_changed(sender, instance, **kwargs):
+    if not _skip(sender, instance, kwargs):
+        bump_content_version(Mushaf, 'surahs__id', instance.surah_id)
+
+
+@receiver(pre_delete, sender=Surah)
+@receiver(pre_delete, sender=Ayah)
+@receiver(pre_delete, sender=Word)
+def text_deleting(sender, instance, **kwargs):
+    """
+    Bump the Translations and Takhtits losing AyahTranslations or breakers with a deleted surah, ayah or word.
+
+    The breaker ordinals and word positions of those Takhtits are rebuilt once
+    the delete is committed.
+    """
+    if _skip(sender, instance, kwargs):
+        return
+    ayah_lookup = {Surah: 'ayah__surah', Ayah: 'ayah'}.get(sender)
+    word_lookup = {Surah: 'word__ayah__surah', Ayah: 'word__ayah', Word: 'word'}[sender]
+
+    translation_ids = set()
+    takhtit_ids = set(WordBreaker.objects.filter(**{word_lookup: instance}).values_list('takhtit_id', flat=True))
+    if ayah_lookup is not None:
+        translation_ids.update(
+            AyahTranslation.objects.filter(**{ayah_lookup: instance}).values_list('translation_id', flat=True)
+        )
+        takhtit_ids.update(AyahBreaker.objects.filter(**{ayah_lookup: instance}).values_list('takhtit_id', flat=True))
+    takhtit_ids.discard(None)
+
+    with batched_content_version_bumps():
+        for translation_id in translation_ids:
+            bump_content_version(Translation, 'id', translation_id)
+        for takhtit_id in takhtit_ids:
+            bump_content_version(Takhtit, 'id', takhtit_id)
+    if takhtit_ids:
+        from quran.tasks import rebuild_takhtit_breakers_task
+        transaction.on_commit(lambda: rebuild_takhtit_breakers_task.delay(sorted(takhtit_ids)))
+
+
+@receiver(pre_save, sender=Word)
+def normalize_word_text(sender, instance, **kwargs):
+    instance.normalized_text = normalize_arabic(instance.text)
+
+
+@receiver(post_save, sender=Word)
+@receiver(post_delete, sender=Word)
+def word_changed(sender, instance, **kwargs):
+    if not _skip(sender, instance, kwargs):
+        bump_content_version(Mushaf, 'surahs__ayahs__id', instance.ayah_id)
+
+
+@receiver(post_save, sender=AyahTranslation)
+@receiver(post_delete, sender=AyahTranslation)
+def ayah_translation_changed(sender, instance, **kwargs):
+    if not _skip(sender, instance, kwargs):
+        bump_content_version(Translation, 'id', instance.translation_id)
+
+
+@receiver(post_save, sender=AyahTranslation)
+def index_ayah_translation(sender, instance, **kwargs):
+    if not kwargs.get('raw'):
+        language = Translation.objects.filter(id=instance.translation_id).values_list('language', flat=True).first()
+        update_search_vectors(AyahTranslation.objects.filter(pk=instance.pk), language)
+
+
+@receiver(pre_save, sender=Translation)
+def translation_language_changing(sender, instance, **kwargs):
+    instance._search_config_changed = False
+    if instance.pk and not kwargs.get('raw'):
+        old_language = Translation.objects.filter(pk=instance.pk).values_list('language', flat=True).first()
+        instance._search_config_changed = (
+            old_language is not None and text_search_config(old_language) != text_search_config(instance.language)
+        )
+
+
+@receiver(post_save, sender=Translation)
+def reindex_translation(sender, instance, **kwargs):
+    if getattr(instance, '_search_config_changed', False):
+        update_search_vectors(instance.ayah_translations.all(), instance.language)
+
+
+@receiver(post_save, sender=AyahBreaker)
+@receiver(post_delete, sender=AyahBreaker)
+@receiver(post_save, sender=WordBreaker)
+@receiver(post_delete, sender=WordBreaker)
+def breaker_changed(sender, instance, **kwargs):
+    if not _skip(sender, instance, kwargs):
+        bump_content_version(Takhtit, 'id', instance.takhtit_id)
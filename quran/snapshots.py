@@ -0,0 +1,148 @@
+import gzip
+import hashlib
+import json
+
+from django.core.cache import cache
+from django.core.files.base import ContentFile
+
+from core.mixins import versioned_validators
+from quran.models import Ayah, AyahBreakerOrdinal, Mushaf, MushafSnapshot, Surah, Takhtit, Word
+
+# Bumped whenever the layout of the compiled JSON changes
+SNAPSHOT_FORMAT = 1
+SNAPSHOT_STORAGE_LOCATION = 'snapshots'
+# How long a queued rebuild of the same content is not queued again
+SNAPSHOT_REBUILD_LOCK_SECONDS = 10 * 60
+
+
+def get_snapshot_storage():
+    from core.views import Storage
+    storage = Storage()
+    storage.location = SNAPSHOT_STORAGE_LOCATION
+    return storage
+
+
+def snapshot_source_version(mushaf):
+    """
+    Version of the content a snapshot of the Mushaf is compiled from.
+
+    It is made of the content_version of the mushaf and of its takhtits, so
+    any edit to the text or to the breakers moves it.
+    """
+    version, _ = versioned_validators(Mushaf.objects.filter(pk=mushaf.pk), Takhtit.objects.filter(mushaf=mushaf))
+    return version
+
+
+def queue_mushaf_snapshot_rebuild(mushaf, source_version):
+    """Queue a rebuild of the Mushaf's snapshot, once per source version while the lock lasts."""
+    from quran.tasks import build_mushaf_snapshot_task
+    key = f"mushaf-snapshot-rebuild:{mushaf.id}:{hashlib.sha256(source_version.encode()).hexdigest()}"
+    if cache.add(key, True, SNAPSHOT_REBUILD_LOCK_SECONDS):
+        build_mushaf_snapshot_task.delay(mushaf.id)
+
+
+def compile_mushaf_snapshot(mushaf):
+    """
+    Serialize a whole Mushaf (surahs, ayahs, ordered words and breaker ordinals) into a dict.
+
+    Every table is read with one set-based query regardless of the mushaf size.
+    """
+    words_by_ayah = {}
+    words = (
+        Word.objects
+        .filter(ayah__surah__mushaf=mushaf)
+        .order_by('ayah_id', 'id')
+        .values_list('ayah_id', 'uuid', 'text')
+    )
+    for ayah_id, word_uuid, text in words:
+        words_by_ayah.setdefault(ayah_id, []).append({'uuid': str(word_uuid), 'text': text})
+
+    ayahs_by_surah = {}
+    ayahs = (
+        Ayah.objects
+        .filter(surah__mushaf=mushaf)
+        .order_by('surah_id', 'number')
+        .values_list('id', 'surah_id', 'uuid', 'number', 'sajdah', 'is_bismillah', 'bismillah_text')
+    )
+    for ayah_id, surah_id, ayah_uuid, number, sajdah, is_bismillah, bismillah_text in ayahs:
+        ayahs_by_surah.setdefault(surah_id, []).append({
+            'uuid': str(ayah_uuid),
+            'number': number,
+            'sajdah': sajdah,
+            'bismillah': {'is_ayah': is_bismillah, 'text': bismillah_text or ""},
+            'words': words_by_ayah.get(ayah_id, []),
+        })
+
+    surahs = []
+    for surah in Surah.objects.filter(mushaf=mushaf).order_by('number'):
+        surahs.append({
+            'uuid': str(surah.uuid),
+            'number': surah.number,
+            'period': surah.period,
+            'names': [{
+                'name': surah.name,
+                'pronunciation': surah.name_pronunciation,
+                'translation': surah.name_translation,
+                'transliteration': surah.name_transliteration,
+            }],
+            'search_terms': surah.search_terms,
+            'ayahs': ayahs_by_surah.get(surah.id, []),
+        })
+
+    breakers_by_takhtit = {}
+    ordinals = (
+        AyahBreakerOrdinal.objects
+        .filter(takhtit__mushaf=mushaf)
+        .order_by('takhtit_id', 'type', 'number')
+        .values_list('takhtit__uuid', 'ayah__uuid', 'type', 'number')
+    )
+    for takhtit_uuid, ayah_uuid, br_type, number in ordinals:
+        breakers_by_takhtit.setdefault(str(takhtit_uuid), []).append({
+            'ayah_uuid': str(ayah_uuid),
+            'name': br_type,
+            'number': number,
+        })
+
+    return {
+        'format': SNAPSHOT_FORMAT,
+        'mushaf': {
+            'uuid': str(mushaf.uuid),
+            'short_name': mushaf.short_name,
+            'name': mushaf.name,
+            'source': mushaf.source,
+        },
+        'surahs': surahs,
+        'takhtits': [
+            {'uuid': takhtit_uuid, 'breakers': breakers}
+            for takhtit_uuid, breakers in breakers_by_takhtit.items()
+        ],
+    }
+
+
+def build_mushaf_snapshot(mushaf):
+    """Compile, compress and store a new snapshot version of the Mushaf. Returns the MushafSnapshot."""
+    # Taken first, so edits made while compiling leave the snapshot out of date
+    source_version = snapshot_source_version(mushaf)
+    payload = json.dumps(compile_mushaf_snapshot(mushaf), ensure_ascii=False, separators=(',', ':'))
+    # A fixed mtime keeps the compressed bytes, and so the ETag, stable for identical content
+    data = gzip.compress(payload.encode('utf-8'), mtime=0)
+    etag = hashlib.sha256(data).hexdigest()
+
+    latest = mushaf.snapshots.order_by('-version').first()
+    if latest is not None and latest.etag == etag:
+        if latest.source_version != source_version:
+            latest.source_version = source_version
+            latest.save(update_fields=['source_version', 'updated_at'])
+        return latest
+    version = 1 if latest is None else latest.version + 1
+
+    storage = get_snapshot_storage()
+    path = storage.save(f"{mushaf.uuid}/v{version}.json.gz", ContentFile(data))
+    return MushafSnapshot.objects.create(
+        mushaf=mushaf,
+        version=version,
+        path=path,
+        etag=etag,
+        size=len(data),
+        source_version=source_version,
+    )
@@ -0,0 +1,122 @@
+import threading
+from array import array
+from bisect import bisect_left
+
+from quran.models import Ayah, Mushaf
+
+_structures = {}
+_lock = threading.Lock()
+
+
+class MushafStructure:
+    """
+    Immutable shape of a Mushaf: its surahs, their ayah numbers and the ayah ids.
+
+    Ayahs are stored in mushaf order in flat arrays, so a whole Quran takes a
+    few tens of kilobytes. The global ordinal of an ayah is its 1-based
+    position in that order.
+    """
+    __slots__ = ('mushaf_id', 'content_version', '_surah_index', '_surah_offsets', '_ayah_numbers', '_ayah_ids')
+
+    def __init__(self, mushaf_id, content_version, rows):
+        """`rows` are `(surah_number, ayah_number, ayah_id)` tuples in mushaf order."""
+        self.mushaf_id = mushaf_id
+        self.content_version = content_version
+        self._surah_index = {}
+        self._surah_offsets = array('l')
+        self._ayah_numbers = array('l')
+        self._ayah_ids = array('q')
+        for surah_number, ayah_number, ayah_id in rows:
+            if surah_number not in self._surah_index:
+                self._surah_index[surah_number] = len(self._surah_offsets)
+                self._surah_offsets.append(len(self._ayah_ids))
+            self._ayah_numbers.append(ayah_number)
+            self._ayah_ids.append(ayah_id)
+        # Sentinel so a surah's ayahs are always offsets[i]:offsets[i + 1]
+        self._surah_offsets.append(len(self._ayah_ids))
+
+    @property
+    def surah_numbers(self):
+        return list(self._surah_index)
+
+    @property
+    def ayahs_count(self):
+        return len(self._ayah_ids)
+
+    def _surah_bounds(self, surah_number):
+        index = self._surah_index.get(surah_number)
+        if index is None:
+            return None
+        return self._surah_offsets[index], self._surah_offsets[index + 1]
+
+    def surah_ayahs_count(self, surah_number):
+        """Number of ayahs in the surah, or None if the mushaf has no such surah."""
+        bounds = self._surah_bounds(surah_number)
+        return None if bounds is None else bounds[1] - bounds[0]
+
+    def _offset(self, surah_number, ayah_number):
+        bounds = self._surah_bounds(surah_number)
+        if bounds is None:
+            return None
+        start, end = bounds
+        offset = bisect_left(self._ayah_numbers, ayah_number, start, end)
+        if offset < end and self._ayah_numbers[offset] == ayah_number:
+            return offset
+        return None
+
+    def ayah_id(self, surah_number, ayah_number):
+        """Database id of the ayah, or None if it does not exist."""
+        offset = self._offset(surah_number, ayah_number)
+        return None if offset is None else self._ayah_ids[offset]
+
+    def ordinal(self, surah_number, ayah_number):
+        """1-based position of the ayah in the whole mushaf, or None if it does not exist."""
+        offset = self._offset(surah_number, ayah_number)
+        return None if offset is None else offset + 1
+
+    def ayah_ids_between(self, surah_number, first_ayah, last_ayah):
+        """Ids of the surah's ayahs numbered `first_ayah` to `last_ayah` inclusive, in order."""
+        bounds = self._surah_bounds(surah_number)
+        if bounds is None:
+            return []
+        start, end = bounds
+        first = bisect_left(self._ayah_numbers, first_ayah, start, end)
+        last = bisect_left(self._ayah_numbers, last_ayah + 1, start, end)
+        return list(self._ayah_ids[first:last])
+
+
+def load_mushaf_structure(mushaf_id, content_version):
+    rows = (
+        Ayah.objects
+        .filter(surah__mushaf_id=mushaf_id)
+        .order_by('surah__number', 'number')
+        .values_list('surah__number', 'number', 'id')
+    )
+    return MushafStructure(mushaf_id, content_version, rows.iterator(chunk_size=10000))
+
+
+def get_mushaf_structure(mushaf):
+    """
+    Return the MushafStructure of a Mushaf instance or id, loading it on first use.
+
+    Each process keeps one structure per mushaf and reloads it when the mushaf's
+    `content_version` moves on. With an instance its loaded `content_version` is
+    trusted; with an id the version is read with a one-row query.
+    """
+    if isinstance(mushaf, Mushaf):
+        mushaf_id, content_version = mushaf.id, mushaf.content_version
+    else:
+        mushaf_id = mushaf
+        content_version = Mushaf.objects.filter(id=mushaf_id).values_list('content_version', flat=True).first()
+        if content_version is None:
+            raise Mushaf.DoesNotExist(f"Mushaf {mushaf_id} does not exist.")
+
+    structure = _structures.get(mushaf_id)
+    if structure is not None and structure.content_version == content_version:
+        return structure
+    with _lock:
+        structure = _structures.get(mushaf_id)
+        if structure is None or structure.content_version != content_version:
+            structure = load_mushaf_structure(mushaf_id, content_version)
+            _structures[mushaf_id] = structure
+    return structure
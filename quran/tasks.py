@@ -6,58 +6,107 @@ from quran.models import (
     Word,
     Translation,
     AyahTranslation,
+    AyahBreaker,
+    AyahBreakerType,
+    Takhtit,
+)
+from quran.arabic import normalize_arabic
+from quran.search import update_search_vectors
+from quran.structure import get_mushaf_structure
+from quran.references import parse_verse_reference
+from quran.breakers import rebuild_ayah_breaker_ordinals, rebuild_takhtit_word_positions
+from quran.versions import batched_content_version_bumps, bump_content_version
+from quran.imports import get_import_storage, iter_json_array_field, read_json_fields
+from quran.bulk import COPY_BATCH_SIZE, copy_insert
+from quran.timestamps import pack_recitation_surah_timestamps
+from quran.alignment import (
+    AlignmentResult,
+    WordAlignment,
+    align_recitation,
+    load_cached_alignment,
+    low_confidence_ranges,
+    realign_ranges,
+    save_cached_alignment,
+    surah_text_hash,
 )
 from django.contrib.auth import get_user_model
 from django.db import transaction
 from django.conf import settings
-import requests
+from django.db.models.functions import MD5
+from django.utils import timezone
+from datetime import datetime, timedelta
+import hashlib
 
 from core.models import Notification
 
 @shared_task
-def import_mushaf_task(quran_data, user_id):
+def import_mushaf_task(file_name, user_id):
+    """
+    Import a Mushaf from a JSON file staged in the import storage.
+
+    The surahs are read one at a time and the rows are streamed into Postgres
+    with COPY in bounded batches, so memory use does not grow with the file.
+    The staged file is removed afterwards.
+    """
     User = get_user_model()
     user = User.objects.get(id=user_id)
-    mushaf_data = quran_data["mushaf"]
-    with transaction.atomic():
-        mushaf = Mushaf.objects.create(
-            creator_id=user.id,
-            name=mushaf_data["name"],
-            short_name=mushaf_data["short_name"],
-            source=mushaf_data["source"]
-        )
-        surah_objs = []
-        for surah_data in quran_data["surahs"]:
-            surah_objs.append(Surah(
+    storage = get_import_storage()
+    try:
+        with storage.open(file_name, 'rb') as fp:
+            mushaf_data = read_json_fields(fp, 'surahs')["mushaf"]
+        with transaction.atomic(), batched_content_version_bumps(), storage.open(file_name, 'rb') as fp:
+            mushaf = Mushaf.objects.create(
                 creator_id=user.id,
-                mushaf=mushaf,
-                number=surah_data["number"],
-                name=surah_data["name"],
-                period=surah_data["period"]
-            ))
-        Surah.objects.bulk_create(surah_objs)
-        surahs_by_number = {s.number: s for s in mushaf.surahs.all()}
-        ayah_objs = []
-        for surah_data in quran_data["surahs"]:
-            surah = surahs_by_number[surah_data["number"]]
-            for ayah in surah_data["ayahs"]:
-                ayah_objs.append(Ayah(
+                name=mushaf_data["name"],
+                short_name=mushaf_data["short_name"],
+                source=mushaf_data["source"]
+            )
+            word_objs = []
+            for surah_data in iter_json_array_field(fp, 'surahs'):
+                surah = Surah.objects.create(
                     creator_id=user.id,
-                    surah=surah,
-                    number=ayah["number"],
-                    sajdah=ayah["sajdah"],
-                    is_bismillah=ayah["is_bismillah"],
-                    bismillah_text=ayah["bismillah_text"],
-                ))
-        Ayah.objects.bulk_create(ayah_objs)
-        ayahs_by_surah_and_number = {(a.surah.number, a.number): a for a in Ayah.objects.filter(surah__mushaf=mushaf)}
-        word_objs = []
-        for surah_data in quran_data["surahs"]:
-            for ayah in surah_data["ayahs"]:
-                ayah_obj = ayahs_by_surah_and_number[(surah_data["number"], ayah["number"])]
-                for word in ayah["words"]:
-                    word_objs.append(Word(ayah=ayah_obj, text=word["text"], creator_id=user.id))
-        Word.objects.bulk_create(word_objs)
+                    mushaf=mushaf,
+                    number=surah_data["number"],
+                    name=surah_data["name"],
+                    period=surah_data["period"]
+                )
+                ayah_objs = []
+                for ayah in surah_data["ayahs"]:
+                    ayah_objs.append(Ayah(
+                        creator_id=user.id,
+                        surah=surah,
+                        number=ayah["number"],
+                        sajdah=ayah["sajdah"],
+                        is_bismillah=ayah["is_bismillah"],
+                        bismillah_text=ayah["bismillah_text"],
+                    ))
+                # copy_insert sets the primary keys, so the words can reference the ayahs
+                copy_insert(Ayah, ayah_objs)
+                for ayah, ayah_obj in zip(surah_data["ayahs"], ayah_objs):
+                    for word in ayah["words"]:
+                        word_objs.append(Word(
+                            ayah=ayah_obj,
+                            text=word["text"],
+                            normalized_text=normalize_arabic(word["text"]),
+                            creator_id=user.id,
+                        ))
+                if len(word_objs) >= COPY_BATCH_SIZE:
+                    copy_insert(Word, word_objs)
+                    word_objs = []
+            copy_insert(Word, word_objs)
+    except Exception as e:
+        Notification.objects.create(
+            user=user,
+            resource_controller="mushafs",
+            resource_action="import",
+            status=Notification.STATUS_NOTHING,
+            description='Mushaf import failed',
+            message=f'Failed to import mushaf: {str(e)}',
+            message_type=Notification.MESSAGE_TYPE_FAILED
+        )
+        return f'Failed to import mushaf: {str(e)}'
+    finally:
+        storage.delete(file_name)
     # Send notification to user
     Notification.objects.create(
         user=user,
@@ -71,49 +120,135 @@ def import_mushaf_task(quran_data, user_id):
     )
     return f'Mushaf {mushaf.name} imported successfully.'
 
+def _iter_ayah_translations(translation_data, structure):
+    """Yield `(ayah_id, text, bismillah)` for each ayah translation of an import that exists in the mushaf."""
+    # Root-level bismillah text (if provided) – used as default for all ayahs
+    default_bismillah = translation_data.get("bismillah_text")
+    for surah_data in translation_data["surahs"]:
+        surah_number = surah_data["number"]
+        for ayah_data in surah_data["ayah_translations"]:
+            ayah_id = structure.ayah_id(surah_number, ayah_data["number"])
+            if ayah_id is None:
+                # Skip if corresponding ayah not found (data mismatch)
+                continue
+            yield ayah_id, ayah_data["text"], ayah_data.get("bismillah_text") or default_bismillah
+
+
+def _upsert_ayah_translations(translation, translation_data, structure, user_id):
+    """
+    Apply an import to an existing Translation, writing only the ayah translations that changed.
+
+    Texts are compared by MD5, computed by the database for the stored rows, so
+    unchanged rows are neither read in full nor written. Returns the counts of
+    inserted, updated, deleted and unchanged rows.
+    """
+    incoming = {}
+    for ayah_id, text, bismillah in _iter_ayah_translations(translation_data, structure):
+        incoming[ayah_id] = (text, bismillah)
+
+    existing = (
+        AyahTranslation.objects
+        .filter(translation=translation)
+        .annotate(text_md5=MD5('text'))
+        .order_by('id')
+        .values_list('id', 'ayah_id', 'text_md5', 'bismillah')
+    )
+    to_update = []
+    to_delete = []
+    seen = set()
+    unchanged = 0
+    now = timezone.now()
+    for pk, ayah_id, text_md5, bismillah in existing.iterator(chunk_size=5000):
+        if ayah_id not in incoming or ayah_id in seen:
+            # Gone from the import, or a duplicate row of the ayah
+            to_delete.append(pk)
+            continue
+        seen.add(ayah_id)
+        new_text, new_bismillah = incoming[ayah_id]
+        if hashlib.md5(new_text.encode('utf-8')).hexdigest() == text_md5 and new_bismillah == bismillah:
+            unchanged += 1
+        else:
+            to_update.append(AyahTranslation(id=pk, text=new_text, bismillah=new_bismillah, updated_at=now))
+    to_insert = [
+        AyahTranslation(
+            creator_id=user_id,
+            translation_id=translation.id,
+            ayah_id=ayah_id,
+            text=text,
+            bismillah=bismillah,
+        )
+        for ayah_id, (text, bismillah) in incoming.items() if ayah_id not in seen
+    ]
+
+    with batched_content_version_bumps():
+        if to_delete:
+            AyahTranslation.objects.filter(id__in=to_delete).delete()
+        if to_update:
+            AyahTranslation.objects.bulk_update(to_update, ['text', 'bismillah', 'updated_at'], batch_size=1000)
+        copy_insert(AyahTranslation, to_insert)
+        changed_ids = [obj.id for obj in to_update] + [obj.id for obj in to_insert]
+        if changed_ids:
+            update_search_vectors(AyahTranslation.objects.filter(id__in=changed_ids), translation.language)
+        if to_delete or changed_ids:
+            # bulk_update and copy_insert send no signals
+            bump_content_version(Translation, 'id', translation.id)
+    return len(to_insert), len(to_update), len(to_delete), unchanged
+
+
 @shared_task
-def import_translation_task(translation_data, user_id):
+def import_translation_task(translation_data, user_id, upsert=False):
+    """
+    Import a Translation.
+
+    With `upsert`, an existing translation of the same mushaf, translator and
+    language is corrected in place: only new, changed and removed ayah
+    translations are written, and its content version moves once.
+    """
     User = get_user_model()
     user = User.objects.get(id=user_id)
     with transaction.atomic():
         translator, _ = User.objects.get_or_create(username=translation_data["translator_username"])
         mushaf = Mushaf.objects.get(short_name=translation_data["mushaf"])
-        translation = Translation.objects.create(
-            creator_id=user.id,
-            mushaf_id=mushaf.id,
-            translator_id=translator.id,
-            source=translation_data["source"],
-            status="published",
-            language=translation_data["language"],
-        )
-        # Build a lookup for Ayah objects of this mushaf keyed by (surah_number, ayah_number)
-        ayah_lookup = {
-            (a.surah.number, a.number): a.id
-            for a in Ayah.objects.filter(surah__mushaf=mushaf).only("id", "number", "surah__number").select_related("surah")
-        }
-
-        ayah_translations = []
-        # Root-level bismillah text (if provided) – used as default for all ayahs
-        default_bismillah = translation_data.get("bismillah_text")
-
-        for surah_data in translation_data["surahs"]:
-            surah_number = surah_data["number"]
-            for ayah_data in surah_data["ayah_translations"]:
-                ayah_number = ayah_data["number"]
-                ayah_id = ayah_lookup.get((surah_number, ayah_number))
-                if ayah_id is None:
-                    # Skip if corresponding ayah not found (data mismatch)
-                    continue
-                ayah_translations.append(
-                    AyahTranslation(
-                        creator_id=user.id,
-                        translation_id=translation.id,
-                        ayah_id=ayah_id,
-                        text=ayah_data["text"],
-                        bismillah=ayah_data.get("bismillah_text") or default_bismillah,
-                    )
+        structure = get_mushaf_structure(mushaf)
+        translation = None
+        if upsert:
+            translation = (
+                Translation.objects
+                .select_for_update()
+                .filter(mushaf_id=mushaf.id, translator_id=translator.id, language=translation_data["language"])
+                .first()
+            )
+        if translation is not None:
+            inserted, updated, deleted, unchanged = _upsert_ayah_translations(translation, translation_data, structure, user.id)
+            if translation.source != translation_data["source"]:
+                translation.source = translation_data["source"]
+                translation.save(update_fields=['source', 'updated_at'])
+            message = (
+                f'Translation {translation.uuid} updated: {inserted} inserted, {updated} updated, '
+                f'{deleted} deleted, {unchanged} unchanged.'
+            )
+        else:
+            translation = Translation.objects.create(
+                creator_id=user.id,
+                mushaf_id=mushaf.id,
+                translator_id=translator.id,
+                source=translation_data["source"],
+                status="published",
+                language=translation_data["language"],
+            )
+            ayah_translations = [
+                AyahTranslation(
+                    creator_id=user.id,
+                    translation_id=translation.id,
+                    ayah_id=ayah_id,
+                    text=text,
+                    bismillah=bismillah,
                 )
-        AyahTranslation.objects.bulk_create(ayah_translations)
+                for ayah_id, text, bismillah in _iter_ayah_translations(translation_data, structure)
+            ]
+            copy_insert(AyahTranslation, ayah_translations)
+            update_search_vectors(translation.ayah_translations.all(), translation.language)
+            message = f'Translation {translation.uuid} imported successfully.'
     # Send notification to user
     Notification.objects.create(
         user=user,
@@ -122,10 +257,31 @@ def import_translation_task(translation_data, user_id):
         resource_uuid=translation.uuid,
         status=Notification.STATUS_NOTHING,
         description=f'Translation import complete',
-        message=f'Translation {translation.uuid} imported successfully.',
+        message=message,
         message_type=Notification.MESSAGE_TYPE_SUCCESS
     )
-    return f'Translation {translation.uuid} imported successfully.'
+    return message
+
+def _alignment_timestamps(recitation_surah, words, alignments):
+    """Validate WordAlignments of `words` and build their unsaved RecitationSurahTimestamps."""
+    from quran.models import RecitationSurahTimestamp
+    timestamp_objs = []
+    for word_alignment in alignments:
+        start, end = word_alignment.start, word_alignment.end
+        if start < 0 or (end is not None and end < start):
+            raise ValueError(f'Invalid alignment for word {words[word_alignment.word_index].text!r}: start {start}, end {end}.')
+        timestamp_objs.append(RecitationSurahTimestamp(
+            recitation_surah=recitation_surah,
+            start_time=(datetime.min + timedelta(seconds=start)).time(),
+            end_time=(datetime.min + timedelta(seconds=end)).time() if end else None,
+            word=words[word_alignment.word_index]
+        ))
+    return timestamp_objs
+
+
+def _seconds(value):
+    return value.hour * 3600 + value.minute * 60 + value.second + value.microsecond / 1e6
+
 
 @shared_task(serializer="pickle")
 def generate_recitation_surah_timestamps_task(recitation, surah, file_obj):
@@ -153,49 +309,24 @@ def generate_recitation_surah_timestamps_task(recitation, surah, file_obj):
     try:
         if audio_url and text:
             try:
-                headers = {}
-                if getattr(settings, 'FORCED_ALIGNMENT_SECRET_KEY', None):
-                    if settings.FORCED_ALIGNMENT_SECRET_KEY:
-                        headers['Authorization'] = settings.FORCED_ALIGNMENT_SECRET_KEY
-                align_response = requests.post(
-                    f'{settings.FORCED_ALIGNMENT_API_URL}/align',
-                    json={
-                        'mp3_url': audio_url,
-                        'text': text,
-                        'language': 'ar'
-                    },
-                    headers=headers if headers else None,
-                    timeout=120
-                )
-                align_response.raise_for_status()
-                alignment_data = align_response.json()
-                from datetime import datetime, timedelta
-                # Match force-alignment words to ayah words by text
-                word_idx = 0
-                for word_data in alignment_data:
-                    # Ensure 'word' key exists in word_data
-                    # Find the next matching word in ayah words
-                    while word_idx < len(words) and words[word_idx].text != word_data['text']:
-                        word_idx += 1
-                    if word_idx < len(words):
-                        word_obj = words[word_idx]
-                        start_time = (datetime.min + timedelta(seconds=word_data['start'])).time()
-                        end_time = (datetime.min + timedelta(seconds=word_data['end'])).time() if word_data.get('end') else None
-                        # Ensure we have a RecitationSurah for this recitation/surah combo
-                        # recitation_surah, _ = RecitationSurah.objects.get_or_create(
-                        #     recitation=recitation,
-                        #     surah=surah,
-                        #     defaults={"file_id": getattr(recitation, "file_id", None)},
-                        # )
-
-                        RecitationSurahTimestamp.objects.create(
-                            recitation_surah=recitation_surah,
-                            start_time=start_time,
-                            end_time=end_time,
-                            word=word_obj
-                        )
-                        word_idx += 1
-                    # If not matched, skip this word_data
+                # Reuse the alignment of the same audio to the same text, whatever
+                # the recitation or mushaf, and only call the aligner otherwise
+                word_texts = [w.text for w in words]
+                text_hash = surah_text_hash(word_texts)
+                alignment = load_cached_alignment(file_obj.file_hash, text_hash) if file_obj.file_hash else None
+                cached = alignment is not None
+                if not cached:
+                    # Align the surah in ayah windows, collecting every timestamp
+                    # before anything is written
+                    alignment = align_recitation(audio_url, word_texts, [w.ayah_id for w in words])
+                timestamp_objs = _alignment_timestamps(recitation_surah, words, alignment.alignments)
+                # A rerun replaces the previous timestamps, readers see either set but never a mix
+                with transaction.atomic():
+                    RecitationSurahTimestamp.objects.filter(recitation_surah=recitation_surah).delete()
+                    copy_insert(RecitationSurahTimestamp, timestamp_objs)
+                    pack_recitation_surah_timestamps(recitation_surah)
+                if not cached and file_obj.file_hash:
+                    save_cached_alignment(file_obj.file_hash, text_hash, alignment)
                 # Send notification to user if available
                 if user:
                     Notification.objects.create(
@@ -205,7 +336,11 @@ def generate_recitation_surah_timestamps_task(recitation, surah, file_obj):
                         resource_uuid=getattr(recitation, 'uuid', None),
                         status=Notification.STATUS_NOTHING,
                         description=f'Recitation timestamps generated',
-                        message=f'Recitation timestamps generated for recitation {getattr(recitation, "uuid", "")}.',
+                        message=(
+                            f'Recitation timestamps generated for recitation {getattr(recitation, "uuid", "")}: '
+                            f'{alignment.coverage:.0%} of the words aligned, confidence {alignment.confidence:.0%}'
+                            f'{" (reused a previous alignment of this audio)" if cached else ""}.'
+                        ),
                         message_type=Notification.MESSAGE_TYPE_SUCCESS
                     )
                 return 'timestamps generated'
@@ -251,3 +386,165 @@ def generate_recitation_surah_timestamps_task(recitation, surah, file_obj):
                 message_type=Notification.MESSAGE_TYPE_FAILED
             )
         return f'Failed to generate timestamps: {str(e)}'
+
+@shared_task
+def realign_recitation_surah_task(recitation_surah_id, user_id):
+    """
+    Re-align only the ayahs of a RecitationSurah whose words are unaligned or scored low.
+
+    Word scores come from the stored alignment of the file; without one, words
+    that have a timestamp count as confidently aligned. Only the timestamps of
+    words that got a better alignment are replaced.
+    """
+    from quran.models import RecitationSurah, RecitationSurahTimestamp, Word
+    User = get_user_model()
+    user = User.objects.get(id=user_id)
+    recitation_surah = RecitationSurah.objects.select_related('recitation', 'file').get(id=recitation_surah_id)
+    file_obj = recitation_surah.file
+    try:
+        words = list(Word.objects.filter(ayah__surah_id=recitation_surah.surah_id).order_by('ayah__number', 'id'))
+        word_texts = [w.text for w in words]
+        text_hash = surah_text_hash(word_texts)
+        alignment = load_cached_alignment(file_obj.file_hash, text_hash) if file_obj.file_hash else None
+        if alignment is None:
+            word_indices = {w.id: i for i, w in enumerate(words)}
+            timestamps = RecitationSurahTimestamp.objects.filter(recitation_surah=recitation_surah, word__isnull=False)
+            alignment = AlignmentResult(sorted(
+                WordAlignment(word_indices[word_id], _seconds(start), _seconds(end) if end else None, 1.0)
+                for word_id, start, end in timestamps.values_list('word_id', 'start_time', 'end_time')
+                if word_id in word_indices
+            ), len(words))
+
+        ranges = low_confidence_ranges(alignment, [w.ayah_id for w in words], settings.FORCED_ALIGNMENT_MIN_SCORE)
+        changed = set()
+        if ranges:
+            previous_confidence = alignment.confidence
+            alignment, changed = realign_ranges(file_obj.get_absolute_url(), word_texts, alignment, ranges)
+            changed_alignments = [a for a in alignment.alignments if a.word_index in changed]
+            timestamp_objs = _alignment_timestamps(recitation_surah, words, changed_alignments)
+            with transaction.atomic():
+                RecitationSurahTimestamp.objects.filter(
+                    recitation_surah=recitation_surah,
+                    word_id__in=[words[i].id for i in changed],
+                ).delete()
+                copy_insert(RecitationSurahTimestamp, timestamp_objs)
+                pack_recitation_surah_timestamps(recitation_surah)
+            if file_obj.file_hash:
+                save_cached_alignment(file_obj.file_hash, text_hash, alignment)
+            message = (
+                f'Re-aligned {sum(end - start for start, end in ranges)} words in {len(ranges)} ranges of recitation '
+                f'{recitation_surah.recitation.uuid}, {len(changed)} improved: confidence '
+                f'{previous_confidence:.0%} -> {alignment.confidence:.0%}, {alignment.coverage:.0%} of the words aligned.'
+            )
+        else:
+            message = f'Nothing to re-align for recitation {recitation_surah.recitation.uuid}, every word is aligned with confidence.'
+    except Exception as e:
+        Notification.objects.create(
+            user=user,
+            resource_controller="recitations",
+            resource_action="realign",
+            resource_uuid=recitation_surah.recitation.uuid,
+            status=Notification.STATUS_NOTHING,
+            description='Failed to re-align recitation timestamps',
+            message=f'Failed to re-align recitation timestamps for recitation {recitation_surah.recitation.uuid}: {str(e)}',
+            message_type=Notification.MESSAGE_TYPE_FAILED
+        )
+        return f'Failed to re-align timestamps: {str(e)}'
+    Notification.objects.create(
+        user=user,
+        resource_controller="recitations",
+        resource_action="realign",
+        resource_uuid=recitation_surah.recitation.uuid,
+        status=Notification.STATUS_NOTHING,
+        description='Recitation timestamps re-aligned',
+        message=message,
+        message_type=Notification.MESSAGE_TYPE_SUCCESS
+    )
+    return message
+
+@shared_task
+def build_mushaf_snapshot_task(mushaf_id):
+    from quran.snapshots import build_mushaf_snapshot
+    mushaf = Mushaf.objects.get(id=mushaf_id)
+    snapshot = build_mushaf_snapshot(mushaf)
+    return f'Mushaf {mushaf.short_name} snapshot v{snapshot.version} built.'
+
+@shared_task
+def rebuild_takhtit_breakers_task(takhtit_ids):
+    """Rebuild the breaker ordinals and word positions of Takhtits whose breakers were deleted with their ayahs or words."""
+    takhtits = Takhtit.objects.filter(id__in=takhtit_ids)
+    for takhtit in takhtits:
+        with transaction.atomic(), batched_content_version_bumps():
+            rebuild_ayah_breaker_ordinals(takhtit)
+            rebuild_takhtit_word_positions(takhtit)
+            # Responses cached between the delete and the rebuild hold the old layout
+            bump_content_version(Takhtit, 'id', takhtit.id)
+    return f'Breakers of {len(takhtits)} takhtits rebuilt.'
+
+@shared_task
+def import_takhtit_breakers_task(takhtit_id, breaker_type, items, user_id):
+    """Replace the `breaker_type` AyahBreakers of a Takhtit with one per verse key in `items`."""
+    User = get_user_model()
+    user = User.objects.get(id=user_id)
+    takhtit = Takhtit.objects.select_related('mushaf').get(id=takhtit_id)
+    try:
+        structure = get_mushaf_structure(takhtit.mushaf)
+        breaker_objs = []
+        rejects = []
+        seen = set()
+        for item in items:
+            try:
+                surah_number, first, last = parse_verse_reference(item)
+            except ValueError as e:
+                rejects.append((item, str(e)))
+                continue
+            if first != last:
+                rejects.append((item, 'Ranges are not allowed, a breaker starts at a single ayah.'))
+                continue
+            ayah_id = structure.ayah_id(surah_number, first)
+            if ayah_id is None:
+                rejects.append((item, 'Ayah does not exist in this mushaf.'))
+                continue
+            if ayah_id in seen:
+                rejects.append((item, 'Duplicate of an earlier item.'))
+                continue
+            seen.add(ayah_id)
+            breaker_objs.append(AyahBreaker(ayah_id=ayah_id, takhtit=takhtit, type=breaker_type, creator_id=user.id))
+
+        with transaction.atomic(), batched_content_version_bumps():
+            AyahBreaker.objects.filter(takhtit=takhtit, type=breaker_type).delete()
+            AyahBreaker.objects.bulk_create(breaker_objs, batch_size=1000)
+            # bulk_create sends no signals
+            bump_content_version(Takhtit, 'id', takhtit.id)
+            rebuild_ayah_breaker_ordinals(takhtit, breaker_type)
+            if breaker_type == AyahBreakerType.PAGE:
+                rebuild_takhtit_word_positions(takhtit)
+    except Exception as e:
+        Notification.objects.create(
+            user=user,
+            resource_controller="takhtits",
+            resource_action="import",
+            resource_uuid=takhtit.uuid,
+            status=Notification.STATUS_NOTHING,
+            description=f'Failed to import {breaker_type} breakers',
+            message=f'Failed to import {breaker_type} breakers for takhtit {takhtit.uuid}: {str(e)}',
+            message_type=Notification.MESSAGE_TYPE_FAILED
+        )
+        return f'Failed to import breakers: {str(e)}'
+
+    message = f'{len(breaker_objs)} {breaker_type} breakers imported for takhtit {takhtit.uuid}.'
+    if rejects:
+        shown = '; '.join(f'{item}: {reason}' for item, reason in rejects[:20])
+        more = f' (and {len(rejects) - 20} more)' if len(rejects) > 20 else ''
+        message += f' {len(rejects)} rejected: {shown}{more}'
+    Notification.objects.create(
+        user=user,
+        resource_controller="takhtits",
+        resource_action="import",
+        resource_uuid=takhtit.uuid,
+        status=Notification.STATUS_NOTHING,
+        description='Breaker import complete',
+        message=message,
+        message_type=Notification.MESSAGE_TYPE_WARNING if rejects else Notification.MESSAGE_TYPE_SUCCESS
+    )
+    return message
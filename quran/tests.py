@@ -1,3 +1,483 @@
-from django.test import TestCase
+import datetime
+import json
+import mmap
+import shutil
+import tempfile
+import threading
+import time
+import urllib.request
+import uuid
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from unittest import mock
 
-# Create your tests here.
+from django.core.cache import cache
+from django.core.files.storage import FileSystemStorage
+from django.test import SimpleTestCase, TestCase, override_settings
+
+from account.models import CustomUser
+from core.models import File
+from quran import alignment, snapshots, tasks
+from quran.breakers import load_ayah_breaker_ordinals, rebuild_ayah_breaker_ordinals
+from quran.models import (
+    Ayah,
+    AyahBreaker,
+    AyahBreakerOrdinal,
+    AyahBreakerType,
+    AyahTranslation,
+    Mushaf,
+    Recitation,
+    RecitationSurah,
+    RecitationSurahTimestamp,
+    Surah,
+    Takhtit,
+    Status,
+    Translation,
+    Word,
+)
+from quran.alignment import AlignmentResult, WordAlignment, align_recitation, ayah_windows, low_confidence_ranges, realign_ranges
+from quran.audio import MP3Frames
+from quran.timestamps import pack_recitation_surah_timestamps, recitation_word_timestamps
+
+# The stub recording: MPEG-1 Layer III frames of 128kbps at 48kHz, mono
+FRAME_HEADER = bytes([0xFF, 0xFB, 0x94, 0xC0])
+FRAME_LENGTH = 384
+FRAME_SECONDS = 0.024
+# Each word is recited for 0.4s of a 0.48s (20 frame) slot
+WORD_SECONDS = 0.48
+WORD_LENGTH = 0.4
+WORDS_PER_AYAH = 3
+AYAHS = 12
+
+
+def make_recording(seconds):
+    """Silent MP3 frames, each carrying its own index so the stub aligner knows where a clip was cut."""
+    return b''.join(
+        FRAME_HEADER + index.to_bytes(4, 'big') + bytes(FRAME_LENGTH - 8)
+        for index in range(round(seconds / FRAME_SECONDS))
+    )
+
+
+def word_start(text):
+    return int(text[1:]) * WORD_SECONDS
+
+
+class StubAligner(ThreadingHTTPServer):
+    """
+    Forced alignment service double that serves the recording and the staged clips too.
+
+    /align reads the clip behind `mp3_url` and answers with the tokens of the
+    words recited inside it, timed relative to the clip like the real service.
+    """
+    daemon_threads = True
+
+    def __init__(self, recording, clip_dir):
+        super().__init__(('127.0.0.1', 0), StubAlignerHandler)
+        self.url = f'http://127.0.0.1:{self.server_port}'
+        self.recording = recording
+        self.clip_dir = clip_dir
+        self.lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        self.requests = []
+        self.active = 0
+        self.peak = 0
+        self.delay = 0
+        # First words of the texts to answer with a 503 once
+        self.fail_once = set()
+        # Misspell the last word of every text, so it aligns with a lower score
+        self.misspell_last = False
+        # Shift every token by this many seconds
+        self.shift = 0.0
+
+    def align(self, payload):
+        with urllib.request.urlopen(payload['mp3_url']) as response:
+            clip = response.read()
+        clip_start = int.from_bytes(clip[4:8], 'big') * FRAME_SECONDS
+        clip_end = clip_start + len(clip) // FRAME_LENGTH * FRAME_SECONDS
+        texts = payload['text'].split(' ')
+        with self.lock:
+            self.requests.append({
+                'text': payload['text'],
+                'keys': set(payload),
+                'clip_start': clip_start,
+                'clip_end': clip_end,
+            })
+        tokens = []
+        for i, text in enumerate(texts):
+            start = word_start(text)
+            if clip_start <= start and start + WORD_LENGTH <= clip_end:
+                tokens.append({
+                    'text': text + 'x' if self.misspell_last and i == len(texts) - 1 else text,
+                    'start': start - clip_start + self.shift,
+                    'end': start + WORD_LENGTH - clip_start + self.shift,
+                })
+        return tokens
+
+
+class StubAlignerHandler(BaseHTTPRequestHandler):
+    def log_message(self, format, *args):
+        pass
+
+    def send_body(self, status, body, content_type):
+        self.send_response(status)
+        self.send_header('Content-Type', content_type)
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_GET(self):
+        if self.path == '/recording.mp3':
+            return self.send_body(200, self.server.recording, 'audio/mpeg')
+        if self.path.startswith('/clips/'):
+            with open(f'{self.server.clip_dir}/{self.path[len("/clips/"):]}', 'rb') as fp:
+                return self.send_body(200, fp.read(), 'audio/mpeg')
+        self.send_body(404, b'', 'text/plain')
+
+    def do_POST(self):
+        payload = json.loads(self.rfile.read(int(self.headers['Content-Length'])))
+        server = self.server
+        first_word = payload['text'].split(' ')[0]
+        with server.lock:
+            fail = first_word in server.fail_once
+            server.fail_once.discard(first_word)
+            server.active += 1
+            server.peak = max(server.peak, server.active)
+        try:
+            time.sleep(server.delay)
+            if fail:
+                with server.lock:
+                    server.requests.append({'text': payload['text'], 'failed': True})
+                return self.send_body(503, b'', 'text/plain')
+            self.send_body(200, json.dumps(server.align(payload)).encode(), 'application/json')
+        finally:
+            with server.lock:
+                server.active -= 1
+
+
+class StubAlignerTestCase(SimpleTestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.word_texts = [f'w{i:02d}' for i in range(AYAHS * WORDS_PER_AYAH)]
+        cls.ayah_ids = [i // WORDS_PER_AYAH for i in range(len(cls.word_texts))]
+        cls.clip_dir = tempfile.mkdtemp()
+        cls.addClassCleanup(shutil.rmtree, cls.clip_dir)
+        cls.server = StubAligner(make_recording(len(cls.word_texts) * WORD_SECONDS), cls.clip_dir)
+        threading.Thread(target=cls.server.serve_forever, daemon=True).start()
+        cls.addClassCleanup(cls.server.server_close)
+        cls.addClassCleanup(cls.server.shutdown)
+
+    def setUp(self):
+        self.server.reset()
+        settings = override_settings(
+            FORCED_ALIGNMENT_API_URL=self.server.url,
+            FORCED_ALIGNMENT_SECRET_KEY='',
+            FORCED_ALIGNMENT_WINDOW_AYAHS=4,
+            FORCED_ALIGNMENT_WINDOW_OVERLAP=1,
+            FORCED_ALIGNMENT_MAX_PARALLEL=2,
+            FORCED_ALIGNMENT_AUDIO_MARGIN=0.5,
+            FORCED_ALIGNMENT_AUDIO_DRIFT=0.0,
+            FORCED_ALIGNMENT_TIMEOUT=10,
+            FORCED_ALIGNMENT_RETRIES=2,
+        )
+        settings.enable()
+        self.addCleanup(settings.disable)
+        storage = FileSystemStorage(location=self.clip_dir, base_url=f'{self.server.url}/clips/')
+        patcher = mock.patch.object(alignment, 'get_clip_storage', return_value=storage)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        # The session is built from the settings on first use
+        alignment._session = None
+        self.addCleanup(setattr, alignment, '_session', None)
+
+    def align(self):
+        return align_recitation(f'{self.server.url}/recording.mp3', self.word_texts, self.ayah_ids)
+
+    def windows(self):
+        return ayah_windows(self.ayah_ids, 4, 1)
+
+
+class AyahWindowsTests(SimpleTestCase):
+    def test_windows_overlap_by_whole_ayahs(self):
+        self.assertEqual(ayah_windows([1, 1, 2, 3, 3, 3, 4], 2, 1), [(0, 3), (2, 6), (3, 7)])
+
+    def test_short_text_is_one_window(self):
+        self.assertEqual(ayah_windows([1, 1], 20, 2), [(0, 2)])
+
+
+class MP3FramesTests(SimpleTestCase):
+    def test_clip_is_whole_frames_covering_the_span(self):
+        frames = MP3Frames(b'ID3\x04\x00\x00\x00\x00\x00\x04tags' + make_recording(2.4))
+        self.assertEqual(len(frames.offsets), 100)
+        data, start, end = frames.clip(1.0, 1.5)
+        self.assertAlmostEqual(start, 0.984)
+        self.assertAlmostEqual(end, 1.512)
+        self.assertEqual(int.from_bytes(data[4:8], 'big'), 41)
+        self.assertAlmostEqual(MP3Frames(data).duration, end - start)
+
+
+class AlignRecitationTests(StubAlignerTestCase):
+    def test_each_window_is_sent_with_its_own_audio_span(self):
+        self.align()
+        windows = self.windows()
+        self.assertEqual(len(self.server.requests), len(windows))
+        self.assertTrue(all(request['keys'] == {'mp3_url', 'text', 'language'} for request in self.server.requests))
+        requests = {request['text']: request for request in self.server.requests}
+        for start, end in windows:
+            request = requests[' '.join(self.word_texts[start:end])]
+            self.assertLessEqual(request['clip_start'], word_start(self.word_texts[start]))
+            self.assertGreaterEqual(request['clip_end'], word_start(self.word_texts[end - 1]) + WORD_LENGTH)
+            self.assertLess(request['clip_end'] - request['clip_start'], (end - start) * WORD_SECONDS + 2)
+
+    def test_windows_are_stitched_on_recording_time(self):
+        result = self.align()
+        self.assertEqual(result.coverage, 1.0)
+        for word_alignment in result.alignments:
+            self.assertAlmostEqual(word_alignment.start, word_alignment.word_index * WORD_SECONDS)
+            self.assertAlmostEqual(word_alignment.end, word_alignment.word_index * WORD_SECONDS + WORD_LENGTH)
+
+    def test_overlapping_words_take_the_better_scored_window(self):
+        self.server.misspell_last = True
+        result = self.align()
+        # The last word of a window is misspelled there but exact in the next window
+        scores = [word_alignment.score for word_alignment in result.alignments]
+        self.assertEqual(scores[:-1], [1.0] * (len(self.word_texts) - 1))
+        self.assertLess(scores[-1], 1.0)
+        self.assertAlmostEqual(result.alignments[-1].start, (len(self.word_texts) - 1) * WORD_SECONDS)
+
+    def test_windows_run_concurrently_up_to_the_limit(self):
+        self.server.delay = 0.2
+        self.align()
+        self.assertEqual(self.server.peak, 2)
+
+    def test_failed_window_is_retried_alone(self):
+        start, end = self.windows()[1]
+        self.server.fail_once = {self.word_texts[start]}
+        result = self.align()
+        texts = [request['text'] for request in self.server.requests]
+        self.assertEqual(len(texts), len(self.windows()) + 1)
+        self.assertEqual(texts.count(' '.join(self.word_texts[start:end])), 2)
+        self.assertEqual(result.coverage, 1.0)
+
+    def test_tokens_outside_the_span_are_dropped(self):
+        self.server.shift = 60.0
+        self.assertEqual(self.align().alignments, [])
+
+    def test_staged_clips_are_deleted(self):
+        self.align()
+        self.assertEqual(FileSystemStorage(location=self.clip_dir).listdir('')[1], [])
+
+
+class RecordingClipsTests(StubAlignerTestCase):
+    def test_recording_is_mapped_from_a_temporary_file(self):
+        with alignment.RecordingClips(f'{self.server.url}/recording.mp3') as clips:
+            self.assertIsInstance(clips.recording, mmap.mmap)
+            self.assertAlmostEqual(clips.duration, len(self.word_texts) * WORD_SECONDS)
+            recording_file = clips.file
+        self.assertTrue(recording_file.closed)
+        self.assertIsNone(clips.recording)
+
+    def test_recording_that_is_not_an_mp3_is_rejected(self):
+        for name, content in (('notes.txt', b'not audio'), ('empty.mp3', b'')):
+            with open(f'{self.clip_dir}/{name}', 'wb') as fp:
+                fp.write(content)
+            self.addCleanup(FileSystemStorage(location=self.clip_dir).delete, name)
+            clips = alignment.RecordingClips(f'{self.server.url}/clips/{name}')
+            with self.assertRaises(ValueError):
+                clips.__enter__()
+            self.assertTrue(clips.file.closed)
+
+
+class RealignRangesTests(StubAlignerTestCase):
+    # Ayah 5 (words 15 to 17) is misaligned, every other word is right
+    LOW_WORDS = range(15, 18)
+
+    def previous_result(self):
+        return AlignmentResult([
+            WordAlignment(i, 0.0, 0.1, 0.4) if i in self.LOW_WORDS
+            else WordAlignment(i, i * WORD_SECONDS, i * WORD_SECONDS + WORD_LENGTH, 1.0)
+            for i in range(len(self.word_texts))
+        ], len(self.word_texts))
+
+    def realign(self):
+        result = self.previous_result()
+        ranges = low_confidence_ranges(result, self.ayah_ids, 0.8)
+        self.assertEqual(ranges, [(15, 18)])
+        return realign_ranges(f'{self.server.url}/recording.mp3', self.word_texts, result, ranges)
+
+    def test_range_is_sent_with_the_span_between_its_confident_neighbours(self):
+        result, changed = self.realign()
+        [request] = self.server.requests
+        self.assertEqual(request['text'], 'w15 w16 w17')
+        self.assertEqual(request['keys'], {'mp3_url', 'text', 'language'})
+        # From the end of word 14 to the start of word 18, rounded out to whole frames
+        span_start, span_end = 14 * WORD_SECONDS + WORD_LENGTH, 18 * WORD_SECONDS
+        self.assertLessEqual(request['clip_start'], span_start)
+        self.assertGreaterEqual(request['clip_end'], span_end)
+        self.assertLessEqual(request['clip_end'] - request['clip_start'], span_end - span_start + 2 * FRAME_SECONDS)
+        self.assertEqual(changed, set(self.LOW_WORDS))
+        for i in self.LOW_WORDS:
+            self.assertAlmostEqual(result.alignments[i].start, i * WORD_SECONDS)
+            self.assertEqual(result.alignments[i].score, 1.0)
+
+    def test_better_scored_alignment_outside_the_span_is_rejected(self):
+        # Exact matches, but placed after the first word of the next ayah
+        self.server.shift = 2.0
+        result, changed = self.realign()
+        self.assertEqual(changed, set())
+        self.assertEqual(result, self.previous_result())
+
+
+class MushafTestCase(TestCase):
+    """One surah of three ayahs of two words, with a translation and a takhtit paging every ayah."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = CustomUser.objects.create_user(username='editor', password='password')
+        cls.mushaf = Mushaf.objects.create(creator=cls.user, short_name='test', name='Test')
+        cls.surah = Surah.objects.create(creator=cls.user, mushaf=cls.mushaf, name='Al-Fatihah', number=1)
+        cls.ayahs = [Ayah.objects.create(creator=cls.user, surah=cls.surah, number=number) for number in range(1, 4)]
+        cls.words = [
+            Word.objects.create(creator=cls.user, ayah=ayah, text=f'word{ayah.number}{i}')
+            for ayah in cls.ayahs for i in range(2)
+        ]
+        cls.translation = Translation.objects.create(
+            creator=cls.user, mushaf=cls.mushaf, translator=cls.user, language='en'
+        )
+        for ayah in cls.ayahs:
+            AyahTranslation.objects.create(
+                creator=cls.user, translation=cls.translation, ayah=ayah, text=f'Ayah {ayah.number}'
+            )
+        cls.takhtit = Takhtit.objects.create(creator=cls.user, mushaf=cls.mushaf, account=cls.user)
+        for ayah in cls.ayahs:
+            AyahBreaker.objects.create(creator=cls.user, takhtit=cls.takhtit, ayah=ayah, type=AyahBreakerType.PAGE)
+        rebuild_ayah_breaker_ordinals(cls.takhtit)
+
+    def content_versions(self):
+        return (
+            Mushaf.objects.get(pk=self.mushaf.pk).content_version,
+            Translation.objects.get(pk=self.translation.pk).content_version,
+            Takhtit.objects.get(pk=self.takhtit.pk).content_version,
+        )
+
+
+class CascadeDeleteVersionTests(MushafTestCase):
+    def test_deleting_an_ayah_bumps_its_translation_and_takhtit(self):
+        mushaf_version, translation_version, takhtit_version = self.content_versions()
+        with mock.patch.object(tasks.rebuild_takhtit_breakers_task, 'delay') as delay:
+            with self.captureOnCommitCallbacks(execute=True):
+                self.ayahs[1].delete()
+        self.assertEqual(self.content_versions(), (mushaf_version + 1, translation_version + 1, takhtit_version + 1))
+        delay.assert_called_once_with([self.takhtit.id])
+
+    def test_breakers_are_renumbered_after_the_delete(self):
+        with mock.patch.object(tasks.rebuild_takhtit_breakers_task, 'delay', tasks.rebuild_takhtit_breakers_task):
+            with self.captureOnCommitCallbacks(execute=True):
+                self.ayahs[1].delete()
+        numbers = AyahBreakerOrdinal.objects.filter(takhtit=self.takhtit).order_by('number').values_list('ayah_id', 'number')
+        self.assertEqual(list(numbers), [(self.ayahs[0].id, 1), (self.ayahs[2].id, 2)])
+
+    def test_deleting_a_word_without_breakers_leaves_the_takhtit(self):
+        _, translation_version, takhtit_version = self.content_versions()
+        with self.captureOnCommitCallbacks(execute=True) as callbacks:
+            self.words[0].delete()
+        self.assertEqual(self.content_versions()[1:], (translation_version, takhtit_version))
+        self.assertEqual(callbacks, [])
+
+
+class AyahBreakerOrdinalsTests(MushafTestCase):
+    def test_without_a_takhtit_each_type_comes_from_one_takhtit(self):
+        # The older takhtit pages every ayah; a newer one pages ayah 2 only and adds a juz at ayah 3
+        newer = Takhtit.objects.create(creator=self.user, mushaf=self.mushaf, account=self.user)
+        AyahBreaker.objects.create(creator=self.user, takhtit=newer, ayah=self.ayahs[1], type=AyahBreakerType.PAGE)
+        AyahBreaker.objects.create(creator=self.user, takhtit=newer, ayah=self.ayahs[2], type=AyahBreakerType.JUZ)
+        rebuild_ayah_breaker_ordinals(newer)
+        AyahBreaker.objects.filter(takhtit=self.takhtit, ayah=self.ayahs[1]).delete()
+        rebuild_ayah_breaker_ordinals(self.takhtit)
+
+        breakers = load_ayah_breaker_ordinals([ayah.id for ayah in self.ayahs])
+        self.assertEqual(breakers, {
+            self.ayahs[0].id: [{'name': 'page', 'number': 1}],
+            self.ayahs[2].id: [{'name': 'page', 'number': 2}, {'name': 'juz', 'number': 1}],
+        })
+        self.assertEqual(load_ayah_breaker_ordinals([self.ayahs[1].id], newer.uuid), {
+            self.ayahs[1].id: [{'name': 'page', 'number': 1}],
+        })
+
+
+class RecitationWordTimestampsTests(MushafTestCase):
+    def setUp(self):
+        file = File.objects.create(format='mp3', size=1, s3_uuid=uuid.uuid4(), upload_name='001.mp3', uploader=self.user)
+        self.recitation = Recitation.objects.create(
+            creator=self.user, mushaf=self.mushaf, reciter_account=self.user, recitation_date=datetime.date(2026, 1, 1),
+            recitation_location='', duration=datetime.timedelta(seconds=3), recitation_type='murattal',
+        )
+        self.recitation_surah = RecitationSurah.objects.create(recitation=self.recitation, surah=self.surah, file=file)
+        for i, word in enumerate(self.words):
+            RecitationSurahTimestamp.objects.create(
+                recitation_surah=self.recitation_surah, word=word,
+                start_time=datetime.time(0, 0, i), end_time=datetime.time(0, 0, i, 500000),
+            )
+        pack_recitation_surah_timestamps(self.recitation_surah)
+
+    def expected(self):
+        return [
+            (i * 1000, i * 1000 + 500, word.id, word.uuid)
+            for i, word in enumerate(self.words) if Word.objects.filter(pk=word.pk).exists()
+        ]
+
+    def test_packed_timestamps_skip_the_rows(self):
+        expected = self.expected()
+        with self.assertNumQueries(2):
+            self.assertEqual(recitation_word_timestamps(self.recitation), expected)
+
+    def test_mushaf_edit_repacks_once(self):
+        # Ordinals after the deleted word move up by one
+        self.words[0].delete()
+        expected = self.expected()
+        self.assertEqual(recitation_word_timestamps(self.recitation), expected)
+        self.recitation_surah.refresh_from_db()
+        self.assertEqual(self.recitation_surah.packed_mushaf_version, self.content_versions()[0])
+        with self.assertNumQueries(2):
+            self.assertEqual(recitation_word_timestamps(self.recitation), expected)
+
+
+class MushafSnapshotTests(MushafTestCase):
+    def setUp(self):
+        Mushaf.objects.filter(pk=self.mushaf.pk).update(status=Status.PUBLISHED)
+        self.mushaf.refresh_from_db()
+        storage_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, storage_dir)
+        storage = FileSystemStorage(location=storage_dir, base_url='/snapshots/')
+        patcher = mock.patch.object(snapshots, 'get_snapshot_storage', return_value=storage)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        cache.clear()
+        self.url = f'/mushafs/{self.mushaf.uuid}/snapshot/'
+
+    def test_current_snapshot_is_served(self):
+        snapshot = snapshots.build_mushaf_snapshot(self.mushaf)
+        response = self.client.get(self.url)
+        self.assertEqual(response.status_code, 302)
+        self.assertEqual(response['ETag'], f'"{snapshot.etag}"')
+
+    def test_snapshot_is_rebuilt_after_an_edit_and_not_served_meanwhile(self):
+        old = snapshots.build_mushaf_snapshot(self.mushaf)
+        self.words[0].text = 'edited'
+        self.words[0].save()
+        with mock.patch.object(tasks.build_mushaf_snapshot_task, 'delay') as delay:
+            self.assertEqual(self.client.get(self.url).status_code, 404)
+            self.assertEqual(self.client.get(self.url).status_code, 404)
+        delay.assert_called_once_with(self.mushaf.id)
+
+        new = snapshots.build_mushaf_snapshot(self.mushaf)
+        self.assertEqual(new.version, old.version + 1)
+        response = self.client.get(self.url)
+        self.assertEqual(response.status_code, 302)
+        self.assertEqual(response['ETag'], f'"{new.etag}"')
+
+    def test_breaker_edit_makes_the_snapshot_out_of_date(self):
+        snapshot = snapshots.build_mushaf_snapshot(self.mushaf)
+        AyahBreaker.objects.filter(takhtit=self.takhtit, ayah=self.ayahs[1]).delete()
+        self.assertNotEqual(snapshot.source_version, snapshots.snapshot_source_version(self.mushaf))
@@ -0,0 +1,110 @@
+import struct
+
+from quran.models import Mushaf, RecitationSurah, RecitationSurahTimestamp, Word
+
+# A packed word timestamp is three little-endian int32: word ordinal, start and end in milliseconds
+_PACKED_ENTRY = struct.Struct('<iii')
+# Stands for a missing end time or a timestamp without a word
+NONE = -1
+
+
+def time_to_ms(value):
+    """Milliseconds since midnight of a `datetime.time`, truncating the microseconds."""
+    return ((value.hour * 60 + value.minute) * 60 + value.second) * 1000 + value.microsecond // 1000
+
+
+def format_ms(ms):
+    """Format milliseconds as HH:MM:SS.mmm, like the API always has."""
+    seconds, millis = divmod(ms, 1000)
+    minutes, seconds = divmod(seconds, 60)
+    hours, minutes = divmod(minutes, 60)
+    return f'{hours:02d}:{minutes:02d}:{seconds:02d}.{millis:03d}'
+
+
+def pack_timestamps(entries):
+    """Pack `(word_ordinal, start_ms, end_ms)` tuples, with None for a missing ordinal or end, into bytes."""
+    return b''.join(
+        _PACKED_ENTRY.pack(NONE if word_ordinal is None else word_ordinal, start_ms, NONE if end_ms is None else end_ms)
+        for word_ordinal, start_ms, end_ms in entries
+    )
+
+
+def unpack_timestamps(data):
+    """Yield the `(word_ordinal, start_ms, end_ms)` tuples of packed bytes, with None for the missing values."""
+    for word_ordinal, start_ms, end_ms in _PACKED_ENTRY.iter_unpack(bytes(data)):
+        yield (None if word_ordinal == NONE else word_ordinal), start_ms, (None if end_ms == NONE else end_ms)
+
+
+def pack_recitation_surah_timestamps(recitation_surah):
+    """
+    Rebuild the packed timestamps of a RecitationSurah from its RecitationSurahTimestamp rows.
+
+    Word ordinals are positions in the surah's words ordered by ayah number and
+    id, the order alignments are made in. They hold only as long as the words
+    do, so the mushaf's content_version is stored with them.
+    """
+    recitation_surah.packed_mushaf_version = (
+        Mushaf.objects.filter(surahs__id=recitation_surah.surah_id).values_list('content_version', flat=True).first()
+    )
+    word_ordinals = {
+        word_id: ordinal
+        for ordinal, word_id in enumerate(
+            Word.objects.filter(ayah__surah_id=recitation_surah.surah_id).order_by('ayah__number', 'id').values_list('id', flat=True)
+        )
+    }
+    rows = (
+        RecitationSurahTimestamp.objects
+        .filter(recitation_surah=recitation_surah)
+        .order_by('start_time', 'id')
+        .values_list('word_id', 'start_time', 'end_time')
+    )
+    recitation_surah.packed_timestamps = pack_timestamps(
+        (word_ordinals.get(word_id), time_to_ms(start_time), time_to_ms(end_time) if end_time else None)
+        for word_id, start_time, end_time in rows
+    )
+    recitation_surah.save(update_fields=['packed_timestamps', 'packed_mushaf_version', 'updated_at'])
+
+
+def recitation_word_timestamps(recitation):
+    """
+    Word timestamps of all surahs of a Recitation as `(start_ms, end_ms, word_id, word_uuid)`, ordered by start.
+
+    The packed timestamps are read without touching the RecitationSurahTimestamp
+    rows; all word ids and UUIDs come from one query. Surahs not packed yet, or
+    packed before the mushaf last changed (their word ordinals may have moved),
+    are packed again first, so only the first read after an edit reads the rows.
+    """
+    recitation_surahs = list(
+        RecitationSurah.objects
+        .filter(recitation=recitation)
+        .values_list('id', 'surah_id', 'packed_timestamps', 'packed_mushaf_version', 'surah__mushaf__content_version')
+    )
+    packed, stale_ids = [], []
+    for pk, surah_id, data, packed_version, mushaf_version in recitation_surahs:
+        if data is not None and packed_version == mushaf_version:
+            packed.append((surah_id, data))
+        else:
+            stale_ids.append(pk)
+    for recitation_surah in RecitationSurah.objects.filter(id__in=stale_ids):
+        pack_recitation_surah_timestamps(recitation_surah)
+        packed.append((recitation_surah.surah_id, recitation_surah.packed_timestamps))
+
+    entries = []
+    words_by_surah = {}
+    words = (
+        Word.objects
+        .filter(ayah__surah_id__in=[surah_id for surah_id, _ in packed])
+        .order_by('ayah__surah_id', 'ayah__number', 'id')
+        .values_list('ayah__surah_id', 'id', 'uuid')
+    )
+    for surah_id, word_id, word_uuid in words:
+        words_by_surah.setdefault(surah_id, []).append((word_id, word_uuid))
+    for surah_id, data in packed:
+        surah_words = words_by_surah.get(surah_id, [])
+        for word_ordinal, start_ms, end_ms in unpack_timestamps(data):
+            word_id, word_uuid = (
+                surah_words[word_ordinal] if word_ordinal is not None and word_ordinal < len(surah_words) else (None, None)
+            )
+            entries.append((start_ms, end_ms, word_id, word_uuid))
+    entries.sort(key=lambda entry: entry[0])
+    return entries
@@ -0,0 +1,49 @@
+import threading
+from contextlib import contextmanager
+
+from django.db.models import F
+from django.db.models.functions import Now
+
+_pending = threading.local()
+
+
+def bump_content_version(model, lookup, value):
+    """
+    Increment `content_version` of the `model` rows matching `lookup=value`.
+
+    The increment runs in the database, so concurrent bumps are never lost.
+    Inside `batched_content_version_bumps` the bump is deferred to the end of the block.
+    """
+    if value is None:
+        return
+    bumps = getattr(_pending, 'bumps', None)
+    if bumps is not None:
+        bumps.setdefault((model, lookup), set()).add(value)
+        return
+    model.objects.filter(**{lookup: value}).update(content_version=F('content_version') + 1, updated_at=Now())
+
+
+@contextmanager
+def batched_content_version_bumps():
+    """
+    Collect the bumps made inside the block and increment each affected row only once.
+
+    The bumps are applied only when the block exits normally. On an exception
+    they are dropped, so a failing query in an aborted transaction cannot hide
+    the original error.
+    """
+    if getattr(_pending, 'bumps', None) is not None:
+        # Nested block, the outermost one applies the bumps
+        yield
+        return
+    _pending.bumps = {}
+    try:
+        yield
+    except BaseException:
+        _pending.bumps = None
+        raise
+    bumps, _pending.bumps = _pending.bumps, None
+    for (model, lookup), values in bumps.items():
+        model.objects.filter(**{f'{lookup}__in': values}).update(
+            content_version=F('content_version') + 1, updated_at=Now()
+        )
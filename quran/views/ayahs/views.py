@@ -1,25 +1,39 @@
 from rest_framework import permissions, viewsets, status, filters, serializers
+from django.db.models import Prefetch
 from django_filters.rest_framework import DjangoFilterBackend
 from drf_spectacular.utils import extend_schema, extend_schema_view, OpenApiParameter, OpenApiTypes
 
 from core import permissions as core_permissions
-from core.pagination import CustomLimitOffsetPagination
-from quran.models import Surah, Ayah
+from core.pagination import CustomKeysetPagination
+from core.mixins import ConditionalGetMixin, versioned_validators
+from quran.models import Mushaf, Surah, Ayah, Takhtit
 from quran.serializers import AyahSerializer, AyahSerializerView, AyahAddSerializer
+from quran.loaders import with_ayah_stats
+from quran.arabic import search_terms
+from quran.search import AyahSearchFilter
+
+import uuid
 
 
 @extend_schema_view(
 	list=extend_schema(
 		summary="List all Ayahs (Quran verses)",
-		parameters=[OpenApiParameter("surah_uuid", OpenApiTypes.UUID, OpenApiParameter.QUERY)]
+		parameters=[
+			OpenApiParameter("surah_uuid", OpenApiTypes.UUID, OpenApiParameter.QUERY),
+			OpenApiParameter("takhtit", OpenApiTypes.UUID, OpenApiParameter.QUERY, description="UUID of the Takhtit whose breakers are returned. Defaults to the oldest takhtit that has them."),
+			OpenApiParameter("search", OpenApiTypes.STR, OpenApiParameter.QUERY, description="Words to look for, with or without tashkeel. Ayahs are ranked by how many of the words they contain and each result lists the matched word positions in `matches`."),
+		]
+	),
+	retrieve=extend_schema(
+		summary="Retrieve a specific Ayah by UUID",
+		parameters=[OpenApiParameter("takhtit", OpenApiTypes.UUID, OpenApiParameter.QUERY)]
 	),
-	retrieve=extend_schema(summary="Retrieve a specific Ayah by UUID"),
 	create=extend_schema(summary="Create a new Ayah record"),
 	update=extend_schema(summary="Update an existing Ayah record"),
 	partial_update=extend_schema(summary="Partially update an Ayah record"),
 	destroy=extend_schema(summary="Delete an Ayah record")
 )
-class AyahViewSet(viewsets.ModelViewSet):
+class AyahViewSet(ConditionalGetMixin, viewsets.ModelViewSet):
 	queryset = Ayah.objects.all().order_by('surah__number', 'number')
 	serializer_class = AyahSerializer
 	permission_classes = [
@@ -27,10 +41,12 @@ class AyahViewSet(viewsets.ModelViewSet):
 		core_permissions.IsCreatorOfParentOrReadOnly,
 		permissions.IsAuthenticatedOrReadOnly | permissions.DjangoModelPermissions
 	]
-	filter_backends = [DjangoFilterBackend, filters.SearchFilter, filters.OrderingFilter]
-	search_fields = ["number", "text"]
+	filter_backends = [DjangoFilterBackend, AyahSearchFilter, filters.OrderingFilter]
 	ordering_fields = ['created_at']
-	pagination_class = CustomLimitOffsetPagination
+	pagination_class = CustomKeysetPagination
+	# Served by the unique (surah, number) index; surahs get their ids in mushaf order on import
+	keyset_ordering = ('surah_id', 'number')
+	response_cache_params = ('surah_uuid', 'text_format', 'takhtit', 'limit', 'offset', 'cursor')
 	lookup_field = "uuid"
 
 	def get_parent_for_permission(self, request):
@@ -45,18 +61,40 @@ class AyahViewSet(viewsets.ModelViewSet):
 		if self.action == 'retrieve':
 			queryset = queryset.select_related('surah', 'surah__mushaf').prefetch_related('words').only(*ayah_fields)
 		else:
-			queryset = queryset.select_related('surah').prefetch_related('words').only(*ayah_fields)
+			# Words are batch-loaded per page by AyahListSerializer; surahs are
+			# fetched once with the stats the nested SurahSerializer reports
+			surahs = with_ayah_stats(Surah.objects.select_related('mushaf'))
+			queryset = queryset.prefetch_related(Prefetch('surah', queryset=surahs)).only(*ayah_fields)
 		surah_uuid = self.request.query_params.get('surah_uuid', None)
 		if surah_uuid is not None:
 			queryset = queryset.filter(surah__uuid=surah_uuid)
 		return queryset
 
+	def get_content_validators(self):
+		# Breakers come from the takhtits, everything else from the mushaf
+		mushafs = Mushaf.objects.all()
+		if self.action == 'retrieve':
+			mushafs = mushafs.filter(surahs__ayahs__uuid=self.kwargs.get('uuid'))
+		else:
+			surah_uuid = self.request.query_params.get('surah_uuid', None)
+			if surah_uuid is not None:
+				mushafs = mushafs.filter(surahs__uuid=surah_uuid)
+		return versioned_validators(mushafs, Takhtit.objects.filter(mushaf__in=mushafs))
+
 	def get_serializer_context(self):
 		context = super().get_serializer_context()
 		text_format = self.request.query_params.get('text_format', 'text')
 		if text_format not in ['text', 'word']:
 			text_format = 'text'
 		context['text_format'] = text_format
+		takhtit_uuid = self.request.query_params.get('takhtit', None)
+		if takhtit_uuid is not None:
+			try:
+				takhtit_uuid = uuid.UUID(takhtit_uuid)
+			except ValueError:
+				raise serializers.ValidationError({'takhtit': 'Must be a valid UUID.'})
+		context['takhtit_uuid'] = takhtit_uuid
+		context['search_terms'] = search_terms(self.request.query_params.get('search', ''))
 		return context
 
 	def get_serializer_class(self):
@@ -1,16 +1,21 @@
-from rest_framework import permissions, viewsets, status, filters
+from rest_framework import permissions, viewsets, status, filters, serializers
 from rest_framework.response import Response
 from django_filters.rest_framework import DjangoFilterBackend
 from rest_framework.decorators import action
 from rest_framework.parsers import MultiPartParser, FormParser
-from drf_spectacular.utils import extend_schema, extend_schema_view
+from drf_spectacular.utils import extend_schema, extend_schema_view, OpenApiParameter, OpenApiTypes
+from django.db import transaction
+from django.http import HttpResponseNotModified, HttpResponseRedirect
+from django.utils.http import parse_etags
 
 from core import permissions as core_permissions
 from core.pagination import CustomLimitOffsetPagination
-from quran.models import Mushaf, Ayah, AyahTranslation
-from quran.serializers import MushafSerializer
+from core.mixins import ConditionalGetMixin, conditional_get, queryset_validators, versioned_validators
+from quran.models import Mushaf, Ayah, AyahTranslation, AyahBreakerType, Takhtit, TakhtitWordPosition
+from quran.serializers import MushafSerializer, MushafPageResponseSerializer, MushafResolveResponseSerializer
+from quran.references import resolve_verse_references
 
-import json
+import uuid as uuid_lib
 
 
 @extend_schema_view(
@@ -21,7 +26,7 @@ import json
 	partial_update=extend_schema(summary="Partially update a Mushaf record"),
 	destroy=extend_schema(summary="Delete a Mushaf record")
 )
-class MushafViewSet(viewsets.ModelViewSet):
+class MushafViewSet(ConditionalGetMixin, viewsets.ModelViewSet):
 	queryset = Mushaf.objects.all().order_by('short_name')
 	serializer_class = MushafSerializer
 	permission_classes = [
@@ -33,6 +38,7 @@ class MushafViewSet(viewsets.ModelViewSet):
 	search_fields = ["short_name", "name", "source"]
 	ordering_fields = ['created_at']
 	pagination_class = CustomLimitOffsetPagination
+	response_cache_params = ('limit', 'offset', 'takhtit')
 	limited_fields = {"status": ["published"]}
 	lookup_field = "uuid"
 
@@ -41,6 +47,14 @@ class MushafViewSet(viewsets.ModelViewSet):
 			return Mushaf.objects.only('uuid', 'short_name', 'name', 'source', 'status').order_by('short_name')
 		return Mushaf.objects.all().order_by('short_name')
 
+	def get_content_validators(self):
+		if self.action == 'retrieve':
+			return queryset_validators(Mushaf.objects.filter(uuid=self.kwargs.get('uuid')))
+		if self.action == 'page':
+			mushafs = Mushaf.objects.filter(uuid=self.kwargs.get('uuid'))
+			return versioned_validators(mushafs, Takhtit.objects.filter(mushaf__in=mushafs))
+		return queryset_validators(Mushaf.objects.all())
+
 	def perform_create(self, serializer):
 		serializer.save(creator=self.request.user)
 
@@ -55,11 +69,117 @@ class MushafViewSet(viewsets.ModelViewSet):
 			ayah_translation_count = AyahTranslation.objects.filter(translation__mushaf=instance).count()
 			if ayah_translation_count != ayah_count:
 				return Response({'detail': f'Mushaf is incomplete: {ayah_translation_count} of {ayah_count} ayahs translated.'}, status=status.HTTP_400_BAD_REQUEST)
-		return super().update(request, *args, partial=partial, **kwargs)
+		was_published = instance.status == 'published'
+		response = super().update(request, *args, partial=partial, **kwargs)
+		instance.refresh_from_db(fields=['status'])
+		if not was_published and instance.status == 'published':
+			from quran.tasks import build_mushaf_snapshot_task
+			transaction.on_commit(lambda: build_mushaf_snapshot_task.delay(instance.id))
+		return response
 
 	def partial_update(self, request, *args, **kwargs):
 		return self.update(request, *args, partial=True, **kwargs)
 
+	@extend_schema(
+		summary="Download the compiled snapshot of a published Mushaf",
+		description=("Redirects to a gzip-compressed JSON file holding the whole Mushaf (surahs, ayahs, words and breaker ordinals). The snapshot is rebuilt in the background whenever the Mushaf is published, and after edits to its text or breakers; an out of date snapshot is never served, 404 is returned until the rebuild is done. The ETag identifies the snapshot version, so clients can revalidate with If-None-Match."),
+		responses={302: None, 304: None, 404: OpenApiTypes.OBJECT},
+		tags=["general", "mushafs"],
+	)
+	@action(detail=True, methods=['get'], url_path='snapshot')
+	def snapshot(self, request, uuid=None):
+		from quran.snapshots import get_snapshot_storage, queue_mushaf_snapshot_rebuild, snapshot_source_version
+		mushaf = self.get_object()
+		snapshot = mushaf.snapshots.order_by('-version').first()
+		if snapshot is None:
+			return Response({'detail': 'Snapshot is not available for this Mushaf yet.'}, status=status.HTTP_404_NOT_FOUND)
+		source_version = snapshot_source_version(mushaf)
+		if snapshot.source_version != source_version:
+			if mushaf.status == 'published':
+				queue_mushaf_snapshot_rebuild(mushaf, source_version)
+			return Response({'detail': 'Snapshot is out of date and is being rebuilt.'}, status=status.HTTP_404_NOT_FOUND)
+		etag = f'"{snapshot.etag}"'
+		if etag in parse_etags(request.headers.get('If-None-Match', '')):
+			response = HttpResponseNotModified()
+		else:
+			response = HttpResponseRedirect(get_snapshot_storage().url(snapshot.path))
+		response['ETag'] = etag
+		return response
+
+	@extend_schema(
+		summary="Words of one printed page of the Mushaf, grouped by line",
+		description=("Uses the page ayah breakers and line word breakers of a takhtit. Page and line positions are precomputed whenever those breakers change, so a page is read with a single query."),
+		parameters=[
+			OpenApiParameter("page_number", OpenApiTypes.INT, OpenApiParameter.PATH, description="Page number, starting at 1."),
+			OpenApiParameter("takhtit", OpenApiTypes.UUID, OpenApiParameter.QUERY, description="UUID of the Takhtit whose layout is used. Defaults to the oldest takhtit of the mushaf that has page breakers."),
+		],
+		responses={200: MushafPageResponseSerializer, 400: OpenApiTypes.OBJECT, 404: OpenApiTypes.OBJECT},
+		tags=["general", "mushafs"],
+	)
+	@action(detail=True, methods=['get'], url_path=r'pages/(?P<page_number>[0-9]+)')
+	@conditional_get
+	def page(self, request, uuid=None, page_number=None):
+		mushaf = self.get_object()
+		page_number = int(page_number)
+		takhtits = Takhtit.objects.filter(mushaf=mushaf)
+		takhtit_uuid = request.query_params.get('takhtit')
+		if takhtit_uuid is not None:
+			try:
+				takhtits = takhtits.filter(uuid=uuid_lib.UUID(takhtit_uuid))
+			except ValueError:
+				raise serializers.ValidationError({'takhtit': 'Must be a valid UUID.'})
+		else:
+			takhtits = takhtits.filter(ayah_breakers__type=AyahBreakerType.PAGE).order_by('id')
+		takhtit = takhtits.first()
+		if takhtit is None:
+			return Response({'detail': 'Takhtit not found.'}, status=status.HTTP_404_NOT_FOUND)
+
+		words = (
+			TakhtitWordPosition.objects
+			.filter(takhtit=takhtit, page=page_number)
+			.order_by('position')
+			.values_list('line', 'word__uuid', 'word__text', 'word__ayah__uuid', 'word__ayah__surah__number', 'word__ayah__number')
+		)
+		lines = []
+		for line, word_uuid, text, ayah_uuid, surah_number, ayah_number in words:
+			if not lines or lines[-1]['line'] != line:
+				lines.append({'line': line, 'words': []})
+			lines[-1]['words'].append({
+				'uuid': str(word_uuid),
+				'text': text,
+				'ayah_uuid': str(ayah_uuid),
+				'surah': surah_number,
+				'ayah': ayah_number,
+			})
+		if page_number < 1 or not lines:
+			return Response({'detail': 'Page not found.'}, status=status.HTTP_404_NOT_FOUND)
+		return Response({'page': page_number, 'takhtit_uuid': str(takhtit.uuid), 'lines': lines})
+
+	@extend_schema(
+		summary="Resolve verse keys and ranges to ayahs",
+		description=("Accepts up to 1000 references such as '2:255' or '2:1-5', either as a JSON list or as {\"keys\": [...]}. Returns the ayahs of each valid reference in input order, and an error message for each invalid or unknown one."),
+		request={
+			"application/json": {
+				"type": "object",
+				"properties": {"keys": {"type": "array", "items": {"type": "string"}, "example": ["2:255", "2:1-5", "3:7"]}},
+				"required": ["keys"]
+			}
+		},
+		responses={200: MushafResolveResponseSerializer, 400: OpenApiTypes.OBJECT},
+		tags=["general", "mushafs"],
+	)
+	@action(detail=True, methods=['post'], url_path='resolve', permission_classes=[permissions.AllowAny])
+	def resolve(self, request, uuid=None):
+		RESOLVE_MAX_KEYS = 1000
+		mushaf = self.get_object()
+		keys = request.data.get('keys') if isinstance(request.data, dict) else request.data
+		if not isinstance(keys, list) or not keys:
+			return Response({'keys': 'Expected a non-empty list of verse keys.'}, status=status.HTTP_400_BAD_REQUEST)
+		if len(keys) > RESOLVE_MAX_KEYS:
+			return Response({'keys': f'At most {RESOLVE_MAX_KEYS} verse keys can be resolved at once.'}, status=status.HTTP_400_BAD_REQUEST)
+		results, errors = resolve_verse_references(mushaf, keys)
+		return Response({'results': results, 'errors': errors})
+
 	@extend_schema(
 		request={
 			"multipart/form-data": {
@@ -70,11 +190,14 @@ class MushafViewSet(viewsets.ModelViewSet):
 				"required": ["file"]
 			}
 		},
-		summary="Import a Mushaf from a JSON file upload"
+		summary="Import a Mushaf from a JSON file upload",
+		description="The file is staged in object storage and imported in the background, surah by surah. You are notified when the import completes or fails.",
+		responses={202: OpenApiTypes.OBJECT, 400: OpenApiTypes.OBJECT}
 	)
 	@action(detail=False, methods=['post'], url_path='import', parser_classes=[MultiPartParser, FormParser])
 	def import_mushaf(self, request):
-		from django.db import transaction
+		from quran.imports import stage_import_file
+		from quran.tasks import import_mushaf_task
 		MUSHAF_UPLOAD_MAX_SIZE = 30 * 1024 * 1024
 		file = request.FILES.get('file')
 		if not file:
@@ -83,11 +206,7 @@ class MushafViewSet(viewsets.ModelViewSet):
 			return Response({'error': f'File size exceeds the maximum allowed for mushaf import ({MUSHAF_UPLOAD_MAX_SIZE} bytes, got {file.size} bytes).'}, status=400)
 		if not file.name.lower().endswith('.json'):
 			return Response({'detail': 'Only JSON files are allowed.'}, status=status.HTTP_400_BAD_REQUEST)
-		try:
-			quran_data = json.load(file)
-			user = request.user
-			from quran.tasks import import_mushaf_task
-			import_mushaf_task.delay(quran_data, user.id)
-			return Response({'detail': 'Mushaf import started. You will be notified when it is complete.'}, status=status.HTTP_202_ACCEPTED)
-		except Exception as e:
-			return Response({'detail': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+		# Only the name of the staged file goes through the broker, the worker streams it from storage
+		file_name = stage_import_file(file, 'mushafs')
+		import_mushaf_task.delay(file_name, request.user.id)
+		return Response({'detail': 'Mushaf import started. You will be notified when it is complete.'}, status=status.HTTP_202_ACCEPTED)
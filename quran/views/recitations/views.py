@@ -7,7 +7,8 @@ from drf_spectacular.utils import extend_schema, extend_schema_view, OpenApiPara
 
 from core import permissions as core_permissions
 from core.pagination import CustomLimitOffsetPagination
-from quran.models import Recitation, Surah, Ayah, AyahTranslation, RecitationSurah, RecitationSurahTimestamp
+from core.mixins import ConditionalGetMixin, queryset_validators
+from quran.models import Mushaf, Recitation, Surah, Ayah, AyahTranslation, RecitationSurah, RecitationSurahTimestamp
 from quran.serializers import RecitationSerializer
 
 
@@ -38,7 +39,7 @@ from quran.serializers import RecitationSerializer
 	partial_update=extend_schema(summary="Partially update a Recitation record"),
 	destroy=extend_schema(summary="Delete a Recitation record")
 )
-class RecitationViewSet(viewsets.ModelViewSet):
+class RecitationViewSet(ConditionalGetMixin, viewsets.ModelViewSet):
 	queryset = Recitation.objects.all()
 	serializer_class = RecitationSerializer
 	def get_serializer_class(self):
@@ -55,6 +56,7 @@ class RecitationViewSet(viewsets.ModelViewSet):
 	search_fields = ["recitation_date", "recitation_location", "recitation_type"]
 	ordering_fields = ['created_at', 'duration', 'recitation_date']
 	pagination_class = CustomLimitOffsetPagination
+	response_cache_params = ('mushaf', 'reciter_uuid', 'words_timestamps', 'limit', 'offset')
 	limited_fields = {"status": ["published"]}
 	lookup_field = "uuid"
 
@@ -69,10 +71,28 @@ class RecitationViewSet(viewsets.ModelViewSet):
 		reciter_uuid = self.request.query_params.get('reciter_uuid', None)
 		if reciter_uuid is not None:
 			queryset = queryset.filter(reciter_account__uuid=reciter_uuid)
-		if self.action == 'retrieve':
-			queryset = queryset.prefetch_related('recitation_surahs__timestamps')
 		return queryset
 
+	def get_content_validators(self):
+		if self.action == 'retrieve':
+			recitation_uuid = self.kwargs.get('uuid')
+			# Every timestamp write repacks its RecitationSurah, which moves its updated_at,
+			# so the surah rows stand in for the far more numerous timestamp rows. The mushaf
+			# covers the words the timestamps point at.
+			return queryset_validators(
+				Recitation.objects.filter(uuid=recitation_uuid),
+				RecitationSurah.objects.filter(recitation__uuid=recitation_uuid),
+				Mushaf.objects.filter(recitations__uuid=recitation_uuid),
+			)
+		mushaf_short_name = self.request.query_params.get('mushaf')
+		if not mushaf_short_name:
+			return None
+		recitations = Recitation.objects.filter(mushaf__short_name=mushaf_short_name)
+		reciter_uuid = self.request.query_params.get('reciter_uuid', None)
+		if reciter_uuid is not None:
+			recitations = recitations.filter(reciter_account__uuid=reciter_uuid)
+		return queryset_validators(recitations)
+
 	def create(self, request, *args, **kwargs):
 		return super().create(request, *args, **kwargs)
 
@@ -152,20 +172,54 @@ class RecitationViewSet(viewsets.ModelViewSet):
 			if word_timestamps:
 				from quran.models import Word
 				from datetime import datetime
+				import uuid as _uuid
+				# Resolve every referenced word with one query
+				word_uuids = set()
+				for ts in word_timestamps:
+					try:
+						word_uuids.add(_uuid.UUID(str(ts["word_uuid"])))
+					except (TypeError, KeyError, ValueError):
+						continue
+				word_ids = {str(word_uuid): word_id for word_uuid, word_id in Word.objects.filter(uuid__in=word_uuids).values_list('uuid', 'id')}
 				ts_objs = []
 				for ts in word_timestamps:
 					try:
 						start_time = datetime.strptime(ts["start"], "%H:%M:%S.%f")
 						end_time = (datetime.strptime(ts["end"], "%H:%M:%S.%f") if ts.get("end") else None)
-						word = None
+						word_id = None
 						if ts.get("word_uuid"):
-							word = Word.objects.filter(uuid=ts["word_uuid"]).first()
-						ts_objs.append(RecitationSurahTimestamp(recitation_surah=recitation_surah, start_time=start_time, end_time=end_time, word=word))
+							word_id = word_ids.get(str(_uuid.UUID(str(ts["word_uuid"]))))
+						ts_objs.append(RecitationSurahTimestamp(recitation_surah=recitation_surah, start_time=start_time, end_time=end_time, word_id=word_id))
 					except Exception:
 						continue
 				if ts_objs:
+					from quran.timestamps import pack_recitation_surah_timestamps
 					RecitationSurahTimestamp.objects.bulk_create(ts_objs)
+					pack_recitation_surah_timestamps(recitation_surah)
 			if not word_timestamps:
 				from quran.tasks import generate_recitation_surah_timestamps_task
 				transaction.on_commit(lambda: generate_recitation_surah_timestamps_task.delay(recitation, surah, new_file))
 		return Response({"detail": "Upload processed successfully."}, status=status.HTTP_201_CREATED)
+
+	@extend_schema(
+		summary="Re-align the low-confidence words of a surah recitation",
+		description=("Sends back to the forced aligner only the ayahs whose words are unaligned or aligned with low confidence, each with its part of the audio, and replaces the timestamps of the words that improved. Runs in the background; you are notified when it completes."),
+		request=None,
+		responses={202: OpenApiTypes.OBJECT, 404: OpenApiTypes.OBJECT},
+		methods=["POST"],
+	)
+	@action(detail=True, methods=["post"], url_path="realign/(?P<surah_uuid>[^/.]+)")
+	def realign(self, request, *args, **kwargs):
+		import uuid as _uuid
+		recitation: Recitation = self.get_object()
+		self.check_object_permissions(request, recitation)
+		try:
+			surah_uuid = _uuid.UUID(str(kwargs.get("surah_uuid")))
+		except ValueError:
+			return Response({"surah_uuid": "Must be a valid UUID."}, status=status.HTTP_400_BAD_REQUEST)
+		recitation_surah = RecitationSurah.objects.filter(recitation=recitation, surah__uuid=surah_uuid).first()
+		if recitation_surah is None:
+			return Response({"detail": "No audio has been uploaded for this surah."}, status=status.HTTP_404_NOT_FOUND)
+		from quran.tasks import realign_recitation_surah_task
+		realign_recitation_surah_task.delay(recitation_surah.id, request.user.id)
+		return Response({"detail": "Re-alignment started. You will be notified when it is complete."}, status=status.HTTP_202_ACCEPTED)
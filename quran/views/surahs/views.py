@@ -4,8 +4,10 @@ from drf_spectacular.utils import extend_schema, extend_schema_view, OpenApiPara
 
 from core import permissions as core_permissions
 from core.pagination import CustomLimitOffsetPagination
+from core.mixins import ConditionalGetMixin, versioned_validators
 from quran.models import Mushaf, Surah
 from quran.serializers import SurahSerializer, SurahDetailSerializer
+from quran.loaders import with_ayah_stats
 
 
 @extend_schema_view(
@@ -29,7 +31,7 @@ from quran.serializers import SurahSerializer, SurahDetailSerializer
 	partial_update=extend_schema(summary="Partially update a Surah record"),
 	destroy=extend_schema(summary="Delete a Surah record")
 )
-class SurahViewSet(viewsets.ModelViewSet):
+class SurahViewSet(ConditionalGetMixin, viewsets.ModelViewSet):
 	queryset = Surah.objects.all().order_by('number')
 	permission_classes = [
 		core_permissions.IsCreatorOrReadOnly,
@@ -40,6 +42,7 @@ class SurahViewSet(viewsets.ModelViewSet):
 	search_fields = ["name"]
 	ordering_fields = ['created_at']
 	pagination_class = CustomLimitOffsetPagination
+	response_cache_params = ('mushaf', 'limit', 'offset')
 	lookup_field = "uuid"
 
 	def get_parent_for_permission(self, request):
@@ -57,9 +60,9 @@ class SurahViewSet(viewsets.ModelViewSet):
 		surah_fields = [
 			'uuid', 'mushaf', 'name', 'number', 'period', 'name_pronunciation', 'name_translation', 'name_transliteration', 'search_terms', 'creator'
 		]
-		queryset = Surah.objects.all()
+		queryset = with_ayah_stats(Surah.objects.all())
 		if self.action == 'retrieve':
-			queryset = queryset.select_related('mushaf').prefetch_related('ayahs__words').only(*surah_fields)
+			queryset = queryset.select_related('mushaf').prefetch_related('ayahs').only(*surah_fields)
 		else:
 			queryset = queryset.select_related('mushaf').only(*surah_fields)
 		mushaf_short_name = self.request.query_params.get('mushaf')
@@ -69,6 +72,14 @@ class SurahViewSet(viewsets.ModelViewSet):
 			queryset = queryset.filter(mushaf__short_name=mushaf_short_name)
 		return queryset.order_by('number')
 
+	def get_content_validators(self):
+		if self.action == 'retrieve':
+			return versioned_validators(Mushaf.objects.filter(surahs__uuid=self.kwargs.get('uuid')))
+		mushaf_short_name = self.request.query_params.get('mushaf')
+		if not mushaf_short_name:
+			return None
+		return versioned_validators(Mushaf.objects.filter(short_name=mushaf_short_name))
+
 	def perform_create(self, serializer):
 		last_surah = Surah.objects.order_by('-number').first()
 		next_number = 1 if last_surah is None else last_surah.number + 1
@@ -3,10 +3,12 @@ from rest_framework.response import Response
 from rest_framework.decorators import action
 from rest_framework.parsers import MultiPartParser, FormParser
 from drf_spectacular.utils import extend_schema, extend_schema_view, OpenApiParameter, OpenApiTypes
+from django.db import transaction
 
 from core import permissions as core_permissions
 from core.pagination import CustomLimitOffsetPagination
-from quran.models import Takhtit, AyahBreaker, Ayah, Surah
+from quran.models import Takhtit, AyahBreaker, Ayah
+from quran.breakers import rebuild_ayah_breaker_ordinals, update_takhtit_word_positions
 from quran.serializers import (
 	TakhtitSerializer,
 	AyahBreakerSerializer,
@@ -162,11 +164,17 @@ class TakhtitViewSet(viewsets.ModelViewSet):
 			ayah = Ayah.objects.get(uuid=ayah_uuid)
 		except Ayah.DoesNotExist:
 			return Response({"detail": "Ayah not found."}, status=status.HTTP_404_NOT_FOUND)
-		data['takhtit'] = takhtit.pk
-		data['ayah'] = ayah.pk
 		serializer = AyahBreakerSerializer(data=data, context={'request': request})
 		serializer.is_valid(raise_exception=True)
-		serializer.save()
+		# The save bumps the takhtit's content version; committing it together with
+		# the derived rows keeps readers from caching stale ordinals under the new version
+		with transaction.atomic():
+			serializer.save(ayah=ayah, takhtit=takhtit)
+			rebuild_ayah_breaker_ordinals(takhtit, breaker_type)
+			if breaker_type == AyahBreakerType.PAGE:
+				first_word_id = ayah.words.order_by('id').values_list('id', flat=True).first()
+				if first_word_id is not None:
+					update_takhtit_word_positions(takhtit, first_word_id)
 		return Response(serializer.data, status=status.HTTP_201_CREATED)
 
 	@extend_schema(
@@ -242,7 +250,10 @@ class TakhtitViewSet(viewsets.ModelViewSet):
 			word = Word.objects.get(uuid=word_uuid)
 		except Word.DoesNotExist:
 			return Response({"detail": "Word not found."}, status=status.HTTP_404_NOT_FOUND)
-		WordBreaker.objects.create(creator=request.user, word=word, takhtit=takhtit, type='line')
+		# Commit the breaker and the positions it moves together, as the create bumps the takhtit's content version
+		with transaction.atomic():
+			WordBreaker.objects.create(creator=request.user, word=word, takhtit=takhtit, type='line')
+			update_takhtit_word_positions(takhtit, word.id)
 		return Response({"word_uuid": str(word.uuid), "type": "line"}, status=status.HTTP_201_CREATED)
 
 	@extend_schema(
@@ -269,7 +280,7 @@ class TakhtitViewSet(viewsets.ModelViewSet):
 
 	@extend_schema(
 		summary="Import Ayah Breakers for the specified Takhtit",
-		description=("Accepts a JSON array of strings with the format '{surah}:{ayah}' that denote the ayah at which a new breaker (page by default) begins. Existing breakers whose names start with the provided breaker type (default: 'page') will be removed before importing the new ones."),
+		description=("Accepts a JSON array of strings with the format '{surah}:{ayah}' that denote the ayah at which a new breaker (page by default) begins. Existing breakers of the provided breaker type (default: 'page') are replaced by the imported ones. The import runs in the background and reports rejected items in a notification."),
 		request={
 			"multipart/form-data": {
 				"type": "object",
@@ -279,14 +290,17 @@ class TakhtitViewSet(viewsets.ModelViewSet):
 		},
 		methods=["POST"],
 		parameters=[OpenApiParameter(name="type", type=OpenApiTypes.STR, location=OpenApiParameter.QUERY, required=False, description="Breaker type (e.g., page, juz, hizb, ruku). Defaults to 'page'.")],
-		responses={201: OpenApiTypes.OBJECT},
+		responses={202: OpenApiTypes.OBJECT, 400: OpenApiTypes.OBJECT},
 	)
 	@action(detail=True, methods=["post"], url_path="import", parser_classes=[MultiPartParser, FormParser])
-	def import_breakers(self, request, pk=None):
+	def import_breakers(self, request, uuid=None):
 		import json
-		from quran.models import Ayah, AyahBreaker, AyahBreakerType, Surah, Takhtit
+		from quran.models import AyahBreakerType
 		takhtit = self.get_object()
 		breaker_type = request.query_params.get('type', 'page')
+		valid_types = [choice[0] for choice in AyahBreakerType.choices]
+		if breaker_type not in valid_types:
+			return Response({"detail": f"Invalid type. Must be one of: {', '.join(valid_types)}."}, status=status.HTTP_400_BAD_REQUEST)
 		file = request.FILES.get('file')
 		if not file:
 			return Response({'detail': 'No file uploaded.'}, status=status.HTTP_400_BAD_REQUEST)
@@ -296,15 +310,6 @@ class TakhtitViewSet(viewsets.ModelViewSet):
 			return Response({'detail': f'Invalid file: {e}'}, status=status.HTTP_400_BAD_REQUEST)
 		if not isinstance(data, list):
 			return Response({'detail': 'File must contain a list of breakers.'}, status=status.HTTP_400_BAD_REQUEST)
-		AyahBreaker.objects.filter(takhtit=takhtit, type=breaker_type).delete()
-		created = 0
-		for item in data:
-			try:
-				surah_num, ayah_num = map(int, item.split(':'))
-				surah = Surah.objects.get(number=surah_num, mushaf=takhtit.mushaf)
-				ayah = Ayah.objects.get(surah=surah, number=ayah_num)
-				AyahBreaker.objects.create(ayah=ayah, takhtit=takhtit, type=breaker_type, creator=request.user)
-				created += 1
-			except Exception:
-				continue
-		return Response({'created': created}, status=status.HTTP_201_CREATED)
+		from quran.tasks import import_takhtit_breakers_task
+		import_takhtit_breakers_task.delay(takhtit.id, breaker_type, data, request.user.id)
+		return Response({'detail': 'Breaker import started. You will be notified when it is complete.'}, status=status.HTTP_202_ACCEPTED)
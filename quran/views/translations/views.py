@@ -1,19 +1,27 @@
 from rest_framework import permissions, viewsets, status, filters, serializers
 from rest_framework.response import Response
+from rest_framework.renderers import BrowsableAPIRenderer, JSONRenderer
+from django.contrib.postgres.search import SearchHeadline, SearchQuery, SearchRank
+from django.db.models import F, FloatField
+from django.db.models.functions import Cast
+from django.http import StreamingHttpResponse
 from django_filters.rest_framework import DjangoFilterBackend
 from rest_framework.decorators import action
 from rest_framework.parsers import MultiPartParser, FormParser
 from drf_spectacular.utils import extend_schema, extend_schema_view, OpenApiParameter, OpenApiExample, OpenApiTypes
 
 from core import permissions as core_permissions
-from core.pagination import CustomLimitOffsetPagination
+from core.pagination import CustomLimitOffsetPagination, CustomKeysetPagination
+from core.mixins import ConditionalGetMixin, conditional_get, queryset_validators, versioned_validators
 from quran.models import Translation, Ayah, AyahTranslation
 from quran.serializers import (
 	TranslationSerializer,
 	TranslationListSerializer,
 	AyahTranslationSerializer,
 	AyahTranslationNestedSerializer,
+	AyahTranslationSearchResultSerializer,
 )
+from quran.search import text_search_config
 
 import json
 
@@ -54,7 +62,7 @@ import json
 	partial_update=extend_schema(summary="Partially update a Translation record"),
 	destroy=extend_schema(summary="Delete a Translation record")
 )
-class TranslationViewSet(viewsets.ModelViewSet):
+class TranslationViewSet(ConditionalGetMixin, viewsets.ModelViewSet):
 	queryset = Translation.objects.all()
 	serializer_class = TranslationSerializer
 	permission_classes = [
@@ -66,6 +74,7 @@ class TranslationViewSet(viewsets.ModelViewSet):
 	search_fields = ["text"]
 	ordering_fields = ['created_at']
 	pagination_class = CustomLimitOffsetPagination
+	response_cache_params = ('mushaf', 'language', 'surah_uuid', 'limit', 'offset', 'cursor')
 	limited_fields = {"status": ["published"]}
 	lookup_field = "uuid"
 
@@ -82,6 +91,20 @@ class TranslationViewSet(viewsets.ModelViewSet):
 			queryset = queryset.filter(language=language)
 		return queryset
 
+	def get_content_validators(self):
+		if self.action == 'retrieve':
+			return queryset_validators(Translation.objects.filter(uuid=self.kwargs.get('uuid')))
+		if self.action in ('ayahs', 'export'):
+			return versioned_validators(Translation.objects.filter(uuid=self.kwargs.get('uuid')))
+		mushaf_short_name = self.request.query_params.get('mushaf')
+		if not mushaf_short_name:
+			return None
+		translations = Translation.objects.filter(mushaf__short_name=mushaf_short_name)
+		language = self.request.query_params.get('language', None)
+		if language is not None:
+			translations = translations.filter(language=language)
+		return queryset_validators(translations)
+
 	def get_serializer_class(self):
 		if self.action == 'retrieve':
 			return TranslationSerializer
@@ -116,6 +139,16 @@ class TranslationViewSet(viewsets.ModelViewSet):
 				"required": ["file"]
 			}
 		},
+		parameters=[
+			OpenApiParameter(
+				name="mode",
+				type=OpenApiTypes.STR,
+				location=OpenApiParameter.QUERY,
+				required=False,
+				enum=["create", "upsert"],
+				description="'create' (default) adds a new Translation. 'upsert' corrects the existing Translation of the same mushaf, translator and language in place, writing only the ayah translations that were added, changed or removed."
+			)
+		],
 		summary="Import a Translation from a JSON file upload"
 	)
 	@action(detail=False, methods=['post'], url_path='import', parser_classes=[MultiPartParser, FormParser])
@@ -128,15 +161,19 @@ class TranslationViewSet(viewsets.ModelViewSet):
 			return Response({'detail': 'No file uploaded.'}, status=status.HTTP_400_BAD_REQUEST)
 		if not file.name.lower().endswith('.json'):
 			return Response({'detail': 'Only JSON files are allowed.'}, status=status.HTTP_400_BAD_REQUEST)
+		mode = request.query_params.get('mode', 'create')
+		if mode not in ('create', 'upsert'):
+			return Response({'detail': "Invalid mode. Must be one of: create, upsert."}, status=status.HTTP_400_BAD_REQUEST)
 		try:
 			translation_data = json.load(file)
 			user = request.user
 			from quran.tasks import import_translation_task
-			import_translation_task.delay(translation_data, user.id)
+			import_translation_task.delay(translation_data, user.id, upsert=mode == 'upsert')
 			return Response({'detail': 'Translation import started. You will be notified when it is complete.'}, status=status.HTTP_202_ACCEPTED)
 		except Exception as e:
 			return Response({'detail': str(e)}, status=status.HTTP_400_BAD_REQUEST)
 
+	@conditional_get
 	def retrieve(self, request, *args, **kwargs):
 		instance = self.get_object()
 		serializer = self.get_serializer(instance)
@@ -153,18 +190,27 @@ class TranslationViewSet(viewsets.ModelViewSet):
 				location=OpenApiParameter.QUERY,
 				required=False,
 				description="UUID of the Surah to filter AyahTranslations by."
+			),
+			OpenApiParameter(
+				name="cursor",
+				type=OpenApiTypes.STR,
+				location=OpenApiParameter.QUERY,
+				required=False,
+				description="Opt-in keyset pagination in mushaf order. Pass an empty value for the first page, then the returned next_cursor."
 			)
 		],
 		responses={200: AyahTranslationSerializer(many=True)}
 	)
 	@action(detail=True, methods=["get"], url_path="ayahs")
+	@conditional_get
 	def ayahs(self, request, *args, **kwargs):
 		translation = self.get_object()
 		ayah_translations = translation.ayah_translations.select_related('ayah', 'ayah__surah').order_by('ayah__number')
 		surah_uuid = request.query_params.get('surah_uuid')
 		if surah_uuid:
 			ayah_translations = ayah_translations.filter(ayah__surah__uuid=surah_uuid)
-		paginator = CustomLimitOffsetPagination()
+		# Ayah ids follow the mushaf order on import, as for the words keyset
+		paginator = CustomKeysetPagination(ordering=('ayah_id', 'id'))
 		page = paginator.paginate_queryset(ayah_translations, request)
 		def process_bismillah(data):
 			found_first = False
@@ -182,6 +228,106 @@ class TranslationViewSet(viewsets.ModelViewSet):
 		processed = process_bismillah(serializer.data)
 		return Response(processed)
 
+	@extend_schema(
+		summary="Export all AyahTranslations of this Translation as NDJSON",
+		description=("Streams one JSON object per line, ordered by surah and ayah number, with the same fields as the ayahs listing. Rows are read with a server-side cursor, so memory use does not depend on the translation size. Optionally filter by surah_uuid (query param)."),
+		parameters=[
+			OpenApiParameter(
+				name="surah_uuid",
+				type=OpenApiTypes.UUID,
+				location=OpenApiParameter.QUERY,
+				required=False,
+				description="UUID of the Surah to filter AyahTranslations by."
+			)
+		],
+		responses={(200, 'application/x-ndjson'): OpenApiTypes.STR}
+	)
+	@action(detail=True, methods=["get"], url_path="export")
+	@conditional_get
+	def export(self, request, *args, **kwargs):
+		translation = self.get_object()
+		rows = translation.ayah_translations.order_by('ayah__surah__number', 'ayah__number', 'id')
+		surah_uuid = request.query_params.get('surah_uuid')
+		if surah_uuid:
+			rows = rows.filter(ayah__surah__uuid=surah_uuid)
+		rows = rows.values_list('uuid', 'ayah__uuid', 'ayah__number', 'text', 'bismillah')
+
+		def lines():
+			for row_uuid, ayah_uuid, ayah_number, text, bismillah in rows.iterator(chunk_size=2000):
+				yield json.dumps({
+					'uuid': str(row_uuid),
+					'ayah_uuid': str(ayah_uuid),
+					'text': text,
+					# Same rule as AyahTranslationNestedSerializer
+					'bismillah': bismillah if ayah_number == 1 else None,
+				}, ensure_ascii=False) + '\n'
+
+		response = StreamingHttpResponse(lines(), content_type='application/x-ndjson')
+		response['Content-Disposition'] = f'attachment; filename="translation-{translation.uuid}.ndjson"'
+		return response
+
+	def search_ayah_translations(self, request, ayah_translations, language):
+		"""Full-text search `ayah_translations` with the `q` query param, best matches first."""
+		q = request.query_params.get('q', '').strip()
+		if not q:
+			raise serializers.ValidationError({'q': 'This query parameter is required.'})
+		config = text_search_config(language)
+		query = SearchQuery(q, config=config, search_type='websearch')
+		results = (
+			ayah_translations
+			.filter(search_vector=query)
+			.select_related('translation', 'ayah', 'ayah__surah')
+			.annotate(
+				# real -> double precision, so the rank survives the keyset cursor round trip exactly
+				search_rank=Cast(SearchRank(F('search_vector'), query), FloatField()),
+				headline=SearchHeadline('text', query, config=config),
+			)
+			.order_by('-search_rank', 'id')
+		)
+		paginator = CustomKeysetPagination(ordering=('-search_rank', 'id'))
+		page = paginator.paginate_queryset(results, request)
+		serializer = AyahTranslationSearchResultSerializer(page, many=True)
+		return paginator.get_paginated_response(serializer.data)
+
+	@extend_schema(
+		summary="Search the text of this Translation",
+		description=("Full-text search using the stemming rules of the translation's language. Supports quoted phrases, OR and -exclusions. Results are ranked and include a headline snippet. Add an empty `cursor` param for keyset pagination."),
+		parameters=[
+			OpenApiParameter(name="q", type=OpenApiTypes.STR, location=OpenApiParameter.QUERY, required=True, description="Search query."),
+			OpenApiParameter(name="cursor", type=OpenApiTypes.STR, location=OpenApiParameter.QUERY, required=False, description="Opt-in keyset pagination. Pass an empty value for the first page, then the returned next_cursor."),
+		],
+		responses={200: AyahTranslationSearchResultSerializer(many=True)},
+		tags=["general", "translations"],
+	)
+	# Ranks are floats, which FastJSONRenderer writes in another exponent form
+	@action(detail=True, methods=["get"], url_path="search", renderer_classes=[JSONRenderer, BrowsableAPIRenderer])
+	def search(self, request, *args, **kwargs):
+		translation = self.get_object()
+		return self.search_ayah_translations(request, translation.ayah_translations.all(), translation.language)
+
+	@extend_schema(
+		summary="Search the text of all Translations in a language",
+		description=("Full-text search across every translation in the given language, optionally limited to one mushaf. Results are ranked and include a headline snippet. Add an empty `cursor` param for keyset pagination."),
+		parameters=[
+			OpenApiParameter(name="language", type=OpenApiTypes.STR, location=OpenApiParameter.QUERY, required=True, description="Language code of the translations to search."),
+			OpenApiParameter(name="q", type=OpenApiTypes.STR, location=OpenApiParameter.QUERY, required=True, description="Search query."),
+			OpenApiParameter(name="mushaf", type=OpenApiTypes.STR, location=OpenApiParameter.QUERY, required=False, description="Short name of the Mushaf to limit the search to."),
+			OpenApiParameter(name="cursor", type=OpenApiTypes.STR, location=OpenApiParameter.QUERY, required=False, description="Opt-in keyset pagination. Pass an empty value for the first page, then the returned next_cursor."),
+		],
+		responses={200: AyahTranslationSearchResultSerializer(many=True)},
+		tags=["general", "translations"],
+	)
+	@action(detail=False, methods=["get"], url_path="search", renderer_classes=[JSONRenderer, BrowsableAPIRenderer])
+	def search_all(self, request, *args, **kwargs):
+		language = request.query_params.get('language')
+		if not language:
+			raise serializers.ValidationError({'language': 'This query parameter is required.'})
+		ayah_translations = AyahTranslation.objects.filter(translation__language=language)
+		mushaf_short_name = request.query_params.get('mushaf')
+		if mushaf_short_name:
+			ayah_translations = ayah_translations.filter(translation__mushaf__short_name=mushaf_short_name)
+		return self.search_ayah_translations(request, ayah_translations, language)
+
 	@extend_schema(
 		summary="Retrieve a single AyahTranslation for this Translation",
 		description=("Returns a single AyahTranslation object for the given Translation UUID and Ayah UUID. URL: /translations/{translation_uuid}/ayahs/{ayah_uuid}/"),
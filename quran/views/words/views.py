@@ -4,9 +4,11 @@ from django_filters.rest_framework import DjangoFilterBackend
 from drf_spectacular.utils import extend_schema, extend_schema_view, OpenApiParameter, OpenApiTypes
 
 from core import permissions as core_permissions
-from core.pagination import CustomLimitOffsetPagination
-from quran.models import Ayah, Word
+from core.pagination import CustomKeysetPagination
+from core.mixins import ConditionalGetMixin, versioned_validators
+from quran.models import Mushaf, Ayah, Word
 from quran.serializers import WordSerializer
+from quran.search import WordSearchFilter
 
 
 @extend_schema_view(
@@ -39,7 +41,7 @@ from quran.serializers import WordSerializer
 	partial_update=extend_schema(summary="Partially update a Word record"),
 	destroy=extend_schema(summary="Delete a Word record")
 )
-class WordViewSet(viewsets.ModelViewSet):
+class WordViewSet(ConditionalGetMixin, viewsets.ModelViewSet):
 	queryset = Word.objects.all()
 	serializer_class = WordSerializer
 	permission_classes = [
@@ -47,10 +49,11 @@ class WordViewSet(viewsets.ModelViewSet):
 		core_permissions.IsCreatorOfParentOrReadOnly,
 		permissions.IsAuthenticatedOrReadOnly | permissions.DjangoModelPermissions
 	]
-	filter_backends = [DjangoFilterBackend, filters.SearchFilter, filters.OrderingFilter]
-	search_fields = ["text"]
+	filter_backends = [DjangoFilterBackend, WordSearchFilter, filters.OrderingFilter]
 	ordering_fields = ['created_at']
-	pagination_class = CustomLimitOffsetPagination
+	pagination_class = CustomKeysetPagination
+	keyset_ordering = ('ayah_id', 'id')
+	response_cache_params = ('ayah_uuid', 'limit', 'offset', 'cursor')
 	lookup_field = "uuid"
 
 	def get_parent_for_permission(self, request):
@@ -67,6 +70,16 @@ class WordViewSet(viewsets.ModelViewSet):
 			queryset = queryset.filter(ayah__uuid=ayah_uuid)
 		return queryset
 
+	def get_content_validators(self):
+		mushafs = Mushaf.objects.all()
+		if self.action == 'retrieve':
+			mushafs = mushafs.filter(surahs__ayahs__words__uuid=self.kwargs.get('uuid'))
+		else:
+			ayah_uuid = self.request.query_params.get('ayah_uuid', None)
+			if ayah_uuid is not None:
+				mushafs = mushafs.filter(surahs__ayahs__uuid=ayah_uuid)
+		return versioned_validators(mushafs)
+
 	def create(self, request, *args, **kwargs):
 		data = request.data.copy()
 		if not data.get('ayah_id'):